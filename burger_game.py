@@ -5,8 +5,18 @@ import random
 import time
 import math
 import json
+import threading
+import struct
+import heapq
+from collections import OrderedDict, deque
 from pygame.math import Vector2
 
+# Headless mode (BURGER_HEADLESS=1): no window and no sound device, for simulations
+HEADLESS = os.environ.get("BURGER_HEADLESS") == "1"
+if HEADLESS:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
 # Initialize Pygame
 pygame.init()
 pygame.mixer.init()  # For sound effects
@@ -25,6 +35,45 @@ RED = (255, 50, 50)
 YELLOW = (255, 255, 0)
 TRANSPARENT = (0, 0, 0, 0)
 
+# Game time. Gameplay reads the clock through `game_clock` instead of calling
+# time.time() directly. The main loop advances a SimulationClock in fixed
+# STEP increments, so every system sees the same dt at any frame rate, and a
+# simulation can advance it as fast as the CPU allows
+STEP = 1 / FPS  # Fixed update step in seconds
+MAX_FRAME_TIME = 0.25  # Longest frame the loop catches up on, so a stall can't snowball
+
+class WallClock:
+    alpha = 1.0
+    
+    def time(self):
+        return time.time()
+
+    def render_time(self):
+        return time.time()
+
+class SimulationClock:
+    def __init__(self, start=0.0):
+        self.now = start
+        self.last_dt = 0.0
+        self.alpha = 1.0  # Where the frame being drawn falls between the last two steps (0..1)
+
+    def time(self):
+        return self.now
+
+    def advance(self, dt):
+        self.now += dt
+        self.last_dt = dt
+
+    def render_time(self):
+        # Interpolated between the previous step and the current one
+        return self.now - (1 - self.alpha) * self.last_dt
+
+game_clock = WallClock()
+
+def set_game_clock(new_clock):
+    global game_clock
+    game_clock = new_clock
+
 # Set up the display
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Burger Bun Bakery Simulator")
@@ -104,9 +153,20 @@ def create_placeholder_sounds():
             # Create a default notification for missing sound files
             print(f"Sound file {path} doesn't exist. The game will run with default sounds.")
 
+GAME_DATA_PATH = os.path.join("data", "game_data.json")
+
+# Write JSON atomically: a crash mid-write leaves the previous file intact
+def write_json_atomic(path, data):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(data if isinstance(data, str) else json.dumps(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
 # Create default game data file
 def create_default_game_data():
-    data_path = os.path.join("data", "game_data.json")
+    data_path = GAME_DATA_PATH
     if not os.path.exists(data_path):
         default_data = {
             "high_score": 0,
@@ -122,8 +182,7 @@ def create_default_game_data():
         }
         
         try:
-            with open(data_path, 'w') as f:
-                json.dump(default_data, f)
+            write_json_atomic(data_path, default_data)
             print(f"Created default game data at {data_path}")
         except Exception as e:
             print(f"Error creating game data: {e}")
@@ -162,7 +221,7 @@ def load_sound(filename, volume=1.0):
 
 # Load game data
 def load_game_data():
-    data_path = os.path.join("data", "game_data.json")
+    data_path = GAME_DATA_PATH
     try:
         with open(data_path, 'r') as f:
             return json.load(f)
@@ -172,14 +231,92 @@ def load_game_data():
         with open(data_path, 'r') as f:
             return json.load(f)
 
+# Write-behind persistence: the game only marks the data dirty, a background
+# thread writes it to disk once things have been quiet for `delay` seconds
+# path=None keeps the data in memory only (simulations never touch the save file)
+class SaveManager:
+    def __init__(self, path=GAME_DATA_PATH, delay=1.0, max_delay=5.0):
+        self.path = path
+        self.delay = delay  # Debounce: wait this long after the last change
+        self.max_delay = max_delay  # ...but never keep changes unsaved longer than this
+        self.pending = None  # Latest snapshot not yet on disk
+        self.first_change = 0
+        self.last_change = 0
+        self.flush_now = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def save(self, data):
+        if self.path is None:
+            return
+        # Serializing a dict this small takes microseconds; the disk write happens on the worker thread
+        start = profiler.mark()
+        snapshot = json.dumps(data)
+        with self.condition:
+            now = time.monotonic()
+            if self.pending is None:
+                self.first_change = now
+            self.pending = snapshot
+            self.last_change = now
+            self.start()
+            self.condition.notify()
+        profiler.lap("save", start)
+
+    def request_flush(self):
+        # Write pending changes right away (pause, game over), still off the game thread
+        with self.condition:
+            if self.pending is not None:
+                self.flush_now = True
+                self.condition.notify()
+
+    def start(self):
+        if self.thread is None and not self.closed:
+            self.thread = threading.Thread(target=self.run, name="save-writer", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while True:
+                    if self.pending is not None:
+                        now = time.monotonic()
+                        due = min(self.last_change + self.delay, self.first_change + self.max_delay)
+                        if self.flush_now or self.closed or now >= due:
+                            break
+                        self.condition.wait(due - now)
+                    elif self.closed:
+                        return
+                    else:
+                        self.condition.wait()
+                snapshot, self.pending, self.flush_now = self.pending, None, False
+            self.write(snapshot)
+
+    def write(self, snapshot):
+        start = profiler.mark()
+        try:
+            write_json_atomic(self.path, snapshot)
+        except Exception as e:
+            print(f"Error saving game data: {e}")
+        profiler.lap("save_write", start)
+
+    def close(self):
+        # Flush synchronously on quit and stop the worker
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+        with self.condition:
+            snapshot, self.pending = self.pending, None
+        if snapshot is not None:
+            self.write(snapshot)
+
+game_saver = SaveManager()
+
 # Save game data
 def save_game_data(data):
-    data_path = os.path.join("data", "game_data.json")
-    try:
-        with open(data_path, 'w') as f:
-            json.dump(data, f)
-    except Exception as e:
-        print(f"Error saving game data: {e}")
+    game_saver.save(data)
 
 # Load images
 background = load_image("background.png")
@@ -223,6 +360,24 @@ ingredient_images = {
     "bacon_crispy": load_image("bacon_crispy.png"),
 }
 
+# Scaled variants of the ingredient images, made once and reused every frame
+scaled_images = {}  # (name, scale) -> Surface
+
+def get_scaled_image(name, scale):
+    key = (name, scale)
+    image = scaled_images.get(key)
+    if image is None:
+        original = ingredient_images[name]
+        image = pygame.transform.scale(original, (int(original.get_width() * scale),
+                                                  int(original.get_height() * scale)))
+        scaled_images[key] = image
+    return image
+
+# Order cards show half-size thumbnails: prepare them at load time
+ORDER_THUMBNAIL_SCALE = 0.5
+for name in ingredient_images:
+    get_scaled_image(name, ORDER_THUMBNAIL_SCALE)
+
 # Load sounds
 place_sound = load_sound("place.wav", 0.3)
 success_sound = load_sound("success.wav", 0.5)
@@ -242,6 +397,233 @@ font_small = pygame.font.Font(None, 36)
 font_medium = pygame.font.Font(None, 48)
 font_large = pygame.font.Font(None, 74)
 
+# Text surfaces are cached: most strings (titles, menu lines, labels) never change,
+# so rendering them again every frame is wasted work
+class TextCache:
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()  # (font, text, color, antialias) -> Surface, least recently used first
+        
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+text_cache = TextCache()
+
+# Cached surfaces are shared: blit them, never draw on them
+def render_text(font, text, color, antialias=True):
+    return text_cache.render(font, text, color, antialias)
+
+# A text that shows a changing value (score, money, timers). It keeps only its
+# last surface, so counters don't push the static strings out of the cache
+class CounterText:
+    def __init__(self, font, template, color):
+        self.font = font
+        self.template = template
+        self.color = color
+        self.value = None
+        self.surface = None
+        
+    def render(self, value):
+        if self.surface is None or value != self.value:
+            self.value = value
+            self.surface = self.font.render(self.template.format(value), True, self.color)
+        return self.surface
+
+# Translucent surfaces (overlays, panels) are built once and reused instead of
+# allocating a new SRCALPHA surface every frame
+class SurfacePool:
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self.surfaces = {}
+        
+    def get(self, key, build):
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if len(self.surfaces) >= self.max_size:
+                self.surfaces.clear()
+            surface = self.surfaces[key] = build()
+        return surface
+        
+    def filled(self, size, color):
+        # An SRCALPHA surface of `size` filled with `color`
+        def build():
+            surface = pygame.Surface(size, pygame.SRCALPHA)
+            surface.fill(color)
+            return surface
+        return self.get(("filled", tuple(size), tuple(color)), build)
+
+surface_pool = SurfacePool()
+
+# Frame profiler (F3): times each part of a frame, shows frame-time
+# percentiles and a rolling graph in an overlay and exports per-frame rows to
+# CSV. While disabled every hook is a single attribute check.
+PROFILE_SECTIONS = ("events", "update", "draw", "draw:background", "draw:stations", "draw:customer",
+                    "draw:order", "draw:stack", "draw:shelf", "draw:text", "draw:ui", "draw:overlay",
+                    "display", "save", "save_write")
+# Which draw section each frame element belongs to (by key); the rest is UI
+ELEMENT_SECTIONS = {
+    "score": "draw:text", "level": "draw:text", "money": "draw:text", "text_box": "draw:text", "bonus": "draw:text",
+    "station": "draw:stations", "customer": "draw:customer", "order": "draw:order",
+    "stack": "draw:stack", "dragged": "draw:stack", "shelf": "draw:shelf", "profiler": "draw:overlay",
+}
+PROFILE_ROWS = 60 * 60 * 10  # Frames kept for export: the last ten minutes at 60 FPS
+
+class FrameProfiler:
+    def __init__(self, history=180):
+        self.enabled = False
+        self.show_overlay = False
+        self.history = deque(maxlen=history)  # Recent frame times for the overlay
+        self.rows = deque(maxlen=PROFILE_ROWS)  # (frame, section...) seconds per frame
+        self.current = dict.fromkeys(PROFILE_SECTIONS, 0.0)
+        self.frame_start = 0.0
+        self.frame_count = 0
+        self.overlay_lines = []
+        self.next_overlay_refresh = 0.0
+        self.overlay_font = None
+        self.overlay_rect = pygame.Rect(10, 10, 300, 170)
+        
+    def enable(self, overlay=True, max_rows=PROFILE_ROWS):
+        if self.rows.maxlen != max_rows:
+            self.rows = deque(self.rows, maxlen=max_rows)
+        self.current = dict.fromkeys(PROFILE_SECTIONS, 0.0)
+        self.frame_start = 0.0
+        self.enabled = True
+        self.show_overlay = overlay
+        
+    def disable(self):
+        self.enabled = False
+        self.show_overlay = False
+        
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+            
+    def mark(self):
+        return time.perf_counter() if self.enabled else 0.0
+    
+    def lap(self, section, since):
+        # Add the time since `since` (a mark) to a section; returns a new mark
+        if not self.enabled or not since:
+            return self.mark()
+        now = time.perf_counter()
+        # The save writer thread reports too; a rare lost sample is harmless
+        self.current[section] += now - since
+        return now
+        
+    def start_frame(self):
+        self.frame_start = self.mark()
+        
+    def end_frame(self):
+        # Frame time is the work done, not the wait for the next frame
+        if not self.enabled or not self.frame_start:
+            return
+        total = time.perf_counter() - self.frame_start
+        self.history.append(total)
+        self.rows.append((total,) + tuple(self.current.values()))
+        self.current = dict.fromkeys(PROFILE_SECTIONS, 0.0)
+        self.frame_count += 1
+        if self.show_overlay and self.frame_start >= self.next_overlay_refresh:
+            self.refresh_overlay_lines()
+            self.next_overlay_refresh = self.frame_start + 0.25
+        
+    def draw_element(self, surface, key, draw):
+        start = time.perf_counter()
+        draw(surface)
+        name = key[0] if isinstance(key, tuple) else key
+        self.current[ELEMENT_SECTIONS.get(name, "draw:ui")] += time.perf_counter() - start
+        
+    def with_overlay(self, elements):
+        if not self.show_overlay:
+            return elements
+        # A new signature every frame: the graph scrolls continuously
+        return elements + [("profiler", self.overlay_rect, self.frame_count, self.draw_overlay)]
+        
+    def refresh_overlay_lines(self):
+        # Text changes four times a second so it stays readable
+        if self.overlay_font is None:
+            self.overlay_font = pygame.font.Font(None, 20)
+        frames = sorted(self.history)
+        def percentile(p):
+            return frames[min(len(frames) - 1, int(p / 100 * len(frames)))] * 1000
+        lines = [f"frame p50 {percentile(50):.2f}  p95 {percentile(95):.2f}  p99 {percentile(99):.2f} ms"]
+        # Costliest sections over the same window (the overlay itself aside)
+        recent = list(self.rows)[-len(frames):]
+        means = [(sum(row[i + 1] for row in recent) / len(recent), name)
+                 for i, name in enumerate(PROFILE_SECTIONS) if name not in ("draw", "draw:overlay")]
+        for mean, name in sorted(means, reverse=True)[:4]:
+            lines.append(f"{name:<16}{mean * 1000:.3f} ms")
+        self.overlay_lines = [self.overlay_font.render(line, True, WHITE) for line in lines]
+        
+    def draw_overlay(self, surface):
+        area = self.overlay_rect
+        surface.blit(surface_pool.filled(area.size, (0, 0, 0, 190)), area)
+        if not self.history:
+            return
+        for i, line in enumerate(self.overlay_lines):
+            surface.blit(line, (area.x + 8, area.y + 6 + i * 16))
+            
+        # Rolling graph: one column per frame, the line marks the 60 FPS budget
+        graph = pygame.Rect(area.x + 8, area.bottom - 80, area.width - 16, 72)
+        scale = graph.height / max(2 / FPS, max(self.history))
+        budget_y = graph.bottom - int(scale / FPS)
+        pygame.draw.line(surface, YELLOW, (graph.x, budget_y), (graph.right - 1, budget_y))
+        for i, frame_time in enumerate(list(self.history)[-graph.width:]):
+            color = GREEN if frame_time <= 1 / FPS else RED
+            x = graph.x + i
+            pygame.draw.line(surface, color, (x, graph.bottom - 1), (x, graph.bottom - 1 - int(frame_time * scale)))
+            
+    def export_csv(self, path):
+        with open(path, "w") as f:
+            f.write(",".join(("frame", "frame_ms") + tuple(f"{name}_ms" for name in PROFILE_SECTIONS)) + "\n")
+            for i, row in enumerate(self.rows):
+                f.write(f"{i}," + ",".join(f"{value * 1000:.4f}" for value in row) + "\n")
+
+profiler = FrameProfiler()
+
+# Timed game events (station done, customer mood and leaving, order expiry,
+# next customer) kept in a heap by due time. Game.update runs only what is due
+# instead of every system checking its own timer each tick; cancelled events
+# stay in the heap and are skipped when they come up.
+class TimedEvent:
+    __slots__ = ("due", "callback", "cancelled")
+
+    def __init__(self, due, callback):
+        self.due = due
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class Scheduler:
+    def __init__(self):
+        self.queue = []
+        self.sequence = 0  # Events due at the same time run in the order they were scheduled
+
+    def schedule(self, due, callback):
+        event = TimedEvent(due, callback)
+        heapq.heappush(self.queue, (due, self.sequence, event))
+        self.sequence += 1
+        return event
+
+    def run_due(self, now):
+        # Callbacks may schedule more events; any already due run in this pass too
+        while self.queue and self.queue[0][0] <= now:
+            event = heapq.heappop(self.queue)[2]
+            if not event.cancelled:
+                event.callback()
+
 # Define game states
 GAME_STATES = {
     "MENU": 0,
@@ -330,22 +712,26 @@ class TextBox:
     def show(self, message, color=WHITE, duration=2.0):
         self.message = message
         self.color = color
-        self.timer = time.time()
+        self.timer = game_clock.time()
         self.duration = duration
         
     def update(self):
-        if self.timer > 0 and time.time() - self.timer > self.duration:
+        if self.timer > 0 and game_clock.time() - self.timer > self.duration:
             self.timer = 0
             self.message = ""
             
+    def get_rect(self):
+        text = render_text(font_medium, self.message, self.color)
+        bg_rect = text.get_rect(center=(WIDTH//2, HEIGHT//2 - 100))
+        bg_rect.inflate_ip(20, 10)  # Make background slightly larger
+        return bg_rect
+            
     def draw(self, surface):
         if self.timer > 0:
-            text = font_medium.render(self.message, True, self.color)
+            text = render_text(font_medium, self.message, self.color)
             # Semi-transparent background
-            bg_rect = text.get_rect(center=(WIDTH//2, HEIGHT//2 - 100))
-            bg_rect.inflate_ip(20, 10)  # Make background slightly larger
-            bg_surface = pygame.Surface(bg_rect.size, pygame.SRCALPHA)
-            bg_surface.fill((0, 0, 0, 150))  # Semi-transparent black
+            bg_rect = self.get_rect()
+            bg_surface = surface_pool.filled(bg_rect.size, (0, 0, 0, 150))  # Semi-transparent black
             
             surface.blit(bg_surface, bg_rect.topleft)
             surface.blit(text, text.get_rect(center=(WIDTH//2, HEIGHT//2 - 100)))
@@ -369,7 +755,7 @@ class Button:
         pygame.draw.rect(surface, WHITE, self.rect, 3, border_radius=10)
         
         text_color = GRAY if self.disabled else WHITE
-        text_surf = font_medium.render(self.text, True, text_color)
+        text_surf = render_text(font_medium, self.text, text_color)
         text_rect = text_surf.get_rect(center=self.rect.center)
         surface.blit(text_surf, text_rect)
         
@@ -409,7 +795,7 @@ class Ingredient(pygame.sprite.Sprite):
             return base + random.uniform(-quality_range, quality_range)
         return 1.0  # Default quality
         
-    def update(self, mouse_pos):
+    def update(self, mouse_pos, dt=STEP):
         if self.dragging:
             self.rect.center = mouse_pos
             # Add some physics-based movement
@@ -422,13 +808,13 @@ class Ingredient(pygame.sprite.Sprite):
         
         # Update wobble animation if the ingredient is not being dragged
         if not self.dragging and not self.processing:
-            self.wobble += 0.1 * self.wobble_dir
+            self.wobble += 6 * self.wobble_dir * dt
             if abs(self.wobble) > 2:
                 self.wobble_dir *= -1
             
             # Apply wobble to position if it's in the burger stack
             if self.rect.centery > HEIGHT - 250:  # Only apply wobble to stacked ingredients
-                self.rect.x += self.wobble * 0.5
+                self.rect.x += self.wobble * 30 * dt
             
     def reset_position(self):
         self.rect.center = self.original_pos
@@ -443,13 +829,13 @@ class Ingredient(pygame.sprite.Sprite):
         
     def start_processing(self, process_type, duration):
         self.processing = True
-        self.process_start_time = time.time()
+        self.process_start_time = game_clock.time()
         self.process_time = duration
         
     def is_processing_done(self):
         if not self.processing:
             return False
-        return time.time() - self.process_start_time >= self.process_time
+        return game_clock.time() - self.process_start_time >= self.process_time
         
     def finish_processing(self, new_name=None):
         self.processing = False
@@ -488,9 +874,10 @@ class Ingredient(pygame.sprite.Sprite):
         return False
 
 class CookingStation(pygame.sprite.Sprite):
-    def __init__(self, station_type, x, y):
+    def __init__(self, station_type, x, y, scheduler):
         super().__init__()
         self.station_type = station_type
+        self.scheduler = scheduler
         
         if station_type == "grill":
             self.image = grill_img
@@ -506,7 +893,9 @@ class CookingStation(pygame.sprite.Sprite):
         self.process_start_time = 0
         self.process_time = 0
         self.processing = False
-        self.progress = 0  # 0 to 1
+        self.done_event = None  # Scheduled finish_processing while processing
+        self.progress_at = None  # Game time the cached progress is for
+        self.cached_progress = 0
         self.tool = None  # For cutting board: knife, for grill: spatula
         
         # Set up the tool
@@ -515,15 +904,38 @@ class CookingStation(pygame.sprite.Sprite):
         elif station_type == "cutting_board":
             self.tool = knife_img
             
-    def update(self):
-        if self.processing and self.current_ingredient:
-            current_time = time.time()
-            elapsed = current_time - self.process_start_time
-            self.progress = min(1.0, elapsed / self.process_time)
-            
-            if self.progress >= 1.0:
-                self.finish_processing()
-                
+    @property
+    def progress(self):
+        # 0 to 1; the bar and its dirty-rect signature both read it, so it is
+        # worked out once per tick
+        if not self.processing:
+            return 0
+        now = game_clock.time()
+        if now != self.progress_at:
+            self.cached_progress = min(1.0, (now - self.process_start_time) / self.process_time)
+            self.progress_at = now
+        return self.cached_progress
+
+    def begin(self, ingredient):
+        self.current_ingredient = ingredient
+        self.process_start_time = game_clock.time()
+        self.processing = True
+        self.progress_at = None
+        # Nothing polls the station: it is woken when the ingredient is done.
+        # (Overcooking past 1.0 would be a second event here, but processing
+        # always finishes right at 1.0, so the overcooked branch never fires)
+        self.done_event = self.scheduler.schedule(self.process_start_time + self.process_time, self.finish_processing)
+
+    def take_ingredient(self):
+        # The player grabbed the ingredient before it was done
+        ingredient = self.current_ingredient
+        if self.done_event:
+            self.done_event.cancel()
+            self.done_event = None
+        self.current_ingredient = None
+        self.processing = False
+        return ingredient
+
     def start_processing(self, ingredient):
         if not ingredient:
             return False
@@ -540,10 +952,7 @@ class CookingStation(pygame.sprite.Sprite):
                 elif process_type == "toast":
                     self.process_time = props.get("cook_time", 3.0)
                     
-                self.current_ingredient = ingredient
-                self.process_start_time = time.time()
-                self.processing = True
-                self.progress = 0
+                self.begin(ingredient)
                 sizzle_sound.play(-1)  # Loop the sizzle sound
                 return True
                 
@@ -551,10 +960,7 @@ class CookingStation(pygame.sprite.Sprite):
             if ingredient.can_process("slice"):
                 props = INGREDIENT_PROPERTIES[ingredient.name]
                 self.process_time = props.get("slice_time", 2.0)
-                self.current_ingredient = ingredient
-                self.process_start_time = time.time()
-                self.processing = True
-                self.progress = 0
+                self.begin(ingredient)
                 chop_sound.play()
                 return True
                 
@@ -595,7 +1001,29 @@ class CookingStation(pygame.sprite.Sprite):
             
         self.processing = False
         self.current_ingredient = None
-        self.progress = 0
+        self.done_event = None
+        
+    def tool_offset(self):
+        # Knife moves up and down, spatula moves side to side
+        # (whole pixels, so the dirty-rect signature matches what is drawn)
+        if self.station_type == "cutting_board":
+            return 0, int(math.sin(game_clock.render_time() * 10) * 10)
+        elif self.station_type == "grill":
+            return int(math.sin(game_clock.render_time() * 5) * 15), 0
+        return 0, 0
+        
+    def draw_bounds(self):
+        # Everything draw() touches: the station plus the progress bar above it
+        # (the ingredient and the tool animation stay inside the station)
+        return pygame.Rect(self.rect.x, self.rect.y - 20, self.rect.width, self.rect.height + 20)
+        
+    def draw_signature(self):
+        ingredient_image = self.current_ingredient.image if self.current_ingredient else None
+        if not self.processing:
+            return (ingredient_image, False)
+        offset_x, offset_y = self.tool_offset()
+        return (ingredient_image, True, int(self.rect.width * 0.8 * self.progress), self.progress <= 1.0,
+                offset_x, offset_y)
         
     def draw(self, surface):
         # Draw the station
@@ -628,14 +1056,10 @@ class CookingStation(pygame.sprite.Sprite):
                 tool_y = self.rect.centery - self.tool.get_height()//2
                 
                 # Animate the tool based on progress
-                if self.station_type == "cutting_board":
-                    # Knife moves up and down
-                    offset_y = math.sin(time.time() * 10) * 10
-                    surface.blit(self.tool, (tool_x, tool_y + offset_y))
-                elif self.station_type == "grill":
-                    # Spatula moves side to side
-                    offset_x = math.sin(time.time() * 5) * 15
-                    surface.blit(self.tool, (tool_x + offset_x, tool_y))
+                offset_x, offset_y = self.tool_offset()
+                surface.blit(self.tool, (tool_x + offset_x, tool_y + offset_y))
+
+BONUS_TEXT_SPEED = 60  # Pixels per second
 
 class BonusText(pygame.sprite.Sprite):
     def __init__(self, value, x, y):
@@ -643,29 +1067,38 @@ class BonusText(pygame.sprite.Sprite):
         self.value = value
         self.text = f"+{value}"
         self.color = YELLOW
-        self.creation_time = time.time()
+        self.creation_time = game_clock.time()
         self.lifespan = 2.0  # Seconds to live
         self.y = y
+        self.previous_y = y
         self.font = font_medium
         self.update_position(x, y)
         
     def update_position(self, x, y):
-        self.image = self.font.render(self.text, True, self.color)
+        self.image = render_text(self.font, self.text, self.color)
         self.rect = self.image.get_rect(center=(x, y))
         
-    def update(self):
+    def update(self, dt=STEP):
         # Float upward
-        self.y -= 1
+        self.previous_y = self.y
+        self.y -= BONUS_TEXT_SPEED * dt
         self.rect.y = int(self.y)
         
         # Fade out when nearing end of lifespan
-        age = time.time() - self.creation_time
+        age = game_clock.time() - self.creation_time
         if age > self.lifespan * 0.7:
             alpha = int(255 * (1 - (age - self.lifespan * 0.7) / (self.lifespan * 0.3)))
             self.color = (YELLOW[0], YELLOW[1], YELLOW[2], alpha)
             
         if age >= self.lifespan:
             self.kill()
+            
+    def render_rect(self):
+        # Position between the last two steps, for smooth motion above the update rate
+        if self.previous_y == self.y:
+            return self.rect
+        y = self.previous_y + (self.y - self.previous_y) * game_clock.alpha
+        return self.rect.move(0, int(y) - self.rect.y)
 
 class Customer(pygame.sprite.Sprite):
     def __init__(self, difficulty=1):
@@ -677,32 +1110,32 @@ class Customer(pygame.sprite.Sprite):
         self.rect = self.image.get_rect()
         self.order = None
         self.served = False
-        self.waiting_time = 0
+        self.arrival_time = game_clock.time()
         self.patience = 60  # seconds
         self.tip = 0
-        
-    def update(self):
-        if not self.served and self.order:
-            self.waiting_time += 1/60  # Add one frame worth of seconds
-            
-            # Update mood based on waiting time
-            patience_percent = self.waiting_time / self.patience
-            
-            if patience_percent < 0.5:
-                new_mood = "neutral"
-            elif patience_percent < 0.8:
-                new_mood = "neutral"  # Still neutral but getting impatient
-            else:
-                new_mood = "angry"
-                
-            if new_mood != self.mood:
-                self.mood = new_mood
-                self.image = customer_images[self.mood]
-                
-            # Check if customer leaves due to impatience
-            if self.waiting_time >= self.patience:
-                return "left"
-            
+
+    # Seconds waited since the customer's first update (arrival_time); the game
+    # schedules the mood change and the leaving time instead of counting this
+    # up every tick
+    @property
+    def waiting_time(self):
+        return game_clock.time() - self.arrival_time
+
+    def refresh_mood(self, waited):
+        # Update mood based on waiting time
+        patience_percent = waited / self.patience
+
+        if patience_percent < 0.5:
+            new_mood = "neutral"
+        elif patience_percent < 0.8:
+            new_mood = "neutral"  # Still neutral but getting impatient
+        else:
+            new_mood = "angry"
+
+        if new_mood != self.mood:
+            self.mood = new_mood
+            self.image = customer_images[self.mood]
+
     def serve_burger(self, burger_stack):
         if not self.order or self.served:
                 return False
@@ -806,14 +1239,25 @@ class Order:
         
         self.time_limit = max(60 - (difficulty * 5), 30)  # Decreasing time based on difficulty
         self.score_value = 50 + (difficulty * 25)  # Higher score for harder orders
-        self.start_time = time.time()
+        self.start_time = game_clock.time()
         self.completed = False
-        
+        self.time_label = CounterText(font_small, "{}s", BLACK)
+        # time_remaining() as of game time remaining_at: the order card asks
+        # for it several times a frame, so it is worked out once per tick
+        self.remaining = self.time_limit
+        self.remaining_at = None
+
+    def expiry_time(self):
+        return self.start_time + self.time_limit
+
     def time_remaining(self):
         if self.completed:
             return self.time_limit  # Return full time if completed
-        elapsed = time.time() - self.start_time
-        return max(0, self.time_limit - elapsed)
+        now = game_clock.time()
+        if now != self.remaining_at:
+            self.remaining = max(0, self.time_limit - (now - self.start_time))
+            self.remaining_at = now
+        return self.remaining
     
     def time_percent(self):
         return self.time_remaining() / self.time_limit * 100
@@ -857,6 +1301,11 @@ class Order:
     def complete(self):
         self.completed = True
         
+    def card_signature(self, width=180):
+        # What the card shows: the order, the seconds left and the time bar
+        percent = self.time_percent()
+        return (self, int(self.time_remaining()), int((width - 40) * percent / 100), percent < 30, percent < 60)
+        
     def draw(self, surface, x, y, width=180, height=300):
         # Draw order card
         order_card = pygame.Rect(x, y, width, height)
@@ -864,7 +1313,7 @@ class Order:
         pygame.draw.rect(surface, WHITE, order_card, 3, border_radius=10)
         
         # Draw order title
-        order_title = font_small.render("ORDER", True, BLACK)
+        order_title = render_text(font_small, "ORDER", BLACK)
         surface.blit(order_title, (order_card.centerx - order_title.get_width()//2, order_card.y + 20))
         
         # Draw time bar
@@ -885,16 +1334,14 @@ class Order:
         pygame.draw.rect(surface, bar_color, time_bar_fill)
         
         # Draw time text
-        time_text = font_small.render(f"{int(self.time_remaining())}s", True, BLACK)
+        time_text = self.time_label.render(int(self.time_remaining()))
         surface.blit(time_text, (order_card.centerx - time_text.get_width()//2, order_card.y + 85))
         
         # Draw ingredients list
         y_offset = order_card.y + 120
         for ingredient_name in self.ingredients:
             if ingredient_name in ingredient_images:
-                img = pygame.transform.scale(ingredient_images[ingredient_name], 
-                                            (ingredient_images[ingredient_name].get_width() // 2,
-                                             ingredient_images[ingredient_name].get_height() // 2))
+                img = get_scaled_image(ingredient_name, ORDER_THUMBNAIL_SCALE)
                 surface.blit(img, (order_card.centerx - img.get_width()//2, y_offset))
                 y_offset += img.get_height() + 5
 
@@ -938,14 +1385,32 @@ class TutorialStep:
         self.completion_action = completion_action  # Function that returns True when step is complete
         self.completed = False
         
+        # Layout is fixed: computed once, also used for hit-testing the continue button
+        self.card_rect = pygame.Rect(WIDTH//2 - 200, HEIGHT//2 - 150, 400, 300)
+        self.continue_button = pygame.Rect(self.card_rect.centerx - 75, self.card_rect.bottom - 60, 150, 40)
+        
+    def build_highlight(self):
+        # Draw a semi-transparent highlight around the target
+        highlight = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        highlight.fill((0, 0, 0, 150))  # Dark overlay
+        
+        # Cut out the target area
+        target_rect = pygame.Rect(self.target_area)
+        target_rect.inflate_ip(20, 20)  # Make highlight slightly larger than target
+        highlight.fill((0, 0, 0, 0), target_rect)  # Transparent hole
+        
+        # Draw a glowing border around the target
+        pygame.draw.rect(highlight, (255, 255, 0, 180), target_rect, 4, border_radius=5)
+        return highlight
+        
     def draw(self, surface):
         # Draw tutorial card
-        tutorial_card = pygame.Rect(WIDTH//2 - 200, HEIGHT//2 - 150, 400, 300)
+        tutorial_card = self.card_rect
         pygame.draw.rect(surface, LIGHT_BLUE, tutorial_card, border_radius=10)
         pygame.draw.rect(surface, WHITE, tutorial_card, 3, border_radius=10)
         
         # Draw title
-        title_text = font_medium.render(self.title, True, BLACK)
+        title_text = render_text(font_medium, self.title, BLACK)
         surface.blit(title_text, (tutorial_card.centerx - title_text.get_width()//2, tutorial_card.y + 20))
         
         # Draw description (multi-line)
@@ -953,39 +1418,28 @@ class TutorialStep:
         lines = self.description.split('\n')
         
         for i, line in enumerate(lines):
-            line_text = font_small.render(line, True, BLACK)
+            line_text = render_text(font_small, line, BLACK)
             surface.blit(line_text, (tutorial_card.centerx - line_text.get_width()//2, 
                                     tutorial_card.y + 70 + i * line_height))
         
         # Draw continue button
-        continue_button = pygame.Rect(tutorial_card.centerx - 75, tutorial_card.bottom - 60, 150, 40)
+        continue_button = self.continue_button
         pygame.draw.rect(surface, (100, 100, 200), continue_button, border_radius=5)
         pygame.draw.rect(surface, WHITE, continue_button, 2, border_radius=5)
         
-        button_text = font_small.render("Continue", True, WHITE)
+        button_text = render_text(font_small, "Continue", WHITE)
         surface.blit(button_text, (continue_button.centerx - button_text.get_width()//2, 
                                   continue_button.centery - button_text.get_height()//2))
         
         # Highlight target area if any
         if self.target_area:
-            # Draw a semi-transparent highlight around the target
-            highlight = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            highlight.fill((0, 0, 0, 150))  # Dark overlay
-            
-            # Cut out the target area
-            target_rect = pygame.Rect(self.target_area)
-            target_rect.inflate_ip(20, 20)  # Make highlight slightly larger than target
-            highlight.fill((0, 0, 0, 0), target_rect)  # Transparent hole
-            
-            # Draw a glowing border around the target
-            pygame.draw.rect(highlight, (255, 255, 0, 180), target_rect, 4, border_radius=5)
-            
+            highlight = surface_pool.get(("highlight", tuple(pygame.Rect(self.target_area))), self.build_highlight)
             surface.blit(highlight, (0, 0))
             
         return continue_button
 
 class Game:
-    def __init__(self):
+    def __init__(self, game_data=None):
         self.state = GAME_STATES["MENU"]
         self.score = 0
         self.level = 1
@@ -999,15 +1453,18 @@ class Game:
         self.text_box = TextBox()
         self.bonus_texts = pygame.sprite.Group()
         self.time_bonus = 0
-        self.game_data = load_game_data()
+        self.game_data = game_data if game_data is not None else load_game_data()
+        self.game_over_reason = None
+        self.mouse_override = None  # Simulated pointer position (bots, scripted input)
         self.customers = []
         self.current_customer = None
         self.cooking_stations = pygame.sprite.Group()
         self.dragged_to_station = None
+        self.scheduler = Scheduler()
         
         # Set up cooking stations
-        self.grill = CookingStation("grill", WIDTH - 200, 150)
-        self.cutting_board = CookingStation("cutting_board", WIDTH - 200, 300)
+        self.grill = CookingStation("grill", WIDTH - 200, 150, self.scheduler)
+        self.cutting_board = CookingStation("cutting_board", WIDTH - 200, 300, self.scheduler)
         self.cooking_stations.add(self.grill, self.cutting_board)
         
         # Create buttons
@@ -1016,6 +1473,13 @@ class Game:
         self.shop_button = Button(WIDTH//2 - 100, HEIGHT//2 + 120, 200, 60, "SHOP")
         self.back_button = Button(50, HEIGHT - 70, 100, 50, "BACK")
         
+        # HUD counters: re-rendered only when their value changes
+        self.score_label = CounterText(font_medium, "Score: {}", WHITE)
+        self.level_label = CounterText(font_medium, "Level: {}", WHITE)
+        self.money_label = CounterText(font_medium, "${}", YELLOW)
+        self.shop_money_label = CounterText(font_medium, "Money: ${}", YELLOW)
+        self.high_score_label = CounterText(font_small, "High Score: {}", WHITE)
+        
         # Shop items
         self.shop_items = []
         
@@ -1138,8 +1602,10 @@ class Game:
         self.create_new_customer()
         self.text_box.show("Let's make some burgers!", GREEN, 3.0)
     
-    def create_new_customer(self):
+    def create_new_customer(self, arrival_time=None):
         self.current_customer = Customer(difficulty=self.level)
+        if arrival_time is not None:
+            self.current_customer.arrival_time = arrival_time
         self.current_customer.order = Order(difficulty=self.level)
         self.current_customer.rect.center = (WIDTH - 80, 80)
         
@@ -1147,14 +1613,74 @@ class Game:
         patience_upgrade = self.game_data["upgrades"]["customer_patience"]
         self.current_customer.patience += patience_upgrade * 10  # +10 seconds per level
         
+        # Wake up when the customer gets impatient, leaves, or the order runs out
+        # (a step's update sees the waiting time including that step)
+        customer = self.current_customer
+        self.scheduler.schedule(customer.arrival_time + customer.patience * 0.8 - STEP, lambda: self.customer_mood_changed(customer))
+        self.scheduler.schedule(customer.arrival_time + customer.patience - STEP, lambda: self.customer_left(customer))
+        self.scheduler.schedule(customer.order.expiry_time(), lambda: self.order_expired(customer))
+        
         self.text_box.show(f"New customer (Level {self.level})!", GREEN, 2.0)
     
+    # Scheduled events carry the customer they were set for; by the time they
+    # come up that customer may have been served or replaced
+    def waiting(self, customer):
+        return customer is self.current_customer and not customer.served
+    
+    def customer_mood_changed(self, customer):
+        if self.waiting(customer):
+            customer.refresh_mood(customer.waiting_time + STEP)  # The step being run counts
+    
+    def customer_left(self, customer):
+        # If the order already ran out this step, that is how the game ended
+        if self.waiting(customer) and self.state == GAME_STATES["PLAYING"]:
+            customer_angry_sound.play()
+            self.text_box.show("Customer left angry!", RED, 2.0)
+            self.game_over("customer_left")
+    
+    def order_expired(self, customer):
+        if not self.waiting(customer):
+            return
+        if self.next_level_time > 0:
+            # A rejected burger is still on the table: check again once it's cleared
+            self.scheduler.schedule(math.nextafter(self.next_level_time, math.inf), lambda: self.order_expired(customer))
+            return
+        self.text_box.show("Time's up! Game Over.", RED, 3.0)
+        self.game_over("order_expired")
+    
+    def schedule_next_level(self, delay):
+        due = self.next_level_time = game_clock.time() + delay
+        # Runs on the first step strictly after next_level_time
+        self.scheduler.schedule(math.nextafter(due, math.inf), lambda: self.next_level(due))
+    
+    def next_level(self, due):
+        if self.next_level_time != due:
+            return  # Rescheduled by a later burger, or the game ended
+        if self.current_customer and self.current_customer.served:
+            # Start a new level with a new customer, who starts waiting from the next step
+            levelup_sound.play()
+            self.create_new_customer(arrival_time=game_clock.time() + STEP)
+        else:
+            # Clear failed burger and try again
+            self.clear_burger_stack()
+        
+        self.next_level_time = 0
+    
+    def get_mouse_pos(self):
+        if self.mouse_override is not None:
+            return self.mouse_override
+        return pygame.mouse.get_pos()
+    
     def handle_events(self, events):
-        mouse_pos = pygame.mouse.get_pos()
+        mouse_pos = self.get_mouse_pos()
         
         for event in events:
             if event.type == pygame.QUIT:
                 return False
+
+            # Window hidden or unfocused: treat it as a pause and get the save onto disk
+            if event.type in (pygame.WINDOWFOCUSLOST, pygame.WINDOWMINIMIZED):
+                game_saver.request_flush()
                 
             if self.state == GAME_STATES["MENU"]:
                 if self.play_button.is_clicked(event):
@@ -1165,7 +1691,7 @@ class Game:
             elif self.state == GAME_STATES["TUTORIAL"]:
                 # Handle tutorial interaction
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    continue_button = self.tutorial_steps[self.current_tutorial_step].draw(pygame.Surface((0,0)))
+                    continue_button = self.tutorial_steps[self.current_tutorial_step].continue_button
                     if continue_button.collidepoint(event.pos):
                         self.next_tutorial_step()
                     
@@ -1203,10 +1729,8 @@ class Game:
                     for station in self.cooking_stations:
                         if station.rect.collidepoint(event.pos) and station.current_ingredient:
                             # Take the ingredient from the station
-                            self.selected_ingredient = station.current_ingredient
+                            self.selected_ingredient = station.take_ingredient()
                             self.selected_ingredient.start_drag()
-                            station.current_ingredient = None
-                            station.processing = False
                             break
                 
                 elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
@@ -1303,248 +1827,514 @@ class Game:
             self.level += 1
             
             # Wait before next customer
-            self.next_level_time = time.time() + 2  # Wait 2 seconds before next customer
+            self.schedule_next_level(2)  # Wait 2 seconds before next customer
         else:
             # Wrong burger!
             wrong_sound.play()
             self.text_box.show("Wrong burger! Try again.", RED, 2.0)
+            # The angry look only lasts until their mood is worked out again this step
+            customer = self.current_customer
+            self.scheduler.schedule(game_clock.time(), lambda: self.customer_mood_changed(customer))
             # Clear the stack after a delay
-            self.next_level_time = time.time() + 1.5
+            self.schedule_next_level(1.5)
     
+    def game_over(self, reason):
+        self.state = GAME_STATES["GAME_OVER"]
+        self.game_over_reason = reason
+        game_saver.request_flush()
+
     def clear_burger_stack(self):
         self.burger_stack = []
         self.next_level_time = 0
     
-    def update(self):
+    # One fixed step of game logic; everything advances by the same dt
+    def update(self, dt=STEP):
         # Update text box
         self.text_box.update()
         
         # Update bonus texts
-        self.bonus_texts.update()
+        self.bonus_texts.update(dt)
         
         if self.state == GAME_STATES["PLAYING"]:
             # Update ingredients
-            self.ingredients_shelf.update(pygame.mouse.get_pos())
-            
-            # Update cooking stations
-            self.cooking_stations.update()
+            mouse_pos = self.get_mouse_pos()
+            self.ingredients_shelf.update(mouse_pos, dt)
             
             if self.selected_ingredient:
-                self.selected_ingredient.update(pygame.mouse.get_pos())
+                self.selected_ingredient.update(mouse_pos, dt)
             
-            # Update customer
-            if self.current_customer:
-                customer_status = self.current_customer.update()
-                
-                # Check if customer left due to impatience
-                if customer_status == "left":
-                    customer_angry_sound.play()
-                    self.text_box.show("Customer left angry!", RED, 2.0)
-                    self.state = GAME_STATES["GAME_OVER"]
-            
-            # Check if it's time for a new customer
-            if self.next_level_time > 0 and time.time() > self.next_level_time:
-                if self.current_customer and self.current_customer.served:
-                    # Start a new level with a new customer
-                    levelup_sound.play()
-                    self.create_new_customer()
-                else:
-                    # Clear failed burger and try again
-                    self.clear_burger_stack()
-                
-                self.next_level_time = 0
-            
-            # Check if the current order has expired
-            if self.current_customer and self.current_customer.order.is_expired() and self.next_level_time == 0:
-                self.text_box.show("Time's up! Game Over.", RED, 3.0)
-                self.state = GAME_STATES["GAME_OVER"]
+            # Stations finishing, customers changing mood or leaving, orders
+            # running out and the next customer arriving are all timed events
+            self.scheduler.run_due(game_clock.time())
                 
             # Update high score if needed
             if self.score > self.game_data["high_score"]:
                 self.game_data["high_score"] = self.score
                 save_game_data(self.game_data)
     
-    def draw(self, surface):
+    # A frame is a static layer plus the elements drawn on top of it, in order.
+    # Each element is (key, rect, signature, draw): `rect` bounds everything
+    # `draw` touches and `signature` changes whenever its look changes, so the
+    # dirty-rect renderer knows which areas to redraw
+    def frame(self):
         if self.state == GAME_STATES["MENU"]:
-            # Draw menu
-            surface.blit(menu_bg, (0, 0))
-            
-            # Draw title
-            title_text = font_large.render("Burger Bun Bakery", True, WHITE)
-            subtitle_text = font_medium.render("Simulator", True, WHITE)
-            
-            surface.blit(title_text, (WIDTH//2 - title_text.get_width()//2, HEIGHT//3))
-            surface.blit(subtitle_text, (WIDTH//2 - subtitle_text.get_width()//2, HEIGHT//3 + 80))
-            
-            # Draw high score
-            high_score_text = font_small.render(f"High Score: {self.game_data['high_score']}", True, WHITE)
-            surface.blit(high_score_text, (WIDTH//2 - high_score_text.get_width()//2, HEIGHT//3 + 130))
-            
-            # Draw play button
-            self.play_button.draw(surface)
-            
-            # Draw shop button
-            self.shop_button.draw(surface)
-            
-            # Draw instructions
-            instructions = [
-                "- Drag ingredients to build burgers",
-                "- Use cooking stations to prepare ingredients",
-                "- Follow customer orders carefully",
-                "- Earn money for upgrades and new ingredients!"
-            ]
-            
-            for i, line in enumerate(instructions):
-                instr_text = font_small.render(line, True, WHITE)
-                surface.blit(instr_text, (WIDTH//2 - instr_text.get_width()//2, HEIGHT//2 + 190 + i*30))
-            
+            return ("menu",), self.draw_menu_layer, self.menu_elements()
         elif self.state == GAME_STATES["TUTORIAL"]:
-            # Draw game background
-            surface.blit(background, (0, 0))
-            
-            # Draw current tutorial step
-            if self.current_tutorial_step < len(self.tutorial_steps):
-                step = self.tutorial_steps[self.current_tutorial_step]
-                step.draw(surface)
-            
+            return ("tutorial", self.current_tutorial_step), self.draw_tutorial_layer, []
         elif self.state == GAME_STATES["SHOP"]:
-            # Draw shop background
-            surface.blit(shop_bg, (0, 0))
-            
-            # Draw title
-    
-            title_text = font_large.render("Shop", True, WHITE)
-            surface.blit(title_text, (WIDTH//2 - title_text.get_width()//2, 50))
-            
-            # Draw money
-            money_text = font_medium.render(f"Money: ${self.money}", True, YELLOW)
-            surface.blit(money_text, (WIDTH//2 - money_text.get_width()//2, 120))
-            
-            # Draw back button
-            self.back_button.draw(surface)
-            
-            # Draw shop items in a grid
-            items_per_row = 3
-            item_width = 200
-            item_height = 150
-            item_margin = 20
-            start_x = (WIDTH - (items_per_row * (item_width + item_margin) - item_margin)) // 2
-            start_y = 180
-            
-            for i, item in enumerate(self.shop_items):
-                row = i // items_per_row
-                col = i % items_per_row
-                
-                x = start_x + col * (item_width + item_margin)
-                y = start_y + row * (item_height + item_margin)
-                
-                # Create item card
-                card_rect = pygame.Rect(x, y, item_width, item_height)
-                
-                # Create or update button
-                if not item.button:
-                    item.button = Button(x + item_width//2 - 50, y + item_height - 40, 100, 30, f"${item.price}")
-                else:
-                    item.button.rect = pygame.Rect(x + item_width//2 - 50, y + item_height - 40, 100, 30)
-                    item.button.text = f"${item.price}"
-                
-                # Draw item card
-                pygame.draw.rect(surface, LIGHT_BLUE, card_rect, border_radius=10)
-                pygame.draw.rect(surface, WHITE, card_rect, 2, border_radius=10)
-                
-                # Draw item name
-                name_text = font_small.render(item.name, True, BLACK)
-                surface.blit(name_text, (x + item_width//2 - name_text.get_width()//2, y + 10))
-                
-                # Draw item description (truncated if needed)
-                desc_text = font_small.render(item.description[:20] + "..." if len(item.description) > 20 else item.description, True, BLACK)
-                surface.blit(desc_text, (x + item_width//2 - desc_text.get_width()//2, y + 40))
-                
-                # Draw purchase button
-                item.button.disabled = not item.can_afford(self.money)
-                item.button.draw(surface)
-            
+            cards = self.layout_shop()
+            shop_key = tuple((item.name, item.description) for item, _ in cards)
+            return ("shop", shop_key), lambda surface: self.draw_shop_layer(surface, cards), self.shop_elements()
         elif self.state == GAME_STATES["PLAYING"] or self.state == GAME_STATES["GAME_OVER"]:
-            # Draw game background
-            surface.blit(background, (0, 0))
-            
-            # Draw table at the bottom
-            surface.blit(table_img, (0, HEIGHT - 200))
-            
-            # Draw score, level and money at the top center
-            # Create a background for score text to make it visible
-            header_bg = pygame.Surface((400, 70), pygame.SRCALPHA)
-            header_bg.fill((0, 0, 0, 150))  # Semi-transparent black
+            return ("playing",), self.draw_playing_layer, self.playing_elements()
+        return (None,), lambda surface: None, []
+    
+    def draw(self, surface):
+        layer_key, draw_layer, elements = self.frame()
+        start = profiler.mark()
+        draw_layer(surface)
+        profiler.lap("draw:background", start)
+        for key, _, _, draw_element in profiler.with_overlay(elements):
+            if profiler.enabled:
+                profiler.draw_element(surface, key, draw_element)
+            else:
+                draw_element(surface)
+    
+    def draw_menu_layer(self, surface):
+        # Draw menu
+        surface.blit(menu_bg, (0, 0))
+        
+        # Draw title
+        title_text = render_text(font_large, "Burger Bun Bakery", WHITE)
+        subtitle_text = render_text(font_medium, "Simulator", WHITE)
+        
+        surface.blit(title_text, (WIDTH//2 - title_text.get_width()//2, HEIGHT//3))
+        surface.blit(subtitle_text, (WIDTH//2 - subtitle_text.get_width()//2, HEIGHT//3 + 80))
+        
+        # Draw instructions
+        instructions = [
+            "- Drag ingredients to build burgers",
+            "- Use cooking stations to prepare ingredients",
+            "- Follow customer orders carefully",
+            "- Earn money for upgrades and new ingredients!"
+        ]
+        
+        for i, line in enumerate(instructions):
+            instr_text = render_text(font_small, line, WHITE)
+            surface.blit(instr_text, (WIDTH//2 - instr_text.get_width()//2, HEIGHT//2 + 190 + i*30))
+    
+    def menu_elements(self):
+        # Draw high score
+        high_score = self.game_data['high_score']
+        high_score_text = self.high_score_label.render(high_score)
+        return [
+            text_element("high_score", high_score_text,
+                         (WIDTH//2 - high_score_text.get_width()//2, HEIGHT//3 + 130), high_score),
+            button_element("play_button", self.play_button),
+            button_element("shop_button", self.shop_button),
+        ]
+    
+    def draw_tutorial_layer(self, surface):
+        # Draw game background
+        surface.blit(background, (0, 0))
+        
+        # Draw current tutorial step
+        if self.current_tutorial_step < len(self.tutorial_steps):
+            step = self.tutorial_steps[self.current_tutorial_step]
+            step.draw(surface)
+    
+    def layout_shop(self):
+        # Place shop items in a grid; returns (item, card rect) pairs
+        items_per_row = 3
+        item_width = 200
+        item_height = 150
+        item_margin = 20
+        start_x = (WIDTH - (items_per_row * (item_width + item_margin) - item_margin)) // 2
+        start_y = 180
+        
+        cards = []
+        for i, item in enumerate(self.shop_items):
+            row = i // items_per_row
+            col = i % items_per_row
+            
+            x = start_x + col * (item_width + item_margin)
+            y = start_y + row * (item_height + item_margin)
+            
+            # Create or update button
+            if not item.button:
+                item.button = Button(x + item_width//2 - 50, y + item_height - 40, 100, 30, f"${item.price}")
+            else:
+                item.button.rect = pygame.Rect(x + item_width//2 - 50, y + item_height - 40, 100, 30)
+                item.button.text = f"${item.price}"
+            item.button.disabled = not item.can_afford(self.money)
             
-            surface.blit(header_bg, (WIDTH//2 - 200, 10))
+            cards.append((item, pygame.Rect(x, y, item_width, item_height)))
+        return cards
+    
+    def draw_shop_layer(self, surface, cards):
+        # Draw shop background
+        surface.blit(shop_bg, (0, 0))
+        
+        # Draw title
+        title_text = render_text(font_large, "Shop", WHITE)
+        surface.blit(title_text, (WIDTH//2 - title_text.get_width()//2, 50))
+        
+        for item, card_rect in cards:
+            # Draw item card
+            pygame.draw.rect(surface, LIGHT_BLUE, card_rect, border_radius=10)
+            pygame.draw.rect(surface, WHITE, card_rect, 2, border_radius=10)
             
-            score_text = font_medium.render(f"Score: {self.score}", True, WHITE)
-            level_text = font_medium.render(f"Level: {self.level}", True, WHITE)
-            money_text = font_medium.render(f"${self.money}", True, YELLOW)
+            # Draw item name
+            name_text = render_text(font_small, item.name, BLACK)
+            surface.blit(name_text, (card_rect.centerx - name_text.get_width()//2, card_rect.y + 10))
             
-            surface.blit(score_text, (WIDTH//2 - 150, 15))
-            surface.blit(level_text, (WIDTH//2 - 150, 50))
+            # Draw item description (truncated if needed)
+            desc_text = render_text(font_small, item.description[:20] + "..." if len(item.description) > 20 else item.description, BLACK)
+            surface.blit(desc_text, (card_rect.centerx - desc_text.get_width()//2, card_rect.y + 40))
+    
+    def shop_elements(self):
+        # Draw money
+        money_text = self.shop_money_label.render(self.money)
+        elements = [
+            text_element("money", money_text, (WIDTH//2 - money_text.get_width()//2, 120), self.money),
+            button_element("back_button", self.back_button),
+        ]
+        
+        # Draw purchase buttons
+        for i, item in enumerate(self.shop_items):
+            elements.append(button_element(("shop_item", i), item.button))
+        return elements
+    
+    def draw_playing_layer(self, surface):
+        # Draw game background
+        surface.blit(background, (0, 0))
+        
+        # Draw table at the bottom
+        surface.blit(table_img, (0, HEIGHT - 200))
+        
+        # Draw score, level and money at the top center
+        # Create a background for score text to make it visible
+        header_bg = surface_pool.filled((400, 70), (0, 0, 0, 150))  # Semi-transparent black
+        
+        surface.blit(header_bg, (WIDTH//2 - 200, 10))
+    
+    def playing_elements(self):
+        score_text = self.score_label.render(self.score)
+        level_text = self.level_label.render(self.level)
+        money_text = self.money_label.render(self.money)
+        money_rect = money_text.get_rect(topleft=(WIDTH//2 + 100, 35)).union(coin_img.get_rect(topleft=(WIDTH//2 + 80, 40)))
+        
+        def draw_money(surface):
             surface.blit(money_text, (WIDTH//2 + 100, 35))
             surface.blit(coin_img, (WIDTH//2 + 80, 40))
-            
-            # Draw cooking stations
-            for station in self.cooking_stations:
-                station.draw(surface)
-            
-            # Draw customer
-            if self.current_customer:
-                surface.blit(self.current_customer.image, self.current_customer.rect)
-            
-            # Draw order
-            if self.current_customer and self.current_customer.order:
-                self.current_customer.order.draw(surface, WIDTH - 200, 20)
-            
-            # Draw burger stack
-            for ingredient in self.burger_stack:
-                surface.blit(ingredient.image, ingredient.rect)
-            
-            # Draw ingredients shelf
-            self.ingredients_shelf.draw(surface)
-            
-            # Draw dragged ingredient (should be on top of everything)
-            if self.selected_ingredient:
-                surface.blit(self.selected_ingredient.image, self.selected_ingredient.rect)
-            
-            # Draw bonus texts
-            self.bonus_texts.draw(surface)
-            
-            # Draw text box
-            self.text_box.draw(surface)
-            
-            # Draw game over
-            if self.state == GAME_STATES["GAME_OVER"]:
-                # Semi-transparent overlay
-                overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-                overlay.fill((0, 0, 0, 180))
-                surface.blit(overlay, (0, 0))
-                
-                # Game over text
-                gameover_text = font_large.render("Game Over!", True, WHITE)
-                score_text = font_medium.render(f"Final Score: {self.score}", True, WHITE)
-                level_text = font_medium.render(f"You reached Level {self.level}", True, WHITE)
-                money_text = font_medium.render(f"Money earned: ${self.money - self.game_data['money']}", True, YELLOW)
-                
-                surface.blit(gameover_text, (WIDTH//2 - gameover_text.get_width()//2, HEIGHT//3))
-                surface.blit(score_text, (WIDTH//2 - score_text.get_width()//2, HEIGHT//3 + 80))
-                surface.blit(level_text, (WIDTH//2 - level_text.get_width()//2, HEIGHT//3 + 130))
-                surface.blit(money_text, (WIDTH//2 - money_text.get_width()//2, HEIGHT//3 + 180))
-                
-                # Draw retry button
-                self.retry_button.draw(surface)
-                
-                # Draw shop button
-                self.shop_button.rect.y = self.retry_button.rect.bottom + 20
-                self.shop_button.draw(surface)
+        
+        elements = [
+            text_element("score", score_text, (WIDTH//2 - 150, 15), self.score),
+            text_element("level", level_text, (WIDTH//2 - 150, 50), self.level),
+            ("money", money_rect, self.money, draw_money),
+        ]
+        
+        # Draw cooking stations
+        for i, station in enumerate(self.cooking_stations):
+            elements.append((("station", i), station.draw_bounds(), station.draw_signature(), station.draw))
+        
+        # Draw customer
+        if self.current_customer:
+            elements.append(image_element("customer", self.current_customer.image, self.current_customer.rect))
+        
+        # Draw order
+        if self.current_customer and self.current_customer.order:
+            order = self.current_customer.order
+            elements.append(("order", pygame.Rect(WIDTH - 200, 20, 180, 300), order.card_signature(),
+                             lambda surface: order.draw(surface, WIDTH - 200, 20)))
+        
+        # Draw burger stack
+        for i, ingredient in enumerate(self.burger_stack):
+            elements.append(image_element(("stack", i), ingredient.image, ingredient.rect))
+        
+        # Draw ingredients shelf
+        for i, ingredient in enumerate(self.ingredients_shelf):
+            elements.append(image_element(("shelf", i), ingredient.image, ingredient.rect))
+        
+        # Draw dragged ingredient (should be on top of everything) where the
+        # pointer is now, which may be newer than the last update step
+        if self.selected_ingredient:
+            dragged_rect = self.selected_ingredient.rect.copy()
+            dragged_rect.center = self.get_mouse_pos()
+            elements.append(image_element("dragged", self.selected_ingredient.image, dragged_rect))
+        
+        # Draw bonus texts
+        for bonus_text in self.bonus_texts:
+            elements.append(image_element(("bonus", bonus_text), bonus_text.image, bonus_text.render_rect()))
+        
+        # Draw text box
+        if self.text_box.timer > 0:
+            elements.append(("text_box", self.text_box.get_rect(), (self.text_box.message, self.text_box.color),
+                             self.text_box.draw))
+        
+        # Draw game over
+        if self.state == GAME_STATES["GAME_OVER"]:
+            elements.extend(self.game_over_elements())
+        return elements
+    
+    def game_over_elements(self):
+        def draw_overlay(surface):
+            # Semi-transparent overlay
+            overlay = surface_pool.filled((WIDTH, HEIGHT), (0, 0, 0, 180))
+            surface.blit(overlay, (0, 0))
+        
+        # Game over text
+        earned = self.money - self.game_data['money']
+        gameover_text = render_text(font_large, "Game Over!", WHITE)
+        score_text = render_text(font_medium, f"Final Score: {self.score}", WHITE)
+        level_text = render_text(font_medium, f"You reached Level {self.level}", WHITE)
+        money_text = render_text(font_medium, f"Money earned: ${earned}", YELLOW)
+        
+        # Shop button goes below the retry button
+        self.shop_button.rect.y = self.retry_button.rect.bottom + 20
+        
+        return [
+            ("overlay", pygame.Rect(0, 0, WIDTH, HEIGHT), None, draw_overlay),
+            text_element("gameover_title", gameover_text, (WIDTH//2 - gameover_text.get_width()//2, HEIGHT//3), None),
+            text_element("final_score", score_text, (WIDTH//2 - score_text.get_width()//2, HEIGHT//3 + 80), self.score),
+            text_element("final_level", level_text, (WIDTH//2 - level_text.get_width()//2, HEIGHT//3 + 130), self.level),
+            text_element("money_earned", money_text, (WIDTH//2 - money_text.get_width()//2, HEIGHT//3 + 180), earned),
+            button_element("retry_button", self.retry_button),
+            button_element("shop_button", self.shop_button),
+        ]
+
+# Helpers to describe frame elements (see Game.frame)
+def image_element(key, image, rect):
+    rect = rect.copy()
+    return (key, rect, image, lambda surface: surface.blit(image, rect))
+
+def text_element(key, text_surface, pos, signature):
+    rect = text_surface.get_rect(topleft=pos)
+    return (key, rect, signature, lambda surface: surface.blit(text_surface, rect))
+
+def button_element(key, button):
+    return (key, button.rect.copy(), (button.text, button.is_hovered, button.disabled), button.draw)
+
+# Merge overlapping rects so each screen area is restored and pushed once
+def merge_rects(rects, bounds):
+    merged = []
+    for rect in rects:
+        rect = rect.clip(bounds)
+        if rect.width == 0 or rect.height == 0:
+            continue
+        i = 0
+        while i < len(merged):
+            if merged[i].colliderect(rect):
+                rect.union_ip(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
+
+# Dirty-rectangle rendering: the static layer of the current state is drawn
+# once into a cached surface; each frame only the areas whose elements moved,
+# appeared, disappeared or changed are restored from it and redrawn, and only
+# those areas are pushed to the display. Idle menus cost almost nothing.
+class DirtyRectRenderer:
+    def __init__(self):
+        self.layer = pygame.Surface((WIDTH, HEIGHT)).convert()
+        self.layer_key = None
+        self.previous = {}  # element key -> (rect, signature) drawn last frame
+        
+    def invalidate(self):
+        # Force a full redraw (e.g. after the window was covered)
+        self.layer_key = None
+        
+    def render(self, surface, game):
+        layer_key, draw_layer, elements = game.frame()
+        elements = profiler.with_overlay(elements)
+        current = {key: (tuple(rect), signature) for key, rect, signature, _ in elements}
+        
+        if layer_key != self.layer_key:
+            start = profiler.mark()
+            self.layer.fill(BLACK)
+            draw_layer(self.layer)
+            profiler.lap("draw:background", start)
+            self.layer_key = layer_key
+            dirty = [surface.get_rect()]
+        else:
+            dirty = []
+            for key, drawn in current.items():
+                before = self.previous.get(key)
+                if before != drawn:
+                    dirty.append(pygame.Rect(drawn[0]))
+                    if before:
+                        dirty.append(pygame.Rect(before[0]))
+            for key, before in self.previous.items():
+                if key not in current:
+                    dirty.append(pygame.Rect(before[0]))
+        self.previous = current
+        
+        dirty = merge_rects(dirty, surface.get_rect())
+        for area in dirty:
+            start = profiler.mark()
+            surface.blit(self.layer, area, area)
+            profiler.lap("draw:background", start)
+            surface.set_clip(area)
+            for key, rect, _, draw_element in elements:
+                if rect.colliderect(area):
+                    if profiler.enabled:
+                        profiler.draw_element(surface, key, draw_element)
+                    else:
+                        draw_element(surface)
+            surface.set_clip(None)
+        return dirty
+
+# Input recording: one record per frame with the number of update steps it
+# ran, the pointer position and the input events, plus the RNG seed, start
+# time and save data the session began with. Replaying the records through
+# handle_events/update reproduces the session exactly (see burger_replay.py).
+#
+# File layout (little endian):
+#   header  b"BBRP", version u8, seed u64, start time f64, step f64, save data length u32, save data (JSON)
+#   b"F"    steps u8, x i16, y i16, event count u16, events
+#   b"I"    frame count u16, steps u8 (frames with no input and the pointer still)
+#   b"E"    score i64, level i32, money i64, state u8 (written when the session ends)
+RECORDING_MAGIC = b"BBRP"
+RECORDING_VERSION = 1
+
+# Recorded event types, stored as their index so files don't depend on pygame's numbering
+RECORDED_EVENTS = (pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION,
+                   pygame.KEYDOWN, pygame.KEYUP, pygame.WINDOWFOCUSLOST, pygame.WINDOWMINIMIZED)
+EVENT_CODES = {event_type: code for code, event_type in enumerate(RECORDED_EVENTS)}
+
+def pack_event(event):
+    code = EVENT_CODES[event.type]
+    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+        return struct.pack("<BhhB", code, event.pos[0], event.pos[1], event.button)
+    elif event.type == pygame.MOUSEMOTION:
+        buttons = sum(1 << i for i, pressed in enumerate(event.buttons[:3]) if pressed)
+        return struct.pack("<BhhB", code, event.pos[0], event.pos[1], buttons)
+    elif event.type in (pygame.KEYDOWN, pygame.KEYUP):
+        return struct.pack("<BiH", code, event.key, event.mod)
+    return struct.pack("<B", code)
+
+def unpack_event(data, offset):
+    code = data[offset]
+    event_type = RECORDED_EVENTS[code]
+    if event_type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+        _, x, y, button = struct.unpack_from("<BhhB", data, offset)
+        return pygame.event.Event(event_type, pos=(x, y), button=button), offset + 6
+    elif event_type == pygame.MOUSEMOTION:
+        _, x, y, buttons = struct.unpack_from("<BhhB", data, offset)
+        pressed = tuple(bool(buttons & (1 << i)) for i in range(3))
+        return pygame.event.Event(event_type, pos=(x, y), rel=(0, 0), buttons=pressed), offset + 6
+    elif event_type in (pygame.KEYDOWN, pygame.KEYUP):
+        _, key, mod = struct.unpack_from("<BiH", data, offset)
+        return pygame.event.Event(event_type, key=key, mod=mod), offset + 7
+    return pygame.event.Event(event_type), offset + 1
+
+def game_digest(game):
+    return game.score, game.level, game.money, game.state
+
+class InputRecorder:
+    def __init__(self, path, seed, start_time, game_data):
+        self.file = open(path, "wb")
+        save_data = json.dumps(game_data).encode("utf-8")
+        self.file.write(RECORDING_MAGIC + struct.pack("<BQddI", RECORDING_VERSION, seed, start_time, STEP, len(save_data)))
+        self.file.write(save_data)
+        self.mouse_pos = None
+        self.idle_count = 0
+        self.idle_steps = 0
+        
+    def frame(self, steps, mouse_pos, events):
+        events = [event for event in events if event.type in EVENT_CODES]
+        if not events and mouse_pos == self.mouse_pos:
+            # Runs of idle frames cost 4 bytes
+            if self.idle_count and (steps != self.idle_steps or self.idle_count == 0xFFFF):
+                self.flush_idle()
+            self.idle_steps = steps
+            self.idle_count += 1
+            return
+        self.flush_idle()
+        self.mouse_pos = mouse_pos
+        self.file.write(struct.pack("<cBhhH", b"F", steps, mouse_pos[0], mouse_pos[1], len(events)))
+        self.file.write(b"".join(pack_event(event) for event in events))
+        
+    def flush_idle(self):
+        if self.idle_count:
+            self.file.write(struct.pack("<cHB", b"I", self.idle_count, self.idle_steps))
+            self.idle_count = 0
+            
+    def close(self, game):
+        self.flush_idle()
+        self.file.write(struct.pack("<cqiqB", b"E", *game_digest(game)))
+        self.file.close()
+
+class Recording:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        if self.data[:4] != RECORDING_MAGIC:
+            raise ValueError(f"{path} is not a Burger Bun Bakery recording")
+        version, self.seed, self.start_time, step, length = struct.unpack_from("<BQddI", self.data, 4)
+        if version != RECORDING_VERSION or step != STEP:
+            raise ValueError(f"{path} was recorded with an incompatible version of the game")
+        start = 4 + struct.calcsize("<BQddI")
+        self.game_data = json.loads(self.data[start:start + length].decode("utf-8"))
+        self.records_start = start + length
+        self.final_digest = None  # Set once frames() reaches the end record
+        
+    def frames(self):
+        # Yields (steps, mouse_pos, events) for every recorded frame
+        data = self.data
+        offset = self.records_start
+        mouse_pos = (0, 0)
+        while offset < len(data):
+            kind = data[offset:offset + 1]
+            if kind == b"F":
+                _, steps, x, y, count = struct.unpack_from("<cBhhH", data, offset)
+                offset += 8
+                mouse_pos = (x, y)
+                events = []
+                for _ in range(count):
+                    event, offset = unpack_event(data, offset)
+                    events.append(event)
+                yield steps, mouse_pos, events
+            elif kind == b"I":
+                _, count, steps = struct.unpack_from("<cHB", data, offset)
+                offset += 4
+                for _ in range(count):
+                    yield steps, mouse_pos, []
+            elif kind == b"E":
+                self.final_digest = struct.unpack_from("<cqiqB", data, offset)[1:]
+                return
+            else:
+                raise ValueError(f"Corrupt recording at byte {offset}")
 
 # Main game function
 def main():
-    game = Game()
+    # Seed the RNG (orders, ingredient quality) so --record can store it; --seed N reproduces one
+    seed = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else random.randrange(2**63)
+    random.seed(seed)
+    game_data = load_game_data()
+    start_time = time.time()
+    # --record PATH writes every frame's input to PATH for burger_replay.py
+    recorder = None
+    if "--record" in sys.argv:
+        recorder = InputRecorder(sys.argv[sys.argv.index("--record") + 1], seed, start_time, game_data)
+    
+    game = Game(game_data)
     running = True
+    # Dirty rectangles by default; --full-redraw draws and flips the whole screen every frame
+    renderer = None if "--full-redraw" in sys.argv else DirtyRectRenderer()
+    # Frame cap (--fps 30/144...); game logic always runs in STEP increments
+    fps = int(sys.argv[sys.argv.index("--fps") + 1]) if "--fps" in sys.argv else FPS
+    game_time = SimulationClock(start_time)
+    set_game_clock(game_time)
+    accumulator = 0.0
+    previous_frame = time.perf_counter()
+    # F3 toggles the frame profiler; --profile starts with it on and
+    # --profile-csv PATH writes its per-frame timings there on exit
+    if "--profile" in sys.argv:
+        profiler.enable()
+    profile_csv = sys.argv[sys.argv.index("--profile-csv") + 1] if "--profile-csv" in sys.argv else None
     
     # Print instructions for the user
     print("\n=== BURGER BUN BAKERY SIMULATOR ===")
@@ -1565,17 +2355,58 @@ def main():
     print("- Add sound effects to the 'sounds' folder")
     print("\nHave fun baking burgers!\n")
     
-    while running:
-        events = pygame.event.get()
-        running = game.handle_events(events)
-        
-        game.update()
-        
-        screen.fill(BLACK)
-        game.draw(screen)
-        
-        pygame.display.flip()
-        clock.tick(FPS)
+    # A crash still leaves a replayable recording behind
+    try:
+        while running:
+            now = time.perf_counter()
+            accumulator += min(now - previous_frame, MAX_FRAME_TIME)
+            previous_frame = now
+            profiler.start_frame()
+            
+            mark = profiler.mark()
+            events = pygame.event.get()
+            running = game.handle_events(events)
+            if any(event.type == pygame.KEYDOWN and event.key == pygame.K_F3 for event in events):
+                profiler.toggle()
+            mark = profiler.lap("events", mark)
+            
+            # Run as many fixed steps as real time has covered; the remainder
+            # carries over and positions the frame between the last two steps
+            steps = 0
+            while accumulator >= STEP:
+                game.update(STEP)
+                game_time.advance(STEP)
+                accumulator -= STEP
+                steps += 1
+            game_time.alpha = accumulator / STEP
+            mark = profiler.lap("update", mark)
+            if recorder:
+                recorder.frame(steps, pygame.mouse.get_pos(), events)
+            
+            if renderer:
+                if any(event.type == pygame.WINDOWEXPOSED for event in events):
+                    renderer.invalidate()
+                dirty = renderer.render(screen, game)
+                mark = profiler.lap("draw", mark)
+                if dirty:
+                    pygame.display.update(dirty)
+            else:
+                screen.fill(BLACK)
+                game.draw(screen)
+                mark = profiler.lap("draw", mark)
+                
+                pygame.display.flip()
+            profiler.lap("display", mark)
+            profiler.end_frame()
+            clock.tick(fps)
+    finally:
+        # Flush pending saves even if the loop raised: the writer thread dies with the process
+        game_saver.close()
+        if recorder:
+            recorder.close(game)
+        if profile_csv:
+            profiler.export_csv(profile_csv)
+            print(f"Frame profile written to {profile_csv}")
     
     pygame.quit()
     sys.exit()
@@ -0,0 +1,120 @@
+import os
+import sys
+
+# Replays a session recorded with `python burger_game.py --record PATH`.
+#
+#   python burger_replay.py session.bbr              # in a window, as fast as it renders
+#   python burger_replay.py session.bbr --realtime   # in a window, at the recorded speed
+#   python burger_replay.py session.bbr --headless   # no window, no drawing: logic only
+#
+# Every frame runs handle_events and the recorded number of update steps with
+# the recorded pointer, so the session plays out exactly as it did live; the
+# final score, level, money and state are checked against the recording.
+# Frame times (p50/p95/p99) make replays usable as regression benchmarks;
+# --csv writes the frame profiler's per-section timings, one row per frame.
+
+HEADLESS = "--headless" in sys.argv
+if HEADLESS:
+    os.environ["BURGER_HEADLESS"] = "1"
+LAUNCH_DIR = os.getcwd()
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import random
+import time
+
+import pygame
+import burger_game as bg
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+def replay(path, headless=False, realtime=False, full_redraw=False):
+    recording = bg.Recording(path)
+    bg.game_saver.path = None  # Never touch the player's save while replaying
+    random.seed(recording.seed)
+    game_time = bg.SimulationClock(recording.start_time)
+    bg.set_game_clock(game_time)
+    game = bg.Game(recording.game_data)
+    renderer = None if headless or full_redraw else bg.DirtyRectRenderer()
+    profiler = bg.profiler
+    profiler.enable(overlay=False, max_rows=None)
+
+    started = time.perf_counter()
+    for steps, mouse_pos, events in recording.frames():
+        profiler.start_frame()
+        mark = profiler.mark()
+        game.mouse_override = mouse_pos
+        game.handle_events(events)
+        mark = profiler.lap("events", mark)
+        for _ in range(steps):
+            game.update(bg.STEP)
+            game_time.advance(bg.STEP)
+        mark = profiler.lap("update", mark)
+
+        if headless:
+            # Nothing is drawn, but building the frame keeps the layout state
+            # drawing leaves behind (shop buttons, game over buttons) in step
+            game.frame()
+            mark = profiler.lap("draw", mark)
+        elif renderer:
+            dirty = renderer.render(bg.screen, game)
+            mark = profiler.lap("draw", mark)
+            if dirty:
+                pygame.display.update(dirty)
+        else:
+            bg.screen.fill(bg.BLACK)
+            game.draw(bg.screen)
+            mark = profiler.lap("draw", mark)
+            pygame.display.flip()
+        profiler.lap("display", mark)
+        profiler.end_frame()
+
+        if not headless:
+            pygame.event.pump()  # Keep the window responsive
+        if realtime:
+            # Hold each frame until wall time catches up with game time
+            delay = (game_time.now - recording.start_time) - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+    elapsed = time.perf_counter() - started
+    return game, recording, [row[0] for row in profiler.rows], elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded Burger Bun Bakery session")
+    parser.add_argument("recording")
+    parser.add_argument("--headless", action="store_true", help="No window and no drawing (fastest)")
+    parser.add_argument("--realtime", action="store_true", help="Play at the recorded speed instead of fast-forwarding")
+    parser.add_argument("--full-redraw", action="store_true", help="Redraw the whole screen every frame")
+    parser.add_argument("--csv", help="Write every frame's section timings to this file")
+    args = parser.parse_args()
+
+    game, recording, frame_times, elapsed = replay(os.path.join(LAUNCH_DIR, args.recording),
+                                                   args.headless, args.realtime, args.full_redraw)
+    game_seconds = bg.game_clock.now - recording.start_time
+    ordered = sorted(frame_times)
+    print(f"{len(frame_times)} frames, {game_seconds:.1f}s of game time replayed in {elapsed:.2f}s "
+          f"({game_seconds / max(elapsed, 1e-9):.0f}x)")
+    print(f"Frame time (ms): p50 {percentile(ordered, 50) * 1000:.3f}, p95 {percentile(ordered, 95) * 1000:.3f}, "
+          f"p99 {percentile(ordered, 99) * 1000:.3f}, max {ordered[-1] * 1000:.3f}")
+
+    final = bg.game_digest(game)
+    if recording.final_digest is None:
+        print(f"Recording has no final state (the session crashed?); replay ended with score {game.score}, level {game.level}")
+    elif tuple(recording.final_digest) == final:
+        print(f"Replay matches the recording: score {game.score}, level {game.level}, money ${game.money}")
+    else:
+        print(f"Replay DIVERGED: recorded (score, level, money, state) {tuple(recording.final_digest)}, replayed {final}")
+
+    if args.csv:
+        csv_path = os.path.join(LAUNCH_DIR, args.csv)
+        bg.profiler.export_csv(csv_path)
+        print(f"Frame profile written to {csv_path}")
+
+    pygame.quit()
+    if recording.final_digest is not None and tuple(recording.final_digest) != final:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
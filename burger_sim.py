@@ -0,0 +1,235 @@
+import os
+
+# The game creates its window and loads assets at import: go headless first,
+# and run from this folder so images/, sounds/ and data/ resolve
+os.environ["BURGER_HEADLESS"] = "1"
+LAUNCH_DIR = os.getcwd()
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import contextlib
+import copy
+import csv
+import io
+import random
+import statistics
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+import burger_game as bg
+
+bg.game_saver.path = None  # Sessions keep their save data in memory
+
+# Headless, time-accelerated balance testing: each session plays the game
+# logic (handle_events + update, never draw) on a SimulationClock that jumps
+# one frame per tick, driven by a bot or by scripted input
+
+DT = bg.STEP
+MAX_GAME_SECONDS = 10 * 60  # Stop sessions that never end (e.g. a bot that never loses)
+BATCH_SIZE = 25  # Sessions per pool task: keeps inter-process overhead negligible
+
+# Drop point for the burger area (see Game.handle_events)
+BURGER_DROP = (bg.WIDTH // 2, bg.HEIGHT - 120)
+
+# Default economy for a fresh save, so simulations never read or write data/game_data.json
+DEFAULT_GAME_DATA = {
+    "high_score": 0,
+    "unlocked_ingredients": ["bun_bottom", "bun_top", "patty", "cheese", "lettuce"],
+    "locked_ingredients": ["tomato", "onion", "bacon"],
+    "money": 0,
+    "upgrades": {
+        "grill_speed": 1,
+        "customer_patience": 1,
+        "tips": 1,
+    },
+    "tutorial_completed": True
+}
+
+def mouse_event(event_type, pos):
+    return pygame.event.Event(event_type, pos=pos, button=1)
+
+# Replays a fixed list of (tick, mouse_pos, event_type or None) steps
+class ScriptedInput:
+    def __init__(self, steps):
+        self.steps = deque(sorted(steps, key=lambda step: step[0]))
+        self.mouse_pos = (0, 0)
+
+    def step(self, game, tick):
+        events = []
+        while self.steps and self.steps[0][0] <= tick:
+            _, self.mouse_pos, event_type = self.steps.popleft()
+            if event_type is not None:
+                events.append(mouse_event(event_type, self.mouse_pos))
+        return self.mouse_pos, events
+
+# Plays like a person: reads the order and drags the matching shelf ingredient
+# onto the burger one at a time, taking `reaction` seconds (on average) per
+# ingredient and grabbing a random one with probability `mistakes`
+class BotInput:
+    def __init__(self, rng, reaction=0.8, mistakes=0.05, drag_time=0.25):
+        self.rng = rng
+        self.reaction = reaction
+        self.mistakes = mistakes
+        self.drag_ticks = max(2, round(drag_time / DT))
+        self.plan = deque()
+        self.mouse_pos = (0, 0)
+        self.blocked = None  # Ingredient the order needs but the shelf doesn't have
+
+    def step(self, game, tick):
+        if not self.plan:
+            self.plan_next(game, tick)
+        events = []
+        if self.plan and self.plan[0][0] <= tick:
+            _, self.mouse_pos, event_type = self.plan.popleft()
+            if event_type is not None:
+                events.append(mouse_event(event_type, self.mouse_pos))
+        return self.mouse_pos, events
+
+    def plan_next(self, game, tick):
+        if game.state != bg.GAME_STATES["PLAYING"] or game.next_level_time > 0 or game.selected_ingredient:
+            return
+        customer = game.current_customer
+        if not customer or customer.served:
+            return
+        wanted = customer.order.ingredients
+        stacked = [item.name.split('_')[0] for item in game.burger_stack]
+        if stacked == [name.split('_')[0] for name in wanted[:len(stacked)]] and len(stacked) < len(wanted):
+            needed = wanted[len(stacked)]
+        else:
+            # The stack can't become this order (a mistake, or the previous
+            # burger is still on the table): top it off so it gets rejected and cleared
+            needed = "bun_top"
+
+        shelf = list(game.ingredients_shelf)
+        # Longest shelf name the order item starts with ("bun_top_toasted" -> "bun_top")
+        matches = [item for item in shelf if needed.startswith(item.name)]
+        if self.rng.random() < self.mistakes:
+            matches = [self.rng.choice(shelf)]
+        if not matches:
+            self.blocked = needed
+            return
+        source = max(matches, key=lambda item: len(item.name))
+
+        down = tick + max(1, round(self.rng.uniform(0.5, 1.5) * self.reaction / DT))
+        self.plan.extend([
+            (down, source.rect.center, pygame.MOUSEBUTTONDOWN),
+            (down + 1, BURGER_DROP, None),
+            (down + self.drag_ticks, BURGER_DROP, pygame.MOUSEBUTTONUP),
+        ])
+
+def run_session(seed, player=None, game_data=None, max_seconds=MAX_GAME_SECONDS):
+    random.seed(seed)
+    sim_clock = bg.SimulationClock()
+    bg.set_game_clock(sim_clock)
+    data = copy.deepcopy(game_data if game_data is not None else DEFAULT_GAME_DATA)
+    start_money = data["money"]
+
+    game = bg.Game(game_data=data)
+    game.start_game()
+    if player is None:
+        player = BotInput(random.Random(seed + 1))
+
+    tick = 0
+    while game.state == bg.GAME_STATES["PLAYING"] and tick * DT < max_seconds:
+        game.mouse_override, events = player.step(game, tick)
+        game.handle_events(events)
+        game.update(DT)
+        sim_clock.advance(DT)
+        tick += 1
+
+    return {
+        "seed": seed,
+        "score": game.score,
+        "orders_served": game.level - 1,
+        "money_earned": game.money - start_money,
+        "game_seconds": round(tick * DT, 2),
+        "end": game.game_over_reason or "timeout",
+        "blocked_on": getattr(player, "blocked", None) or "",
+    }
+
+def run_batch(task):
+    seeds, bot_options, game_data, max_seconds = task
+    results = []
+    # Orders print themselves when created; keep the workers quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        for seed in seeds:
+            player = BotInput(random.Random(seed + 1), **bot_options)
+            results.append(run_session(seed, player, game_data, max_seconds))
+    return results
+
+def simulate(sessions, workers=None, seed=0, bot_options=None, game_data=None, max_seconds=MAX_GAME_SECONDS):
+    seeds = range(seed, seed + sessions)
+    tasks = [(seeds[i:i + BATCH_SIZE], bot_options or {}, game_data, max_seconds)
+             for i in range(0, sessions, BATCH_SIZE)]
+    if workers == 1:
+        batches = map(run_batch, tasks)
+        return [result for batch in batches for result in batch]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [result for batch in pool.map(run_batch, tasks) for result in batch]
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+def print_summary(results, elapsed):
+    scores = [r["score"] for r in results]
+    served = [r["orders_served"] for r in results]
+    money = [r["money_earned"] for r in results]
+    # Sessions end at very different game times (a bot blocked by a locked ingredient dies
+    # within a minute), so throughput is reported per simulated game-second as well
+    game_seconds = sum(r["game_seconds"] for r in results)
+    print(f"{len(results)} sessions, {game_seconds / 60:.0f} game minutes in {elapsed:.1f}s "
+          f"({game_seconds / elapsed:.0f} game-seconds/s, {len(results) / elapsed * 60:.0f} sessions/min)")
+    print(f"Score:         mean {statistics.mean(scores):.0f}, p50 {percentile(scores, 50)}, p90 {percentile(scores, 90)}")
+    print(f"Orders served: mean {statistics.mean(served):.2f}, p50 {percentile(served, 50)}, p90 {percentile(served, 90)}, max {max(served)}")
+    print(f"Money earned:  mean ${statistics.mean(money):.1f}, p50 ${percentile(money, 50)}")
+    print(f"Game length:   mean {statistics.mean(r['game_seconds'] for r in results):.0f}s")
+    ends = Counter(r["end"] for r in results)
+    print("Ended by:      " + ", ".join(f"{reason} {count / len(results):.0%}" for reason, count in ends.most_common()))
+    blocked = Counter(r["blocked_on"] for r in results if r["blocked_on"])
+    if blocked:
+        print("Blocked on locked ingredients: " + ", ".join(f"{name} {count}" for name, count in blocked.most_common()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless, time-accelerated Burger Bun Bakery sessions for balance testing")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0, help="First seed; session i uses seed + i")
+    parser.add_argument("--reaction", type=float, default=0.8, help="Bot seconds per ingredient")
+    parser.add_argument("--mistakes", type=float, default=0.05, help="Bot chance of grabbing a wrong ingredient")
+    parser.add_argument("--minutes", type=float, default=MAX_GAME_SECONDS / 60, help="Game minutes before a session is cut off")
+    parser.add_argument("--unlock", nargs="*", default=[], help="Ingredients unlocked from the start (tomato onion bacon)")
+    parser.add_argument("--upgrades", nargs="*", default=[], metavar="NAME=LEVEL", help="e.g. customer_patience=3")
+    parser.add_argument("--csv", help="Write one row per session to this file")
+    args = parser.parse_args()
+
+    game_data = copy.deepcopy(DEFAULT_GAME_DATA)
+    for name in args.unlock:
+        if name in game_data["locked_ingredients"]:
+            game_data["locked_ingredients"].remove(name)
+            game_data["unlocked_ingredients"].append(name)
+    for upgrade in args.upgrades:
+        name, _, level = upgrade.partition("=")
+        if name not in game_data["upgrades"]:
+            parser.error(f"unknown upgrade in {upgrade!r} (choose from {', '.join(game_data['upgrades'])})")
+        if not level.isdigit() or int(level) < 1:
+            parser.error(f"--upgrades expects NAME=LEVEL with LEVEL >= 1, got {upgrade!r}")
+        game_data["upgrades"][name] = int(level)
+
+    start = time.perf_counter()
+    results = simulate(args.sessions, args.workers, args.seed,
+                       {"reaction": args.reaction, "mistakes": args.mistakes}, game_data, args.minutes * 60)
+    print_summary(results, time.perf_counter() - start)
+
+    if args.csv:
+        csv_path = os.path.join(LAUNCH_DIR, args.csv)
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"Per-session results written to {csv_path}")
+
+if __name__ == "__main__":
+    main()
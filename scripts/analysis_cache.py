@@ -0,0 +1,88 @@
+import json
+import os
+
+from project_paths import cache_dir, crear_directorios, firma_archivo
+
+# Caché de artefactos intermedios (datos limpios y agregados).
+# Cada artefacto tiene un fichero `.meta.json` con la firma del CSV de origen:
+# si el CSV cambia, el artefacto se considera obsoleto y se regenera.
+ruta_datos_limpios = os.path.join(cache_dir, 'hamburgueserias_limpias.parquet')
+ruta_estadisticas = os.path.join(cache_dir, 'estadisticas.json')
+# Subir cuando cambie la limpieza o el formato de los agregados: invalida toda la caché
+VERSION_CACHE = 4
+
+
+def _ruta_meta(ruta_artefacto):
+    return ruta_artefacto + '.meta.json'
+
+
+def cache_valido(ruta_artefacto, csv_path):
+    """True si el artefacto existe y se generó a partir de este mismo CSV."""
+    if not os.path.exists(csv_path) or not os.path.exists(ruta_artefacto):
+        return False
+    try:
+        with open(_ruta_meta(ruta_artefacto), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        # Sin meta (o corrupta): no sabemos de qué CSV sale el artefacto
+        return False
+    return meta.get('firma') == firma_archivo(csv_path) and meta.get('version') == VERSION_CACHE
+
+
+def tiene_marca(ruta_artefacto):
+    """True si el artefacto tiene `.meta.json`, es decir, lo generó esta caché."""
+    return os.path.exists(_ruta_meta(ruta_artefacto))
+
+
+def marcar_cache(ruta_artefacto, csv_path):
+    """Registra la firma del CSV del que sale el artefacto."""
+    with open(_ruta_meta(ruta_artefacto), 'w', encoding='utf-8') as f:
+        json.dump({'firma': firma_archivo(csv_path), 'version': VERSION_CACHE}, f)
+
+
+def asegurar_datos_limpios(csv_path, refrescar=False):
+    """Limpia el CSV y escribe la caché Parquet si no está al día."""
+    if not refrescar and cache_valido(ruta_datos_limpios, csv_path):
+        return
+
+    import data_analisis_burger
+
+    crear_directorios()
+    hamburger_df = data_analisis_burger.limpiar_datos(data_analisis_burger.cargar_datos(csv_path))
+    # Grupos de filas pequeños: DuckDB puede saltarse grupos enteros con sus estadísticas.
+    # Se escribe aparte y se renombra: el Parquet anterior puede estar mapeado en memoria
+    temporal = ruta_datos_limpios + '.tmp'
+    hamburger_df.to_parquet(temporal, index=False, row_group_size=100_000)
+    os.replace(temporal, ruta_datos_limpios)
+    marcar_cache(ruta_datos_limpios, csv_path)
+
+
+def datos_limpios(csv_path, refrescar=False):
+    """Devuelve el DataFrame limpio (ver dataset_loader.cargar)."""
+    import dataset_loader
+
+    return dataset_loader.cargar(csv_path, refrescar=refrescar)
+
+
+def estadisticas_cacheadas(csv_path):
+    """Estadísticas guardadas para este CSV, o None. No importa pandas."""
+    if not cache_valido(ruta_estadisticas, csv_path):
+        return None
+    with open(ruta_estadisticas, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def obtener_estadisticas(csv_path, refrescar=False):
+    """Estadísticas clave del mercado; solo se recalculan si la caché está obsoleta."""
+    if not refrescar:
+        estadisticas = estadisticas_cacheadas(csv_path)
+        if estadisticas is not None:
+            return estadisticas
+
+    import data_analisis_burger
+
+    estadisticas = data_analisis_burger.calcular_estadisticas(datos_limpios(csv_path, refrescar))
+    with open(ruta_estadisticas, 'w', encoding='utf-8') as f:
+        json.dump(estadisticas, f, ensure_ascii=False)
+    marcar_cache(ruta_estadisticas, csv_path)
+    return estadisticas
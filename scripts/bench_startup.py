@@ -0,0 +1,60 @@
+"""Benchmark del tiempo de arranque de la CLI.
+
+Mide, en procesos nuevos, cuánto tarda cada subcomando de `burger_cli.py`
+y cuánto cuesta importar cada librería pesada por separado.
+
+Uso:
+    python scripts/bench_startup.py [--csv RUTA] [--repeticiones N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from project_paths import csv_mas_reciente, script_dir
+
+cli = os.path.join(script_dir, 'burger_cli.py')
+librerias = ['pandas', 'numpy', 'matplotlib.pyplot', 'seaborn', 'folium']
+
+
+def medir(comando, repeticiones):
+    """Mediana (en segundos) de `repeticiones` ejecuciones del comando."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run(comando, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=None)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+    csv_path = args.csv or csv_mas_reciente()
+
+    print("IMPORTACIÓN DE LIBRERÍAS (proceso nuevo):")
+    base = medir([sys.executable, '-c', 'pass'], args.repeticiones)
+    print(f"{'python vacío':<22}{base * 1000:>9.0f} ms")
+    for lib in librerias:
+        try:
+            t = medir([sys.executable, '-c', f'import {lib}'], args.repeticiones)
+        except subprocess.CalledProcessError:
+            print(f"{lib:<22}{'no instalada':>12}")
+            continue
+        print(f"{lib:<22}{(t - base) * 1000:>9.0f} ms")
+
+    # Calentar la caché antes de medir los subcomandos
+    subprocess.run([sys.executable, cli, 'stats', '--csv', csv_path], check=True, stdout=subprocess.DEVNULL)
+
+    print("\nSUBCOMANDOS (caché caliente):")
+    for comando in ['stats', 'report', 'charts', 'maps']:
+        t = medir([sys.executable, cli, comando, '--csv', csv_path], args.repeticiones)
+        print(f"{comando:<22}{t * 1000:>9.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
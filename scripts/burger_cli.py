@@ -0,0 +1,271 @@
+"""Punto de entrada único para el análisis de hamburgueserías.
+
+Uso:
+    python scripts/burger_cli.py stats   [--csv RUTA] [--refresh]
+    python scripts/burger_cli.py charts  [--csv RUTA] [--refresh]
+    python scripts/burger_cli.py maps    [--csv RUTA] [--refresh]
+    python scripts/burger_cli.py report  [--csv RUTA] [--refresh]
+    python scripts/burger_cli.py export  [--csv RUTA] [--refresh]
+    python scripts/burger_cli.py cities  [--top N] [--workers N] [--csv RUTA] [--refresh]
+    python scripts/burger_cli.py raster  [--size ANCHOxALTO] [--sigma-km KM] [--bbox LNG0 LAT0 LNG1 LAT1] [--band-rows N] [--out RUTA]
+    python scripts/burger_cli.py hex     [--res N] [--top N] [--csv RUTA] [--refresh]
+    python scripts/burger_cli.py sweep   [--chain-max N] [--score-steps N] [--score-from S] [--csv RUTA]
+    python scripts/burger_cli.py outofcore [--partitions DIR] [--split N] [--workers N] [--batch-rows N] [--check]
+    python scripts/burger_cli.py sketch  [--check] [--merge-snapshots] [--top N] [--csv RUTA]
+    python scripts/burger_cli.py catchment [--candidates RUTA | --random N] [--walk M] [--drive M] [--graph RUTA] [--out RUTA]
+    python scripts/burger_cli.py trends  [--window N] [--top N] [--rebuild]
+    python scripts/burger_cli.py query   "SQL" [--out RUTA.csv|.parquet] [--threads N] [--tables]
+    python scripts/burger_cli.py watch   [--delay S] [--poll] [--interval S]
+
+Cada subcomando importa solo las librerías que necesita. Con la caché
+caliente, `stats` no importa pandas: lee los agregados de `output/cache/`.
+"""
+import argparse
+import os
+import sys
+
+from project_paths import crear_directorios, csv_mas_reciente
+
+
+def cmd_stats(args):
+    import analysis_cache
+    import data_analisis_burger
+    import geo_analysis
+
+    est = analysis_cache.obtener_estadisticas(args.csv, args.refresh)
+    geo_analysis.imprimir_top_ciudades(est)
+    data_analisis_burger.imprimir_estadisticas(est)
+    print(data_analisis_burger.generar_reporte(est))
+
+
+def cmd_charts(args):
+    import analysis_cache
+    import data_analisis_burger
+
+    est = analysis_cache.obtener_estadisticas(args.csv, args.refresh)
+    for ruta in data_analisis_burger.generar_graficos(est, args.csv, forzar=args.refresh):
+        print(f"Gráfico guardado en {ruta}")
+
+
+def cmd_maps(args):
+    import analysis_cache
+    import geo_analysis
+
+    from project_paths import csv_mas_reciente
+
+    csv_path = args.csv or csv_mas_reciente()
+    hamburger_df = analysis_cache.datos_limpios(csv_path, args.refresh)
+    # Con la misma marca que usa `watch`, que así no los vuelve a generar
+    for ruta in (geo_analysis.mapa_calor(hamburger_df), geo_analysis.mapa_mejores(hamburger_df)):
+        if ruta:
+            analysis_cache.marcar_cache(ruta, csv_path)
+
+
+def cmd_export(args):
+    import analysis_cache
+    import geo_export
+
+    hamburger_df = analysis_cache.datos_limpios(args.csv, args.refresh)
+    rutas = geo_export.exportar_todo(hamburger_df)
+    geo_export.imprimir_tamanos(rutas)
+    # Referencia: los mismos puntos incrustados como lo hacía HeatMap, no el HTML
+    # en disco (que `maps` ya puede haber regenerado sin puntos)
+    plano, comprimido = geo_export.tamano_incrustado(hamburger_df)
+    calor = [rutas[1], rutas[3]]  # lo que descarga el mapa de calor: posiciones y ciudades
+    total = sum(os.path.getsize(r + '.gz') for r in calor)
+    reduccion = comprimido / total
+    print(f"Puntos incrustados como en el HeatMap anterior: {plano / 1024:.1f} KB ({comprimido / 1024:.1f} KB gzip); "
+          f"capas externas del mapa de calor: {total / 1024:.1f} KB gzip ({reduccion:.1f}x menos)")
+    if reduccion < geo_export.REDUCCION_OBJETIVO:
+        # Con gzip en ambos lados no se llega: las posiciones a 1 m ya están cerca
+        # de su tamaño mínimo. Sin comprimir la página anterior sí queda por encima.
+        print(f"Objetivo {geo_export.REDUCCION_OBJETIVO}x no alcanzado comparando gzip con gzip "
+              f"(faltan {total / 1024 - comprimido / 1024 / geo_export.REDUCCION_OBJETIVO:.1f} KB); "
+              f"frente a los puntos incrustados sin comprimir: {plano / total:.1f}x")
+
+
+def cmd_report(args):
+    import analysis_cache
+    import report_builder
+
+    est = analysis_cache.obtener_estadisticas(args.csv, args.refresh)
+    report_builder.construir_reporte(est, args.csv)
+
+
+def cmd_cities(args):
+    import city_reports
+
+    city_reports.generar(args.csv, args.top, args.workers, args.refresh)
+
+
+def cmd_raster(args):
+    import heat_raster
+
+    ancho, alto = (int(v) for v in args.size.lower().split('x'))
+    limites = tuple(args.bbox) if args.bbox else None
+    heat_raster.main(args.csv, ancho, alto, args.out, limites, args.sigma_km, args.band_rows, args.refresh)
+
+
+def cmd_hex(args):
+    import hex_index
+
+    hex_index.main(args.csv, args.res, args.top, args.refresh)
+
+
+def cmd_sweep(args):
+    import sensitivity_analysis
+
+    sensitivity_analysis.main(args.csv, args.chain_max, args.score_steps, args.score_from, args.top,
+                              args.min_ratings, args.max_ratings, args.refresh)
+
+
+def cmd_outofcore(args):
+    import out_of_core
+
+    out_of_core.main(args.csv, args.partitions or out_of_core.particiones_dir, args.split,
+                     args.workers, args.batch_rows, args.check, args.refresh)
+
+
+def cmd_sketch(args):
+    import sketches
+
+    _, dentro_de_cota = sketches.main(args.csv, args.check, args.merge_snapshots, args.top, args.refresh)
+    return 0 if dentro_de_cota else 1
+
+
+def cmd_catchment(args):
+    import catchment
+
+    catchment.main(args.csv, args.candidates, args.random, {'andando': args.walk, 'coche': args.drive},
+                   args.graph, args.out, args.refresh)
+
+
+def _ventana(valor):
+    # Una pendiente necesita al menos dos snapshots
+    try:
+        ventana = int(valor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"no es un número entero: {valor!r}") from None
+    if ventana < 2:
+        raise argparse.ArgumentTypeError(f"debe ser al menos 2 (se dio {valor})")
+    return ventana
+
+
+def cmd_trends(args):
+    import timeseries_analysis
+
+    timeseries_analysis.main(args.window, args.top, args.rebuild)
+
+
+def cmd_query(args):
+    import query_engine
+
+    if args.tables or not args.sql:
+        query_engine.imprimir_tablas(args.csv)
+        return
+    query_engine.ejecutar(args.csv, args.sql, args.out, args.threads)
+
+
+def cmd_watch(args):
+    import watch_mode
+
+    watch_mode.vigilar(espera=args.delay, sondeo=args.poll, intervalo=args.interval)
+
+
+def construir_parser():
+    parser = argparse.ArgumentParser(description="Análisis del mercado de hamburgueserías en España")
+    comunes = argparse.ArgumentParser(add_help=False)
+    comunes.add_argument('--csv', default=None,
+                         help="CSV del scrapeo (por defecto, el snapshot BurgersSpain_*.csv más reciente)")
+    comunes.add_argument('--refresh', action='store_true',
+                         help="Ignorar la caché y recalcular desde el CSV")
+
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sub.add_parser('stats', parents=[comunes], help="Resumen de texto con las estadísticas clave").set_defaults(func=cmd_stats)
+    sub.add_parser('charts', parents=[comunes], help="Gráficos PNG en output/visualizations").set_defaults(func=cmd_charts)
+    sub.add_parser('maps', parents=[comunes], help="Mapas folium en output/maps (cargan las capas de output/maps/data)").set_defaults(func=cmd_maps)
+    sub.add_parser('export', parents=[comunes], help="Capas GeoJSON compactas y precomprimidas en output/maps/data").set_defaults(func=cmd_export)
+    sub.add_parser('report', parents=[comunes], help="Reporte HTML autocontenido en output/reports").set_defaults(func=cmd_report)
+    ciudades = sub.add_parser('cities', parents=[comunes], help="Reporte, gráficos y mapa por ciudad (en paralelo) con un índice")
+    ciudades.add_argument('--top', type=int, default=50, help="Número de ciudades (las que tienen más hamburgueserías)")
+    ciudades.add_argument('--workers', type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    ciudades.set_defaults(func=cmd_cities)
+    raster = sub.add_parser('raster', parents=[comunes], help="Mapa de calor estático en PNG (sin navegador)")
+    raster.add_argument('--size', default='3840x2160', help="Tamaño en píxeles, ANCHOxALTO")
+    raster.add_argument('--sigma-km', type=float, default=6.0, help="Radio del kernel gaussiano en km")
+    raster.add_argument('--bbox', nargs=4, type=float, default=None, metavar=('LNG0', 'LAT0', 'LNG1', 'LAT1'),
+                        help="Límites, p. ej. --bbox -4 40 -3 41 (por defecto, España con Canarias en recuadro)")
+    raster.add_argument('--band-rows', type=int, default=1024, help="Filas por banda (acota la memoria en tamaños grandes)")
+    raster.add_argument('--out', default=None, help="Ruta del PNG (por defecto, output/visualizations/mapa_calor_ANCHOxALTO.png)")
+    raster.set_defaults(func=cmd_raster)
+    hexagonos = sub.add_parser('hex', parents=[comunes], help="Índice hexagonal multirresolución y ranking de celdas")
+    # Las de hex_index.RESOLUCIONES; no se importa aquí para no cargar numpy al construir el parser
+    hexagonos.add_argument('--res', type=int, default=4, choices=range(0, 7), help="Resolución (0 = lado de 200 km, cada nivel divide el lado entre raíz de 7)")
+    hexagonos.add_argument('--top', type=int, default=15, help="Celdas en el ranking")
+    hexagonos.set_defaults(func=cmd_hex)
+
+    sweep = sub.add_parser('sweep', parents=[comunes], help="Sensibilidad a los umbrales de franquicia y emergentes")
+    sweep.add_argument('--chain-max', type=int, default=100, help="Umbrales de franquicia de 1 a N locales")
+    sweep.add_argument('--score-steps', type=int, default=100, help="Número de umbrales de score")
+    sweep.add_argument('--score-from', type=float, default=4.01, help="Umbral de score más bajo (el más alto es 5)")
+    sweep.add_argument('--min-ratings', type=int, default=10, help="Reseñas mínimas de un emergente")
+    sweep.add_argument('--max-ratings', type=int, default=50, help="Reseñas máximas de un emergente")
+    sweep.add_argument('--top', type=int, default=5, help="Ciudades emergentes por combinación")
+    sweep.set_defaults(func=cmd_sweep)
+
+    ooc = sub.add_parser('outofcore', parents=[comunes], help="Agregados partición a partición sobre Parquet particionado")
+    ooc.add_argument('--partitions', default=None, help="Directorio de particiones (por defecto output/cache/particiones); "
+                     "si no lo creó outofcore, se lee tal cual")
+    ooc.add_argument('--split', type=int, default=None, help="Reparticionar el CSV en N particiones por hash del id")
+    ooc.add_argument('--workers', type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    ooc.add_argument('--batch-rows', type=int, default=100_000, help="Filas por lote leído (acota la memoria de cada proceso)")
+    ooc.add_argument('--check', action='store_true', help="Comparar con el cálculo en memoria")
+    ooc.set_defaults(func=cmd_outofcore)
+
+    sketch = sub.add_parser('sketch', parents=[comunes], help="Top-k, distintos y cuantiles aproximados con sketches fusionables")
+    sketch.add_argument('--check', action='store_true',
+                        help="Comparar con los resultados exactos de pandas (código 1 si algún error supera su cota)")
+    sketch.add_argument('--merge-snapshots', action='store_true', help="Fusionar los sketches de todos los snapshots")
+    sketch.add_argument('--top', type=int, default=10, help="Claves en cada top-k")
+    sketch.set_defaults(func=cmd_sketch)
+
+    captacion = sub.add_parser('catchment', parents=[comunes], help="Competidores y ratings en el área de captación de ubicaciones candidatas")
+    captacion.add_argument('--candidates', default=None, help="CSV o Parquet con columnas lat y lng")
+    captacion.add_argument('--random', type=int, default=10_000, help="Sin --candidates: número de candidatas aleatorias")
+    captacion.add_argument('--walk', type=float, default=800.0, help="Radio andando (metros)")
+    captacion.add_argument('--drive', type=float, default=5_000.0, help="Radio en coche (metros)")
+    captacion.add_argument('--graph', default=None, help="Aristas del grafo de carreteras (CSV/Parquet) para distancias por red")
+    captacion.add_argument('--out', default=None, help="Ruta del CSV de resultados (por defecto output/reports/captacion.csv)")
+    captacion.set_defaults(func=cmd_catchment)
+
+    trends = sub.add_parser('trends', help="Tendencias de reseñas y rating entre snapshots BurgersSpain_*.csv")
+    trends.add_argument('--window', type=_ventana, default=4, help="Snapshots de la ventana para las pendientes móviles (al menos 2)")
+    trends.add_argument('--top', type=int, default=10, help="Lugares por ciudad en cada ranking")
+    trends.add_argument('--rebuild', action='store_true', help="Reconstruir el panel desde todos los snapshots")
+    trends.set_defaults(func=cmd_trends)
+
+    query = sub.add_parser('query', parents=[comunes], help="Consulta SQL (DuckDB) sobre los datos limpios")
+    query.add_argument('sql', nargs='?', help="Consulta SQL; sin consulta se listan las tablas")
+    query.add_argument('--out', default=None, help="Guardar el resultado en CSV o Parquet (según la extensión)")
+    query.add_argument('--threads', type=int, default=None, help="Hilos de DuckDB (por defecto, todos los núcleos)")
+    query.add_argument('--tables', action='store_true', help="Listar tablas y columnas disponibles")
+    query.set_defaults(func=cmd_query)
+
+    watch = sub.add_parser('watch', help="Vigilar data/ y regenerar solo las salidas obsoletas")
+    watch.add_argument('--delay', type=float, default=2.0, help="Segundos sin cambios antes de reconstruir")
+    watch.add_argument('--poll', action='store_true', help="Sondear el directorio aunque watchdog esté instalado")
+    watch.add_argument('--interval', type=float, default=5.0, help="Segundos entre sondeos")
+    watch.set_defaults(func=cmd_watch)
+    return parser
+
+
+def main(argv=None):
+    args = construir_parser().parse_args(argv)
+    if hasattr(args, 'csv'):
+        args.csv = args.csv or csv_mas_reciente()
+    crear_directorios()
+    return args.func(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,417 @@
+"""Áreas de captación de ubicaciones candidatas.
+
+Para cada candidata (lat, lng) se cuentan los competidores dentro de un
+radio andando y otro en coche, con su mezcla de ratings (rating medio y
+reparto por tramos) y cuántos son franquicias.
+
+Motor de distancias:
+- Los competidores se indexan en una rejilla de celdas del tamaño del radio
+  mayor. Las candidatas se agrupan por celda y cada grupo solo se compara
+  con los competidores de las 9 celdas vecinas.
+- Las distancias haversine de cada grupo se calculan como un bloque NumPy
+  (candidatas x competidores) y los agregados salen de productos de
+  matrices con la máscara de cada radio.
+- Con un grafo de carreteras (`--graph`), la distancia pasa a ser la de red:
+  candidatas y competidores se enganchan al nodo más cercano y se usan
+  árboles de caminos mínimos (Dijkstra acotado al radio) desde el nodo de
+  cada candidata. Los árboles se guardan en `output/cache/catchment/` y se
+  reutilizan entre ejecuciones mientras el grafo no cambie.
+
+El grafo es una tabla de aristas (CSV o Parquet) con columnas `u_lat`,
+`u_lng`, `v_lat`, `v_lng` y opcionalmente `longitud_m` (si falta, se usa la
+distancia haversine) y `sentido_unico`. Los nodos se identifican por sus
+coordenadas redondeadas a 1e-6 grados.
+"""
+import os
+
+from project_paths import cache_dir, reports_dir
+
+RADIO_TIERRA = 6_371_008.8  # metros
+RADIOS_POR_DEFECTO = {'andando': 800.0, 'coche': 5_000.0}
+TRAMOS_RATING = [('rating_lt4', None, 4.0), ('rating_4_4.5', 4.0, 4.5), ('rating_ge4.5', 4.5, None)]
+catchment_cache_dir = os.path.join(cache_dir, 'catchment')
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Distancia en metros entre arrays en radianes (admite broadcasting)."""
+    import numpy as np
+
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * RADIO_TIERRA * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class IndiceRejilla:
+    """Índice espacial de puntos en celdas de `celda_m` metros (como mínimo)."""
+
+    _DESPLAZAMIENTO = 1 << 31
+
+    def __init__(self, lat, lng, celda_m):
+        import numpy as np
+
+        self.lat = np.radians(np.asarray(lat, dtype=np.float64))
+        self.lng = np.radians(np.asarray(lng, dtype=np.float64))
+        self.paso_lat = celda_m / RADIO_TIERRA
+        # Con el coseno de la latitud más extrema, ninguna celda es más estrecha que celda_m
+        lat_max = np.abs(self.lat).max() if len(self.lat) else 0.0
+        self.paso_lng = celda_m / (RADIO_TIERRA * max(np.cos(lat_max), 1e-6))
+        ci, cj = self._celdas(self.lat, self.lng)
+        claves = self._claves(ci, cj)
+        self.orden = np.argsort(claves, kind='stable')
+        self.claves = claves[self.orden]
+        # Celdas ocupadas y su rango en `orden`, para los anillos anchos de mas_cercano
+        _, self.inicio_ocupadas = np.unique(self.claves, return_index=True)
+        self.fin_ocupadas = np.append(self.inicio_ocupadas[1:], len(self.claves))
+        self.i_ocupadas = ci[self.orden][self.inicio_ocupadas]
+        self.j_ocupadas = cj[self.orden][self.inicio_ocupadas]
+
+    def _celdas(self, lat, lng):
+        import numpy as np
+
+        return np.floor(lat / self.paso_lat).astype(np.int64), np.floor(lng / self.paso_lng).astype(np.int64)
+
+    def _claves(self, i, j):
+        return (i + self._DESPLAZAMIENTO) * (2 * self._DESPLAZAMIENTO) + (j + self._DESPLAZAMIENTO)
+
+    def _agrupar(self, lat, lng):
+        # Celdas distintas de las consultas y, por celda, el rango de sus consultas en `grupos`
+        import numpy as np
+
+        ci, cj = self._celdas(np.radians(lat), np.radians(lng))
+        celdas, inversa = np.unique(np.stack([ci, cj], axis=1), axis=0, return_inverse=True)
+        inversa = inversa.ravel()
+        grupos = np.argsort(inversa, kind='stable')
+        limites = np.searchsorted(inversa[grupos], np.arange(len(celdas) + 1))
+        return celdas, grupos, limites
+
+    def _anillo(self, i, j, desde, hasta):
+        # Puntos de las celdas a distancia de Chebyshev en (desde, hasta] de la celda (i, j).
+        # Si el anillo tiene más celdas que celdas ocupadas hay, se filtran las ocupadas
+        import numpy as np
+
+        lado = 2 * hasta + 1
+        if lado * lado - (2 * desde + 1) ** 2 <= len(self.i_ocupadas):
+            di, dj = np.divmod(np.arange(lado * lado), lado)
+            di, dj = di - hasta, dj - hasta
+            fuera = np.maximum(np.abs(di), np.abs(dj)) > desde
+            claves = self._claves(i + di[fuera], j + dj[fuera])
+            inicios = np.searchsorted(self.claves, claves, side='left')
+            finales = np.searchsorted(self.claves, claves, side='right')
+        else:
+            distancia = np.maximum(np.abs(self.i_ocupadas - i), np.abs(self.j_ocupadas - j))
+            dentro = (distancia > desde) & (distancia <= hasta)
+            inicios, finales = self.inicio_ocupadas[dentro], self.fin_ocupadas[dentro]
+        longitudes = finales - inicios
+        posiciones = np.arange(longitudes.sum()) + np.repeat(inicios - (np.cumsum(longitudes) - longitudes), longitudes)
+        return self.orden[posiciones]
+
+    def _cota(self, r, cos_max):
+        # Distancia mínima (m) a cualquier punto a más de r anillos: difiere en más
+        # de r celdas en latitud o en longitud. En la fórmula haversine, sin²(d/2) es al
+        # menos cos(lat1)·cos(lat2)·sin²(dlng/2), y cos(lat) >= cos_max para todos los puntos
+        import numpy as np
+
+        por_lat = RADIO_TIERRA * r * self.paso_lat
+        por_lng = 2 * RADIO_TIERRA * np.arcsin(min(1.0, cos_max * np.sin(min(r * self.paso_lng, np.pi) / 2)))
+        return min(por_lat, por_lng)
+
+    def _anillos_hasta(self, distancia, cos_max):
+        # Menor r con _cota(r) >= distancia: los anillos que hay que cubrir para descartar el resto
+        import numpy as np
+
+        por_lat = distancia / (RADIO_TIERRA * self.paso_lat)
+        seno = np.sin(distancia / (2 * RADIO_TIERRA)) / max(cos_max, 1e-12)
+        por_lng = 2 * np.arcsin(seno) / self.paso_lng if seno < 1 else np.inf
+        return int(np.ceil(max(por_lat, por_lng))) if np.isfinite(max(por_lat, por_lng)) else None
+
+    def bloques(self, lat, lng):
+        """Genera `(indices_consulta, indices_puntos)` por celda de las consultas.
+
+        `indices_puntos` son los puntos del índice en las 9 celdas alrededor,
+        es decir, todos los que pueden estar a menos de `celda_m` metros.
+        """
+        import numpy as np
+
+        celdas, grupos, limites = self._agrupar(lat, lng)
+
+        # Rangos de las 9 celdas vecinas de cada celda, buscados de una vez
+        di, dj = np.meshgrid([-1, 0, 1], [-1, 0, 1], indexing='ij')
+        vecinas = self._claves(celdas[:, :1] + di.ravel(), celdas[:, 1:] + dj.ravel())
+        inicios = np.searchsorted(self.claves, vecinas, side='left')
+        finales = np.searchsorted(self.claves, vecinas, side='right')
+
+        for g in range(len(celdas)):
+            consulta = grupos[limites[g]:limites[g + 1]]
+            rangos = [self.orden[a:b] for a, b in zip(inicios[g], finales[g]) if b > a]
+            puntos = np.concatenate(rangos) if rangos else np.empty(0, dtype=np.int64)
+            yield consulta, puntos
+
+    def mas_cercano(self, lat, lng):
+        """Índice y distancia (m) del punto más cercano a cada consulta.
+
+        Cada grupo de consultas de una celda busca en anillos de celdas cada
+        vez más anchos: primero hasta el anillo ocupado más próximo y luego
+        hasta el que deja fuera todo lo que esté más lejos que el mejor punto
+        encontrado, así que es exacto y no recorre las celdas vacías de los
+        grafos dispersos.
+        """
+        import numpy as np
+
+        lat_r, lng_r = np.radians(lat), np.radians(lng)
+        indices = np.full(len(lat_r), -1, dtype=np.int64)
+        distancias = np.full(len(lat_r), np.inf)
+        if not len(self.lat) or not len(lat_r):
+            return indices, distancias
+        cos_max = np.cos(max(np.abs(lat_r).max(), np.abs(self.lat).max()))
+
+        celdas, grupos, limites = self._agrupar(lat, lng)
+        for g, (i, j) in enumerate(celdas):
+            consulta = grupos[limites[g]:limites[g + 1]]
+            mejor_d = np.full(len(consulta), np.inf)
+            mejor_i = np.full(len(consulta), -1, dtype=np.int64)
+            anillo = np.maximum(np.abs(self.i_ocupadas - i), np.abs(self.j_ocupadas - j))
+            alcance = anillo.max()
+            # Se empieza en el primer anillo con puntos, sin recorrer los vacíos
+            desde, hasta = -1, anillo.min()
+            while True:
+                puntos = self._anillo(i, j, desde, hasta)
+                if len(puntos):
+                    d = haversine(lat_r[consulta, None], lng_r[consulta, None], self.lat[puntos], self.lng[puntos])
+                    k = d.argmin(axis=1)
+                    dk = d[np.arange(len(consulta)), k]
+                    mejora = dk < mejor_d
+                    mejor_d[mejora] = dk[mejora]
+                    mejor_i[mejora] = puntos[k[mejora]]
+                if hasta >= alcance or mejor_d.max() <= self._cota(hasta, cos_max):
+                    break
+                # Siguiente anchura: la que descarta todo lo que esté más lejos que el mejor actual
+                necesarios = self._anillos_hasta(mejor_d.max(), cos_max)
+                desde, hasta = hasta, min(alcance, max(hasta + 1, necesarios if necesarios is not None else alcance))
+            indices[consulta] = mejor_i
+            distancias[consulta] = mejor_d
+        return indices, distancias
+
+
+class GrafoCarreteras:
+    """Grafo de carreteras en formato CSR con árboles de caminos mínimos cacheados."""
+
+    def __init__(self, ruta):
+        import numpy as np
+        import pandas as pd
+
+        from project_paths import firma_archivo
+
+        aristas = pd.read_parquet(ruta) if ruta.endswith('.parquet') else pd.read_csv(ruta)
+        extremos = np.concatenate([aristas[['u_lat', 'u_lng']].to_numpy(np.float64),
+                                   aristas[['v_lat', 'v_lng']].to_numpy(np.float64)])
+        nodos, inversa = np.unique(np.round(extremos, 6), axis=0, return_inverse=True)
+        inversa = inversa.ravel()
+        u, v = inversa[:len(aristas)], inversa[len(aristas):]
+        if 'longitud_m' in aristas:
+            peso = aristas['longitud_m'].to_numpy(np.float64)
+        else:
+            rad = np.radians(extremos)
+            peso = haversine(rad[:len(aristas), 0], rad[:len(aristas), 1], rad[len(aristas):, 0], rad[len(aristas):, 1])
+        doble = ~aristas['sentido_unico'].astype(bool).to_numpy() if 'sentido_unico' in aristas else np.ones(len(u), bool)
+        origen = np.concatenate([u, v[doble]])
+        destino = np.concatenate([v, u[doble]])
+        peso = np.concatenate([peso, peso[doble]])
+
+        orden = np.argsort(origen, kind='stable')
+        self.indptr = np.searchsorted(origen[orden], np.arange(len(nodos) + 1))
+        self.vecinos = destino[orden]
+        self.pesos = peso[orden]
+        self.nodos = nodos
+        self.indice = IndiceRejilla(nodos[:, 0], nodos[:, 1], 500.0)
+        firma = firma_archivo(ruta)
+        self._clave_cache = f"{os.path.basename(ruta)}_{firma['size']}_{firma['mtime_ns']}"
+        self._arboles = {}
+        self._limite_cache = None
+
+    def _ruta_cache(self, limite):
+        return os.path.join(catchment_cache_dir, f'arboles_{self._clave_cache}_{int(limite)}.npz')
+
+    def cargar_arboles(self, limite):
+        """Lee del disco los árboles calculados antes con el mismo grafo y límite."""
+        import numpy as np
+
+        self._limite_cache = limite
+        ruta = self._ruta_cache(limite)
+        if not os.path.exists(ruta):
+            return
+        with np.load(ruta) as npz:
+            fuentes, offsets, nodos, distancias = npz['fuentes'], npz['offsets'], npz['nodos'], npz['distancias']
+        for i, fuente in enumerate(fuentes):
+            self._arboles[int(fuente)] = (nodos[offsets[i]:offsets[i + 1]], distancias[offsets[i]:offsets[i + 1]])
+
+    def guardar_arboles(self):
+        import numpy as np
+
+        if self._limite_cache is None or not self._arboles:
+            return
+        os.makedirs(catchment_cache_dir, exist_ok=True)
+        fuentes = np.array(sorted(self._arboles), dtype=np.int64)
+        partes = [self._arboles[int(f)] for f in fuentes]
+        offsets = np.concatenate([[0], np.cumsum([len(n) for n, _ in partes])])
+        np.savez(self._ruta_cache(self._limite_cache), fuentes=fuentes, offsets=offsets,
+                 nodos=np.concatenate([n for n, _ in partes]), distancias=np.concatenate([d for _, d in partes]))
+
+    def arbol(self, fuente, limite):
+        """Nodos alcanzables desde `fuente` a menos de `limite` m y su distancia (ordenados por nodo)."""
+        import heapq
+
+        import numpy as np
+
+        if fuente in self._arboles:
+            return self._arboles[fuente]
+        distancias = {fuente: 0.0}
+        cola = [(0.0, fuente)]
+        indptr, vecinos, pesos = self.indptr, self.vecinos, self.pesos
+        while cola:
+            d, nodo = heapq.heappop(cola)
+            if d > distancias.get(nodo, np.inf):
+                continue
+            for k in range(indptr[nodo], indptr[nodo + 1]):
+                nueva = d + pesos[k]
+                vecino = int(vecinos[k])
+                if nueva <= limite and nueva < distancias.get(vecino, np.inf):
+                    distancias[vecino] = nueva
+                    heapq.heappush(cola, (nueva, vecino))
+        nodos = np.fromiter(distancias.keys(), dtype=np.int64, count=len(distancias))
+        valores = np.fromiter(distancias.values(), dtype=np.float64, count=len(distancias))
+        orden = np.argsort(nodos)
+        self._arboles[fuente] = (nodos[orden], valores[orden])
+        return self._arboles[fuente]
+
+    def enganchar(self, lat, lng):
+        """Nodo más cercano a cada punto y distancia hasta él."""
+        return self.indice.mas_cercano(lat, lng)
+
+
+def _caracteristicas(competidores):
+    # Columnas que se suman por candidata: total, franquicias, ratings y tramos
+    import numpy as np
+
+    score = competidores['score'].to_numpy(dtype=np.float64)
+    valido = ~np.isnan(score)
+    columnas = [np.ones(len(score)), competidores['es_franquicia'].to_numpy(dtype=np.float64),
+                valido.astype(np.float64), np.where(valido, score, 0.0)]
+    for _, desde, hasta in TRAMOS_RATING:
+        tramo = valido.copy()
+        if desde is not None:
+            tramo &= score >= desde
+        if hasta is not None:
+            tramo &= score < hasta
+        columnas.append(tramo.astype(np.float64))
+    return np.stack(columnas, axis=1)
+
+
+def captacion(candidatas, competidores, radios=None, grafo=None):
+    """Competidores y mezcla de ratings alrededor de cada candidata.
+
+    `candidatas` y `competidores` son DataFrames con `lat` y `lng` (los
+    competidores, además, con `score` y `es_franquicia`). `radios` es un
+    dict nombre -> metros. Devuelve una copia de `candidatas` con columnas
+    `<métrica>_<radio>`.
+    """
+    import numpy as np
+
+    radios = radios or RADIOS_POR_DEFECTO
+    radio_max = max(radios.values())
+    nombres = list(radios)
+    limites = np.array([radios[n] for n in nombres])
+
+    lat_c = candidatas['lat'].to_numpy(np.float64)
+    lng_c = candidatas['lng'].to_numpy(np.float64)
+    lat_r, lng_r = np.radians(lat_c), np.radians(lng_c)
+    indice = IndiceRejilla(competidores['lat'], competidores['lng'], radio_max)
+    caracteristicas = _caracteristicas(competidores)
+    sumas = np.zeros((len(radios), len(candidatas), caracteristicas.shape[1]))
+
+    if grafo is not None:
+        grafo.cargar_arboles(radio_max)
+        nodo_cand, enganche_cand = grafo.enganchar(lat_c, lng_c)
+        nodo_comp, enganche_comp = grafo.enganchar(competidores['lat'].to_numpy(np.float64),
+                                                   competidores['lng'].to_numpy(np.float64))
+
+    for consulta, puntos in indice.bloques(lat_c, lng_c):
+        if not len(puntos):
+            continue
+        distancias = haversine(lat_r[consulta, None], lng_r[consulta, None], indice.lat[puntos], indice.lng[puntos])
+        if grafo is not None:
+            # La distancia por carretera nunca es menor que la línea recta: solo se
+            # calcula para los competidores que ya están dentro del radio mayor
+            red = np.full(distancias.shape, np.inf)
+            for fila, candidata in enumerate(consulta):
+                cerca = np.flatnonzero(distancias[fila] <= radio_max)
+                if not len(cerca):
+                    continue
+                nodos, dist_nodos = grafo.arbol(int(nodo_cand[candidata]), radio_max)
+                destino = nodo_comp[puntos[cerca]]
+                pos = np.minimum(np.searchsorted(nodos, destino), len(nodos) - 1)
+                alcanzado = nodos[pos] == destino
+                red[fila, cerca[alcanzado]] = (enganche_cand[candidata] + dist_nodos[pos[alcanzado]]
+                                               + enganche_comp[puntos[cerca[alcanzado]]])
+            distancias = red
+        for r, limite in enumerate(limites):
+            mascara = (distancias <= limite).astype(np.float64)
+            sumas[r, consulta] += mascara @ caracteristicas[puntos]
+
+    if grafo is not None:
+        grafo.guardar_arboles()
+
+    resultado = candidatas.copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for r, nombre in enumerate(nombres):
+            total, franquicias, con_rating, suma_rating = (sumas[r, :, k] for k in range(4))
+            resultado[f'competidores_{nombre}'] = total.astype(np.int64)
+            resultado[f'franquicias_{nombre}'] = franquicias.astype(np.int64)
+            resultado[f'rating_medio_{nombre}'] = suma_rating / con_rating
+            for k, (tramo, _, _) in enumerate(TRAMOS_RATING, start=4):
+                resultado[f'{tramo}_{nombre}'] = sumas[r, :, k].astype(np.int64)
+    return resultado
+
+
+def candidatas_aleatorias(competidores, n, dispersion_m=2_000.0, semilla=0):
+    """Candidatas de prueba alrededor de locales existentes (desplazadas al azar)."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(semilla)
+    base = competidores[['lat', 'lng']].to_numpy(np.float64)[rng.integers(len(competidores), size=n)]
+    dlat = rng.normal(scale=dispersion_m, size=n) / RADIO_TIERRA
+    dlng = rng.normal(scale=dispersion_m, size=n) / (RADIO_TIERRA * np.cos(np.radians(base[:, 0])))
+    return pd.DataFrame({'lat': base[:, 0] + np.degrees(dlat), 'lng': base[:, 1] + np.degrees(dlng)})
+
+
+def main(csv_path, ruta_candidatas=None, aleatorias=10_000, radios=None, ruta_grafo=None,
+         ruta_salida=None, refrescar=False):
+    import time
+
+    import pandas as pd
+
+    import dataset_loader
+
+    competidores = dataset_loader.cargar(csv_path, columnas=['lat', 'lng', 'score', 'es_franquicia'], refrescar=refrescar)
+    if ruta_candidatas:
+        candidatas = pd.read_parquet(ruta_candidatas) if ruta_candidatas.endswith('.parquet') else pd.read_csv(ruta_candidatas)
+    else:
+        candidatas = candidatas_aleatorias(competidores, aleatorias)
+    grafo = GrafoCarreteras(ruta_grafo) if ruta_grafo else None
+
+    inicio = time.perf_counter()
+    resultado = captacion(candidatas, competidores, radios, grafo)
+    duracion = time.perf_counter() - inicio
+    radios = radios or RADIOS_POR_DEFECTO
+    modo = "por carretera" if grafo else "en línea recta"
+    print(f"{len(candidatas)} candidatas x {len(competidores)} competidores ({modo}) en {duracion:.2f}s")
+
+    ruta_salida = ruta_salida or os.path.join(reports_dir, 'captacion.csv')
+    resultado.to_csv(ruta_salida, index=False, float_format='%.4f')
+    print(f"Resultados guardados en {ruta_salida}")
+    for nombre, metros in radios.items():
+        columna = resultado[f'competidores_{nombre}']
+        print(f"Radio {nombre} ({metros:g} m): mediana {columna.median():.0f} competidores, "
+              f"{(columna == 0).mean() * 100:.1f}% de candidatas sin competencia")
+    return resultado
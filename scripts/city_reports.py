@@ -0,0 +1,210 @@
+"""Reportes por ciudad generados en paralelo.
+
+Para cada una de las N ciudades con más hamburgueserías se repite el
+análisis de `data_analisis_burger` (franquicias, precios, ratings,
+emergentes) con sus propios gráficos y mapa de calor, en
+`output/reports/ciudades/<ciudad>/`, y se escribe un índice que enlaza todas.
+
+Los datos limpios se agrupan una sola vez: la tabla Arrow se filtra a las
+ciudades elegidas y se ordena por ciudad, de modo que cada ciudad es un
+rango contiguo de filas. La tabla se escribe en formato Arrow IPC
+directamente en un bloque de memoria compartida; cada proceso la abre sin
+copiarla y recibe solo `(ciudad, desde, filas)`, en lugar de un DataFrame
+serializado con pickle.
+"""
+import html
+import os
+import re
+import unicodedata
+
+from project_paths import reports_dir
+
+ciudades_dir = os.path.join(reports_dir, 'ciudades')
+TOP_CIUDADES = 50
+DPI_CIUDAD = 120  # los PNG se muestran tal cual en la página, sin miniatura
+GRAFICOS_CIUDAD = ['distribucion_precio_comparativa.png', 'franquicias_vs_independientes.png', 'rating_por_precio.png']
+COLUMNAS = ['id', 'name', 'lat', 'lng', 'ratings', 'score', 'price', 'precio_bucket', 'city', 'address', 'es_franquicia']
+
+
+def nombre_directorio(ciudad):
+    """Nombre de carpeta seguro para una ciudad ('A Coruña' -> 'a-coruna')."""
+    texto = unicodedata.normalize('NFKD', str(ciudad)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', texto.lower()).strip('-') or 'ciudad'
+
+
+def agrupar(tabla, top=TOP_CIUDADES):
+    """Filtra la tabla Arrow a las `top` ciudades y la ordena por ciudad.
+
+    Devuelve la tabla ordenada y la lista `(ciudad, desde, filas)` en orden
+    de número de locales.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    conteos = pc.value_counts(tabla['city'].drop_null()).to_pylist()
+    conteos.sort(key=lambda c: -c['counts'])
+    elegidas = [c['values'] for c in conteos[:top]]
+
+    columnas = [c for c in COLUMNAS if c in tabla.column_names]
+    filtrada = tabla.filter(pc.is_in(tabla['city'], value_set=pa.array(elegidas))).select(columnas)
+    ordenada = filtrada.sort_by('city')
+    ciudades = ordenada['city'].to_pylist()
+
+    rangos = {}
+    for i, ciudad in enumerate(ciudades):
+        if ciudad not in rangos:
+            rangos[ciudad] = [i, 0]
+        rangos[ciudad][1] += 1
+    return ordenada, [(c, rangos[c][0], rangos[c][1]) for c in elegidas]
+
+
+def _escribir_en_memoria_compartida(tabla):
+    # Primero se mide el tamaño del stream IPC y luego se escribe directamente en el bloque
+    import pyarrow as pa
+    from multiprocessing import shared_memory
+
+    def escribir(destino):
+        with pa.ipc.new_stream(destino, tabla.schema) as writer:
+            writer.write_table(tabla)
+
+    medidor = pa.MockOutputStream()
+    escribir(medidor)
+    tamano = medidor.size()
+    bloque = shared_memory.SharedMemory(create=True, size=max(tamano, 1))
+    escribir(pa.FixedSizeBufferWriter(pa.py_buffer(bloque.buf)))
+    return bloque, tamano
+
+
+_bloque = None
+_tabla = None
+
+
+def _iniciar_trabajador(nombre_bloque, tamano):
+    # Cada proceso abre el bloque una vez; la tabla apunta a la memoria compartida sin copiarla
+    global _bloque, _tabla
+    import pyarrow as pa
+    from multiprocessing import shared_memory
+
+    # El proceso principal crea y borra el bloque; los trabajadores (hijos
+    # suyos) comparten su resource_tracker, así que no hace falta desregistrarlo
+    _bloque = shared_memory.SharedMemory(name=nombre_bloque)
+    _tabla = pa.ipc.open_stream(pa.py_buffer(_bloque.buf)[:tamano]).read_all()
+
+
+def pagina_ciudad(ciudad, est, graficos, ruta_mapa, directorio):
+    """HTML de una ciudad, con las mismas tablas que el reporte nacional."""
+    import report_builder
+
+    secciones = [
+        ('Estadísticas clave', report_builder.render_resumen(est), None),
+        ('Franquicias vs independientes', report_builder.render_franquicias(est), 'franquicias_vs_independientes.png'),
+        ('Distribución por precio', report_builder.render_precios(est), 'distribucion_precio_comparativa.png'),
+        ('Relación precio-rating', report_builder.render_precio_rating(est), 'rating_por_precio.png'),
+        ('Top 10 hamburgueserías mejor valoradas (mín. 50 reseñas)',
+         report_builder.tabla_lugares(est['top_hamburgueserias']), None),
+        ('Hamburgueserías emergentes (alto rating, 10-50 reseñas)',
+         report_builder.tabla_lugares(est['emergentes']), None),
+    ]
+    cuerpo = []
+    for titulo, tabla_html, png in secciones:
+        cuerpo.append(f'<section><h2>{html.escape(titulo)}</h2>')
+        if png in graficos:
+            cuerpo.append(f'<a href="{png}"><img src="{png}" alt="{html.escape(titulo)}"></a>')
+        cuerpo.append(tabla_html + '</section>')
+    mapa = os.path.relpath(ruta_mapa, directorio).replace(os.sep, '/')
+    return report_builder.pagina(f'Hamburgueserías en {ciudad}', f"""<p><a href="../index.html">&larr; Todas las ciudades</a></p>
+<h1>Hamburgueserías en {html.escape(ciudad)}</h1>
+<p><a href="{html.escape(mapa)}">Mapa de calor</a> (servir la carpeta por HTTP para verlo)</p>
+{''.join(cuerpo)}""")
+
+
+def _procesar_ciudad(tarea):
+    """Gráficos, mapa y página de una ciudad; devuelve su fila del índice."""
+    import contextlib
+    import io
+
+    import data_analisis_burger
+    import geo_analysis
+
+    ciudad, desde, filas, directorio = tarea
+    hamburger_df = _tabla.slice(desde, filas).to_pandas()
+    est = data_analisis_burger.calcular_estadisticas(hamburger_df)
+    os.makedirs(directorio, exist_ok=True)
+
+    generadores = {
+        'distribucion_precio_comparativa.png': data_analisis_burger.grafico_distribucion_precio,
+        'franquicias_vs_independientes.png': data_analisis_burger.grafico_ratings,
+        'rating_por_precio.png': data_analisis_burger.grafico_rating_por_precio,
+    }
+    # Los generadores imprimen su progreso; con 50 ciudades en paralelo solo se informa al final
+    with contextlib.redirect_stdout(io.StringIO()):
+        graficos = [os.path.basename(generadores[nombre](est, directorio, DPI_CIUDAD)) for nombre in GRAFICOS_CIUDAD]
+        centro = [float(hamburger_df['lat'].median()), float(hamburger_df['lng'].median())]
+        ruta_mapa = geo_analysis.mapa_calor(hamburger_df, directorio, os.path.join(directorio, 'data'), centro, zoom=12)
+
+    with open(os.path.join(directorio, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(pagina_ciudad(ciudad, est, graficos, ruta_mapa, directorio))
+    return {
+        'ciudad': ciudad,
+        'directorio': os.path.basename(directorio),
+        'n': est['total_hamburgueserias'],
+        'franquicias_pct': est['franquicias_pct'],
+        'rating': est['rating_promedio'],
+        'emergentes': len(est['emergentes']),
+    }
+
+
+def escribir_indice(filas, csv_path, directorio=ciudades_dir):
+    import report_builder
+
+    tabla = report_builder.tabla(
+        ['#', 'Ciudad', 'Hamburgueserías', 'Franquicias (%)', 'Rating promedio', 'Emergentes'],
+        [[i, report_builder.enlace(f['ciudad'], f"{f['directorio']}/index.html"), f['n'],
+          f"{f['franquicias_pct']:.1f}", f"{f['rating']:.2f}", f['emergentes']]
+         for i, f in enumerate(filas, 1)])
+    ruta = os.path.join(directorio, 'index.html')
+    with open(ruta, 'w', encoding='utf-8') as fichero:
+        fichero.write(report_builder.pagina('Hamburgueserías por ciudad', f"""<p><a href="../reporte_mercado.html">&larr; Reporte nacional</a></p>
+<h1>Hamburgueserías por ciudad</h1>
+<p>Datos: {html.escape(os.path.basename(csv_path))} &middot; {len(filas)} ciudades</p>
+{tabla}"""))
+    return ruta
+
+
+def generar(csv_path, top=TOP_CIUDADES, trabajadores=None, refrescar=False):
+    """Genera los reportes de las `top` ciudades en paralelo y el índice."""
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    import dataset_loader
+
+    inicio = time.perf_counter()
+    ordenada, ciudades = agrupar(dataset_loader.tabla(csv_path, refrescar), top)
+    bloque, tamano = _escribir_en_memoria_compartida(ordenada)
+
+    # Dos ciudades con el mismo nombre de carpeta (p. ej. con y sin tilde) no se pisan
+    usados = set()
+    tareas = []
+    for ciudad, desde, filas in ciudades:
+        nombre = base = nombre_directorio(ciudad)
+        sufijo = 2
+        while nombre in usados:
+            nombre, sufijo = f'{base}-{sufijo}', sufijo + 1
+        usados.add(nombre)
+        tareas.append((ciudad, desde, filas, os.path.join(ciudades_dir, nombre)))
+
+    try:
+        with ProcessPoolExecutor(max_workers=trabajadores, initializer=_iniciar_trabajador,
+                                 initargs=(bloque.name, tamano)) as pool:
+            filas = []
+            for fila in pool.map(_procesar_ciudad, tareas):
+                print(f"{fila['ciudad']}: {fila['n']} hamburgueserías")
+                filas.append(fila)
+    finally:
+        bloque.close()
+        bloque.unlink()
+
+    os.makedirs(ciudades_dir, exist_ok=True)
+    ruta = escribir_indice(filas, csv_path)
+    print(f"{len(filas)} ciudades generadas en {time.perf_counter() - inicio:.1f}s; índice en {ruta}")
+    return ruta
@@ -1,246 +1,360 @@
 import os
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# Obtener el directorio del script
-script_dir = os.path.dirname(os.path.abspath(__file__))
-project_dir = os.path.dirname(script_dir)  # Directorio principal del proyecto
-
-# Definir rutas
-data_dir = os.path.join(project_dir, 'data')
-output_dir = os.path.join(project_dir, 'output')
-viz_dir = os.path.join(output_dir, 'visualizations')
-maps_dir = os.path.join(output_dir, 'maps')
-reports_dir = os.path.join(output_dir, 'reports')
-
-# Crear directorios si no existen
-for directory in [data_dir, output_dir, viz_dir, maps_dir, reports_dir]:
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-        print(f"Creado directorio: {directory}")
-
-# Construir ruta al archivo CSV
-csv_path = os.path.join(data_dir, 'BurgersSpain_20250216_2154.csv')
-
-# Cargar datos si el archivo existe
-if os.path.exists(csv_path):
+
+from project_paths import crear_directorios, csv_mas_reciente, data_dir, viz_dir
+
+# Las librerías pesadas (pandas, numpy, matplotlib, folium) se importan dentro
+# de cada función para que la CLI solo pague el coste de lo que necesita.
+
+UMBRAL_FRANQUICIA = 5  # locales mínimos con el mismo nombre para ser franquicia
+TOP_EMERGENTES = 15  # emergentes que se listan (y cuentan por ciudad)
+
+
+def cargar_datos(csv_path):
+    """Carga el CSV del scrapeo de Google Maps."""
+    import pandas as pd
+
+    if not os.path.exists(csv_path):
+        print(f"ERROR: El archivo CSV no se encuentra en {csv_path}")
+        print("Por favor, coloca el archivo en la carpeta correcta y vuelve a ejecutar el script.")
+        exit(1)  # Salir del script con código de error
+
     print(f"Cargando datos desde: {csv_path}")
     df = pd.read_csv(csv_path)
     print(f"Datos cargados: {df.shape[0]} filas, {df.shape[1]} columnas")
-else:
-    print(f"ERROR: El archivo CSV no se encuentra en {csv_path}")
-    print("Por favor, coloca el archivo en la carpeta correcta y vuelve a ejecutar el script.")
-    exit(1)  # Salir del script con código de error
-
-# Filtrar solo hamburgueserías
-hamburger_df = df[df['category'].str.lower().str.contains('hamburger restaurant', na=False)]
-print(f"Registros filtrados (solo hamburgueserías): {hamburger_df.shape[0]} de {df.shape[0]}")
-
-# Limpieza de datos
-# 1. Eliminar duplicados
-hamburger_df = hamburger_df.drop_duplicates(subset=['id'])
-
-# 2. Convertir tipos de datos
-hamburger_df['lat'] = pd.to_numeric(hamburger_df['lat'], errors='coerce')
-hamburger_df['lng'] = pd.to_numeric(hamburger_df['lng'], errors='coerce')
-hamburger_df['ratings'] = pd.to_numeric(hamburger_df['ratings'], errors='coerce')
-hamburger_df['score'] = pd.to_numeric(hamburger_df['score'], errors='coerce')
-
-# 3. Manejar valores faltantes
-hamburger_df = hamburger_df.dropna(subset=['lat', 'lng'])  # Esenciales para análisis geográfico
-hamburger_df['ratings'] = hamburger_df['ratings'].fillna(0)
-
-# 4. Crear columnas derivadas
-# Identificar franquicias (más de 5 establecimientos)
-nombre_conteo = hamburger_df['name'].value_counts()
-franquicias = nombre_conteo[nombre_conteo >= 5].index.tolist()
-hamburger_df['es_franquicia'] = hamburger_df['name'].isin(franquicias)
-
-# Guardar el dataframe limpio para análisis posteriores
-hamburger_df.to_csv(os.path.join(data_dir, 'hamburgueserias_limpias.csv'), index=False)
-print("Datos limpios guardados en 'datos/hamburgueserias_limpias.csv'")
-# Para guardar visualizaciones, mapas y reportes:
-plt.savefig(os.path.join(viz_dir, 'top_ciudades.png'), dpi=300)
-
-# Crear un mapa de calor (ejemplo usando folium)
-import folium
-from folium.plugins import HeatMap
-
-# Crear un mapa base centrado en España
-mapa = folium.Map(location=[40.416775, -3.703790], zoom_start=6)
-
-# Añadir capa de calor
-heat_data = [[row['lat'], row['lng']] for index, row in hamburger_df.iterrows()]
-HeatMap(heat_data).add_to(mapa)
-
-# Guardar el mapa
-mapa.save(os.path.join(maps_dir, 'mapa_calor_hamburgueserias.html'))
-# Separar franquicias e independientes
-franquicias_df = hamburger_df[hamburger_df['es_franquicia']]
-independientes_df = hamburger_df[~hamburger_df['es_franquicia']]
-
-# Estadísticas básicas
-print(f"\nTotal de franquicias: {len(franquicias_df)} ({len(franquicias_df)/len(hamburger_df)*100:.1f}%)")
-print(f"Total de independientes: {len(independientes_df)} ({len(independientes_df)/len(hamburger_df)*100:.1f}%)")
-
-# Top franquicias
-franquicias_top = franquicias_df['name'].value_counts().head(10)
-print("\nPRINCIPALES FRANQUICIAS:")
-for i, (nombre, cantidad) in enumerate(franquicias_top.items(), 1):
-    print(f"{i}. {nombre}: {cantidad} establecimientos")
-
-# Comparar distribución por precio
-precio_franquicias = franquicias_df['price'].value_counts(normalize=True).sort_index() * 100
-precio_independientes = independientes_df['price'].value_counts(normalize=True).sort_index() * 100
-
-precio_comparativa = pd.DataFrame({
-    'Franquicias (%)': precio_franquicias,
-    'Independientes (%)': precio_independientes
-}).fillna(0)
-
-print("\nDISTRIBUCIÓN POR PRECIO:")
-print(precio_comparativa)
-
-# Visualizar distribución por precio
-plt.figure(figsize=(12, 7))
-x = np.arange(len(precio_comparativa.index))
-width = 0.35
-
-plt.bar(x - width/2, precio_comparativa['Franquicias (%)'], width, label='Franquicias', color='#FF9999')
-plt.bar(x + width/2, precio_comparativa['Independientes (%)'], width, label='Independientes', color='#66B2FF')
-
-plt.xlabel('Categoría de Precio')
-plt.ylabel('Porcentaje (%)')
-plt.title('Distribución por Precio: Franquicias vs Independientes', fontsize=15)
-plt.xticks(x, precio_comparativa.index)
-plt.legend()
-plt.grid(axis='y', linestyle='--', alpha=0.7)
-plt.tight_layout()
-plt.savefig('resultados/visualizaciones/distribucion_precio_comparativa.png', dpi=300)
-plt.close()
-
-# Comparar ratings
-rating_franquicias = franquicias_df['score'].mean()
-rating_independientes = independientes_df['score'].mean()
-
-print("\nRATING PROMEDIO:")
-print(f"Franquicias: {rating_franquicias:.2f} estrellas")
-print(f"Independientes: {rating_independientes:.2f} estrellas")
-
-# Visualizar comparativa de ratings
-plt.figure(figsize=(8, 6))
-bars = plt.bar(
-    ['Franquicias', 'Independientes'],
-    [rating_franquicias, rating_independientes],
-    color=['#FF9999', '#66B2FF']
-)
-
-for bar in bars:
-    height = bar.get_height()
-    plt.text(
-        bar.get_x() + bar.get_width()/2., 
-        height*1.01,
-        f'{height:.2f}',
-        ha='center', 
-        va='bottom'
-    )
+    return df
 
-plt.title('Comparativa de Ratings: Franquicias vs Independientes', fontsize=15)
-plt.ylabel('Rating Promedio')
-plt.ylim(4.0, 4.5)  # Ajustar para mejor visualización
-plt.grid(axis='y', linestyle='--', alpha=0.7)
-plt.tight_layout()
-plt.savefig('resultados/visualizaciones/franquicias_vs_independientes.png', dpi=300)
-plt.close()
-# Relación entre precio y rating
-rating_por_precio = hamburger_df.groupby('price')['score'].agg(['mean', 'count']).reset_index()
-rating_por_precio.columns = ['Categoría de Precio', 'Rating Promedio', 'Número de Establecimientos']
-rating_por_precio = rating_por_precio[rating_por_precio['Número de Establecimientos'] > 0]
-
-print("\nRELACIÓN PRECIO-RATING:")
-print(rating_por_precio)
-
-# Visualizar relación precio-rating
-plt.figure(figsize=(10, 6))
-bars = plt.bar(
-    rating_por_precio['Categoría de Precio'],
-    rating_por_precio['Rating Promedio'],
-    color='skyblue'
-)
-
-for bar in bars:
-    height = bar.get_height()
-    plt.text(
-        bar.get_x() + bar.get_width()/2., 
-        height*1.01,
-        f'{height:.2f}',
-        ha='center', 
-        va='bottom'
-    )
 
-plt.title('Rating Promedio por Categoría de Precio', fontsize=15)
-plt.xlabel('Categoría de Precio')
-plt.ylabel('Rating Promedio')
-plt.ylim(4.0, 5.0)
-plt.grid(axis='y', linestyle='--', alpha=0.7)
-plt.tight_layout()
-plt.savefig('resultados/visualizaciones/rating_por_precio.png', dpi=300)
-plt.close()
-
-# Top hamburgueserías mejor valoradas
-top_hamburgueserias = hamburger_df[hamburger_df['ratings'] >= 50].sort_values(by='score', ascending=False).head(10)
-
-print("\nTOP 10 HAMBURGUESERÍAS MEJOR VALORADAS (MIN. 50 RESEÑAS):")
-for i, (_, row) in enumerate(top_hamburgueserias.iterrows(), 1):
-    print(f"{i}. {row['name']} ({row['city']}): {row['score']} estrellas, {row['ratings']} reseñas")
-    
+def es_hamburgueseria(df):
+    """Máscara de las filas cuya categoría es 'hamburger restaurant'."""
+    return df['category'].str.lower().str.contains('hamburger restaurant', na=False)
+
+
+def convertir_tipos(hamburger_df):
+    """Convierte las columnas numéricas, descarta las filas sin coordenadas y normaliza el precio."""
+    import pandas as pd
+
+    import price_buckets
+
+    hamburger_df['lat'] = pd.to_numeric(hamburger_df['lat'], errors='coerce')
+    hamburger_df['lng'] = pd.to_numeric(hamburger_df['lng'], errors='coerce')
+    hamburger_df['ratings'] = pd.to_numeric(hamburger_df['ratings'], errors='coerce')
+    hamburger_df['score'] = pd.to_numeric(hamburger_df['score'], errors='coerce')
+
+    # Manejar valores faltantes
+    hamburger_df = hamburger_df.dropna(subset=['lat', 'lng'])  # Esenciales para análisis geográfico
+    hamburger_df['ratings'] = hamburger_df['ratings'].fillna(0)
+
+    # Tramo de precio ordenado y punto medio en euros
+    return price_buckets.anadir_columnas(hamburger_df)
+
+
+def limpiar_datos(df):
+    """Filtra las hamburgueserías, limpia tipos y marca las franquicias."""
+    # Filtrar solo hamburgueserías
+    hamburger_df = df[es_hamburgueseria(df)]
+    print(f"Registros filtrados (solo hamburgueserías): {hamburger_df.shape[0]} de {df.shape[0]}")
+
+    # Limpieza de datos
+    # 1. Eliminar duplicados
+    hamburger_df = hamburger_df.drop_duplicates(subset=['id']).copy()
+
+    # 2. Convertir tipos de datos y 3. manejar valores faltantes
+    hamburger_df = convertir_tipos(hamburger_df)
+
+    # 4. Crear columnas derivadas
+    # Identificar franquicias (más de 5 establecimientos)
+    nombre_conteo = hamburger_df['name'].value_counts()
+    franquicias = nombre_conteo[nombre_conteo >= UMBRAL_FRANQUICIA].index.tolist()
+    hamburger_df['es_franquicia'] = hamburger_df['name'].isin(franquicias)
+
+    return hamburger_df.reset_index(drop=True)
+
+
+def _lugares(df, columnas=('name', 'city', 'score', 'ratings')):
+    # Convierte filas a diccionarios serializables en JSON
+    return [
+        {col: (row[col].item() if hasattr(row[col], 'item') else row[col]) for col in columnas}
+        for _, row in df[list(columnas)].iterrows()
+    ]
+
+
+def calcular_estadisticas(hamburger_df):
+    """Calcula todos los agregados del análisis como un diccionario serializable.
+
+    Los gráficos, el reporte y el subcomando `stats` trabajan sobre este
+    diccionario, de modo que pueden servirse desde la caché sin pandas.
+    """
+    import pandas as pd
+
+    # Separar franquicias e independientes
+    franquicias_df = hamburger_df[hamburger_df['es_franquicia']]
+    independientes_df = hamburger_df[~hamburger_df['es_franquicia']]
+
+    # Comparar distribución por tramo de precio (ordenado de más barato a más caro)
+    precio_franquicias = franquicias_df['precio_bucket'].value_counts(normalize=True).sort_index() * 100
+    precio_independientes = independientes_df['precio_bucket'].value_counts(normalize=True).sort_index() * 100
+    precio_comparativa = pd.DataFrame({
+        'Franquicias (%)': precio_franquicias,
+        'Independientes (%)': precio_independientes
+    }).fillna(0)
+    # Solo los tramos que aparecen en los datos
+    observados = hamburger_df['precio_bucket'].value_counts().sort_index()
+    precio_comparativa = precio_comparativa.loc[observados[observados > 0].index]
+
+    # Relación entre precio y rating
+    rating_por_precio = hamburger_df.groupby('precio_bucket', observed=True)['score'].agg(['mean', 'count']).reset_index()
+    rating_por_precio = rating_por_precio[rating_por_precio['count'] > 0]
+
+    # Top hamburgueserías mejor valoradas
+    # Orden estable: a igual score, el orden del CSV (así el resultado no depende del algoritmo de ordenación)
+    top_hamburgueserias = hamburger_df[hamburger_df['ratings'] >= 50].sort_values(by='score', ascending=False, kind='stable').head(10)
+
     # Hamburgueserías emergentes (alto rating pero pocas reseñas)
-emergentes = independientes_df[
-    (independientes_df['score'] >= 4.8) & 
-    (independientes_df['ratings'] >= 10) & 
-    (independientes_df['ratings'] <= 50)
-].sort_values(by=['score', 'ratings'], ascending=[False, False]).head(15)
-
-print("\nHAMBURGUESERÍAS EMERGENTES (ALTO RATING, 10-50 RESEÑAS):")
-for i, (_, row) in enumerate(emergentes.iterrows(), 1):
-    print(f"{i}. {row['name']} ({row['city']}): {row['score']} estrellas, {row['ratings']} reseñas")
-
-# Distribución geográfica de tendencias emergentes
-ciudades_emergentes = emergentes['city'].value_counts().head(10)
-print("\nCIUDADES CON MÁS HAMBURGUESERÍAS EMERGENTES:")
-for ciudad, cantidad in ciudades_emergentes.items():
-    print(f"{ciudad}: {cantidad}")
-
-# Visualizar ciudades con hamburgueserías emergentes
-plt.figure(figsize=(12, 6))
-ciudades_emergentes.plot(kind='bar', color='lightgreen')
-plt.title('Ciudades con más hamburgueserías emergentes', fontsize=15)
-plt.xlabel('Ciudad')
-plt.ylabel('Número de hamburgueserías emergentes')
-plt.xticks(rotation=45, ha='right')
-plt.tight_layout()
-plt.savefig('resultados/visualizaciones/ciudades_tendencias_emergentes.png', dpi=300)
-plt.close()
-
-from datetime import datetime
-
-# Recopilar estadísticas clave
-estadisticas = {
-    'total_hamburgueserias': len(hamburger_df),
-    'rating_promedio': hamburger_df['score'].mean(),
-    'ciudades_principales': ', '.join(hamburger_df['city'].value_counts().head(3).index.tolist()),
-    'franquicias_pct': len(franquicias_df) / len(hamburger_df) * 100,
-    'independientes_pct': len(independientes_df) / len(hamburger_df) * 100
-}
-
-# Generar reporte
-reporte = f"""
+    # A igual score y reseñas, por nombre: el barrido de sensibilidad corta igual
+    emergentes = independientes_df[
+        (independientes_df['score'] >= 4.8) &
+        (independientes_df['ratings'] >= 10) &
+        (independientes_df['ratings'] <= 50)
+    ].sort_values(by=['score', 'ratings', 'name'], ascending=[False, False, True], kind='stable').head(TOP_EMERGENTES)
+
+    total = len(hamburger_df)
+    return {
+        'total_hamburgueserias': total,
+        'rating_promedio': float(hamburger_df['score'].mean()),
+        'ciudades_principales': ', '.join(hamburger_df['city'].value_counts().head(3).index.tolist()),
+        'total_franquicias': len(franquicias_df),
+        'total_independientes': len(independientes_df),
+        'franquicias_pct': len(franquicias_df) / total * 100 if total else 0.0,
+        'independientes_pct': len(independientes_df) / total * 100 if total else 0.0,
+        'top_ciudades': [[ciudad, int(n)] for ciudad, n in hamburger_df['city'].value_counts().head(15).items()],
+        'franquicias_top': [[nombre, int(n)] for nombre, n in franquicias_df['name'].value_counts().head(10).items()],
+        'precio_comparativa': {
+            'categorias': [str(c) for c in precio_comparativa.index],
+            'franquicias': [float(v) for v in precio_comparativa['Franquicias (%)']],
+            'independientes': [float(v) for v in precio_comparativa['Independientes (%)']],
+        },
+        'rating_franquicias': float(franquicias_df['score'].mean()),
+        'rating_independientes': float(independientes_df['score'].mean()),
+        'rating_por_precio': [
+            {'precio': str(row['precio_bucket']), 'rating': float(row['mean']), 'n': int(row['count'])}
+            for _, row in rating_por_precio.iterrows()
+        ],
+        'top_hamburgueserias': _lugares(top_hamburgueserias),
+        'emergentes': _lugares(emergentes),
+        'ciudades_emergentes': [[ciudad, int(n)] for ciudad, n in emergentes['city'].value_counts().head(10).items()],
+    }
+
+
+def imprimir_estadisticas(est):
+    """Imprime el resumen de texto del análisis a partir de las estadísticas."""
+    print(f"\nTotal de franquicias: {est['total_franquicias']} ({est['franquicias_pct']:.1f}%)")
+    print(f"Total de independientes: {est['total_independientes']} ({est['independientes_pct']:.1f}%)")
+
+    print("\nPRINCIPALES FRANQUICIAS:")
+    for i, (nombre, cantidad) in enumerate(est['franquicias_top'], 1):
+        print(f"{i}. {nombre}: {cantidad} establecimientos")
+
+    print("\nDISTRIBUCIÓN POR PRECIO:")
+    precios = est['precio_comparativa']
+    print(f"{'Precio':<12}{'Franquicias (%)':>18}{'Independientes (%)':>21}")
+    for categoria, fr, ind in zip(precios['categorias'], precios['franquicias'], precios['independientes']):
+        print(f"{categoria:<12}{fr:>18.1f}{ind:>21.1f}")
+
+    print("\nRATING PROMEDIO:")
+    print(f"Franquicias: {est['rating_franquicias']:.2f} estrellas")
+    print(f"Independientes: {est['rating_independientes']:.2f} estrellas")
+
+    print("\nRELACIÓN PRECIO-RATING:")
+    for fila in est['rating_por_precio']:
+        print(f"{fila['precio']:<12}{fila['rating']:>8.2f}{fila['n']:>8}")
+
+    print("\nTOP 10 HAMBURGUESERÍAS MEJOR VALORADAS (MIN. 50 RESEÑAS):")
+    for i, row in enumerate(est['top_hamburgueserias'], 1):
+        print(f"{i}. {row['name']} ({row['city']}): {row['score']} estrellas, {row['ratings']} reseñas")
+
+    print("\nHAMBURGUESERÍAS EMERGENTES (ALTO RATING, 10-50 RESEÑAS):")
+    for i, row in enumerate(est['emergentes'], 1):
+        print(f"{i}. {row['name']} ({row['city']}): {row['score']} estrellas, {row['ratings']} reseñas")
+
+    print("\nCIUDADES CON MÁS HAMBURGUESERÍAS EMERGENTES:")
+    for ciudad, cantidad in est['ciudades_emergentes']:
+        print(f"{ciudad}: {cantidad}")
+
+
+def generar_reporte(est):
+    """Reporte de texto con las estadísticas clave."""
+    return f"""
 Estadísticas clave:
-- Total de hamburgueserías: {estadisticas['total_hamburgueserias']}
-- Rating promedio: {estadisticas['rating_promedio']:.2f}
-- Ciudades principales: {estadisticas['ciudades_principales']}
-- Porcentaje de franquicias: {estadisticas['franquicias_pct']:.1f}%
-- Porcentaje de independientes: {estadisticas['independientes_pct']:.1f}%
-"""
\ No newline at end of file
+- Total de hamburgueserías: {est['total_hamburgueserias']}
+- Rating promedio: {est['rating_promedio']:.2f}
+- Ciudades principales: {est['ciudades_principales']}
+- Porcentaje de franquicias: {est['franquicias_pct']:.1f}%
+- Porcentaje de independientes: {est['independientes_pct']:.1f}%
+"""
+
+
+def _pyplot():
+    # Backend sin ventana: los gráficos solo se guardan en disco
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _etiquetar_barras(plt, bars):
+    for bar in bars:
+        height = bar.get_height()
+        plt.text(
+            bar.get_x() + bar.get_width()/2.,
+            height*1.01,
+            f'{height:.2f}',
+            ha='center',
+            va='bottom'
+        )
+
+
+def grafico_distribucion_precio(est, directorio=viz_dir, dpi=300):
+    """Distribución por precio: franquicias vs independientes."""
+    import numpy as np
+    plt = _pyplot()
+
+    precios = est['precio_comparativa']
+    plt.figure(figsize=(12, 7))
+    x = np.arange(len(precios['categorias']))
+    width = 0.35
+
+    plt.bar(x - width/2, precios['franquicias'], width, label='Franquicias', color='#FF9999')
+    plt.bar(x + width/2, precios['independientes'], width, label='Independientes', color='#66B2FF')
+
+    plt.xlabel('Categoría de Precio')
+    plt.ylabel('Porcentaje (%)')
+    plt.title('Distribución por Precio: Franquicias vs Independientes', fontsize=15)
+    plt.xticks(x, precios['categorias'])
+    plt.legend()
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    ruta = os.path.join(directorio, 'distribucion_precio_comparativa.png')
+    plt.savefig(ruta, dpi=dpi)
+    plt.close()
+    return ruta
+
+
+def grafico_ratings(est, directorio=viz_dir, dpi=300):
+    """Comparativa de rating medio entre franquicias e independientes."""
+    plt = _pyplot()
+
+    plt.figure(figsize=(8, 6))
+    bars = plt.bar(
+        ['Franquicias', 'Independientes'],
+        [est['rating_franquicias'], est['rating_independientes']],
+        color=['#FF9999', '#66B2FF']
+    )
+    _etiquetar_barras(plt, bars)
+
+    plt.title('Comparativa de Ratings: Franquicias vs Independientes', fontsize=15)
+    plt.ylabel('Rating Promedio')
+    plt.ylim(4.0, 4.5)  # Ajustar para mejor visualización
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    ruta = os.path.join(directorio, 'franquicias_vs_independientes.png')
+    plt.savefig(ruta, dpi=dpi)
+    plt.close()
+    return ruta
+
+
+def grafico_rating_por_precio(est, directorio=viz_dir, dpi=300):
+    """Rating medio por categoría de precio."""
+    plt = _pyplot()
+
+    plt.figure(figsize=(10, 6))
+    bars = plt.bar(
+        [fila['precio'] for fila in est['rating_por_precio']],
+        [fila['rating'] for fila in est['rating_por_precio']],
+        color='skyblue'
+    )
+    _etiquetar_barras(plt, bars)
+
+    plt.title('Rating Promedio por Categoría de Precio', fontsize=15)
+    plt.xlabel('Categoría de Precio')
+    plt.ylabel('Rating Promedio')
+    plt.ylim(4.0, 5.0)
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    ruta = os.path.join(directorio, 'rating_por_precio.png')
+    plt.savefig(ruta, dpi=dpi)
+    plt.close()
+    return ruta
+
+
+def grafico_ciudades_emergentes(est, directorio=viz_dir):
+    """Ciudades con más hamburgueserías emergentes."""
+    plt = _pyplot()
+
+    ciudades = est['ciudades_emergentes']
+    plt.figure(figsize=(12, 6))
+    plt.bar([c for c, _ in ciudades], [n for _, n in ciudades], color='lightgreen')
+    plt.title('Ciudades con más hamburgueserías emergentes', fontsize=15)
+    plt.xlabel('Ciudad')
+    plt.ylabel('Número de hamburgueserías emergentes')
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    ruta = os.path.join(directorio, 'ciudades_tendencias_emergentes.png')
+    plt.savefig(ruta, dpi=300)
+    plt.close()
+    return ruta
+
+
+def _generadores():
+    import geo_analysis
+
+    return {
+        'top_ciudades.png': geo_analysis.grafico_top_ciudades,
+        'distribucion_precio_comparativa.png': grafico_distribucion_precio,
+        'franquicias_vs_independientes.png': grafico_ratings,
+        'rating_por_precio.png': grafico_rating_por_precio,
+        'ciudades_tendencias_emergentes.png': grafico_ciudades_emergentes,
+    }
+
+
+def asegurar_grafico(nombre_png, est, csv_path, forzar=False):
+    """Regenera el gráfico solo si no existe o se generó con otro CSV."""
+    from analysis_cache import cache_valido, marcar_cache
+
+    ruta = os.path.join(viz_dir, nombre_png)
+    if forzar or not cache_valido(ruta, csv_path):
+        _generadores()[nombre_png](est, viz_dir)
+        marcar_cache(ruta, csv_path)
+    return ruta
+
+
+def generar_graficos(est, csv_path, forzar=False):
+    """Genera (si hace falta) todos los gráficos PNG del análisis y devuelve sus rutas."""
+    return [asegurar_grafico(nombre, est, csv_path, forzar) for nombre in _generadores()]
+
+
+def main(csv_path=None):
+    import analysis_cache
+    import geo_analysis
+    import report_builder
+
+    crear_directorios()
+    csv_path = csv_path or csv_mas_reciente()
+
+    estadisticas = analysis_cache.obtener_estadisticas(csv_path, refrescar=True)
+    hamburger_df = analysis_cache.datos_limpios(csv_path)
+
+    # Guardar el dataframe limpio para análisis posteriores
+    hamburger_df.to_csv(os.path.join(data_dir, 'hamburgueserias_limpias.csv'), index=False)
+    print("Datos limpios guardados en 'data/hamburgueserias_limpias.csv'")
+
+    imprimir_estadisticas(estadisticas)
+
+    generar_graficos(estadisticas, csv_path, forzar=True)
+    geo_analysis.mapa_calor(hamburger_df)
+
+    print(generar_reporte(estadisticas))
+    report_builder.construir_reporte(estadisticas, csv_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Cargador único del dataset de hamburgueserías.
+
+Todos los scripts obtienen los datos limpios a través de `cargar()`:
+
+- El CSV se lee y limpia una sola vez (`data_analisis_burger.cargar_datos` y
+  `limpiar_datos`) y el resultado tipado se guarda en la caché Parquet
+  (ver analysis_cache), que se invalida cuando cambia el CSV.
+- El Parquet se abre con memory-map: Arrow no copia los buffers al leer y
+  el sistema operativo comparte las páginas entre procesos.
+- Dentro de un proceso se guarda una sola copia en memoria (tabla Arrow y
+  DataFrame completo): las etapas que se ejecutan seguidas (estadísticas,
+  gráficos, mapas...) no vuelven a leer el disco.
+- `columnas` proyecta solo las columnas pedidas y `filtros` aplica
+  predicados sobre las filas con la sintaxis de `pandas.read_parquet`
+  (p. ej. `[('ratings', '>=', 50), ('city', 'in', ['Madrid', 'Barcelona'])]`).
+
+Ejemplo:
+    from dataset_loader import cargar
+    df = cargar(csv_path, columnas=['name', 'city', 'score'], filtros=[('score', '>=', 4.8)])
+"""
+from project_paths import csv_mas_reciente, firma_archivo
+
+# ruta del Parquet -> (firma del CSV de origen, tabla Arrow, DataFrame completo o None)
+_cache = {}
+
+
+def liberar_cache():
+    """Olvida la copia en memoria (la siguiente llamada vuelve a leer el Parquet)."""
+    _cache.clear()
+
+
+def tabla(csv_path=None, refrescar=False):
+    """Tabla Arrow completa de los datos limpios, compartida en el proceso."""
+    import pyarrow.parquet as pq
+
+    import analysis_cache
+
+    csv_path = csv_path or csv_mas_reciente()
+    ruta = analysis_cache.ruta_datos_limpios
+    entrada = _cache.get(ruta)
+    if not refrescar and entrada is not None and entrada[0] == firma_archivo(csv_path) \
+            and analysis_cache.cache_valido(ruta, csv_path):
+        return entrada[1]
+
+    analysis_cache.asegurar_datos_limpios(csv_path, refrescar)
+    _cache[ruta] = (firma_archivo(csv_path), pq.read_table(ruta, memory_map=True), None)
+    return _cache[ruta][1]
+
+
+def cargar(csv_path=None, columnas=None, filtros=None, refrescar=False):
+    """DataFrame limpio, opcionalmente con solo algunas columnas y filas.
+
+    El DataFrame devuelto comparte los datos con la caché del proceso
+    (pandas copia al escribir), así que se puede modificar sin afectar a
+    otras etapas.
+    """
+    import analysis_cache
+
+    csv_path = csv_path or csv_mas_reciente()
+    datos = tabla(csv_path, refrescar)
+
+    if columnas is None and filtros is None:
+        ruta = analysis_cache.ruta_datos_limpios
+        firma, datos, hamburger_df = _cache[ruta]
+        if hamburger_df is None:
+            hamburger_df = datos.to_pandas()
+            _cache[ruta] = (firma, datos, hamburger_df)
+        return hamburger_df.copy(deep=False)
+
+    if filtros:
+        import pyarrow.parquet as pq
+
+        datos = datos.filter(pq.filters_to_expression(filtros))
+    if columnas is not None:
+        datos = datos.select(list(columnas))
+    return datos.to_pandas()
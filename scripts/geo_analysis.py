@@ -1,54 +1,211 @@
-import folium
-from folium.plugins import HeatMap, MarkerCluster
-import pandas as pd
-import matplotlib.pyplot as plt
-
-# Load the hamburger data into a DataFrame
-hamburger_df = pd.read_csv('path_to_your_hamburger_data.csv')
-
-# 1. Top ciudades
-top_ciudades = hamburger_df['city'].value_counts().head(15)
-print("\nTOP 15 CIUDADES CON MÁS HAMBURGUESERÍAS:")
-for i, (ciudad, cantidad) in enumerate(top_ciudades.items(), 1):
-    print(f"{i}. {ciudad}: {cantidad} hamburgueserías")
-
-# Visualizar top ciudades
-plt.figure(figsize=(12, 8))
-top_ciudades.plot(kind='bar', color='skyblue')
-plt.title('Ciudades con más hamburgueserías en España', fontsize=15)
-plt.xlabel('Ciudad')
-plt.ylabel('Número de hamburgueserías')
-plt.xticks(rotation=45, ha='right')
-plt.tight_layout()
-plt.savefig('resultados/visualizaciones/top_ciudades.png', dpi=300)
-plt.close()
-
-# 2. Crear un mapa de calor
-mapa = folium.Map(location=[40.416775, -3.703790], zoom_start=6)
-puntos_calor = hamburger_df[['lat', 'lng']].values.tolist()
-HeatMap(puntos_calor).add_to(mapa)
-mapa.save('resultados/mapas/mapa_calor_hamburgueserias.html')
-print("Mapa de calor guardado")
-
-# 3. Mapa con las mejores hamburgueserías
-mejores = hamburger_df[(hamburger_df['score'] >= 4.8) & (hamburger_df['ratings'] >= 50)].sort_values(by='score', ascending=False)
-
-if not mejores.empty:
+import os
+
+from project_paths import maps_dir, viz_dir
+
+# folium, pandas y matplotlib se importan dentro de cada función:
+# así `import geo_analysis` no cuesta nada si solo se quiere un gráfico o un mapa.
+
+
+def grafico_top_ciudades(est, directorio=viz_dir):
+    """Gráfico de barras con las 15 ciudades con más hamburgueserías."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    top_ciudades = est['top_ciudades']
+    plt.figure(figsize=(12, 8))
+    plt.bar([c for c, _ in top_ciudades], [n for _, n in top_ciudades], color='skyblue')
+    plt.title('Ciudades con más hamburgueserías en España', fontsize=15)
+    plt.xlabel('Ciudad')
+    plt.ylabel('Número de hamburgueserías')
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    ruta = os.path.join(directorio, 'top_ciudades.png')
+    plt.savefig(ruta, dpi=300)
+    plt.close()
+    return ruta
+
+
+def imprimir_top_ciudades(est):
+    print("\nTOP 15 CIUDADES CON MÁS HAMBURGUESERÍAS:")
+    for i, (ciudad, cantidad) in enumerate(est['top_ciudades'], 1):
+        print(f"{i}. {ciudad}: {cantidad} hamburgueserías")
+
+
+def _url_relativa(ruta, directorio):
+    return os.path.relpath(ruta, directorio).replace(os.sep, '/')
+
+
+# Las capas se cargan desde ficheros externos (ver geo_export) en lugar de
+# incrustar los puntos en el HTML
+_JS_ESCAPAR = """
+function escaparHtml(texto) {
+    return String(texto).replace(/[&<>"']/g, function(c) {
+        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+    });
+}
+"""
+
+_JS_CAPA_CALOR = """
+fetch({url})
+    .then(function(respuesta) {{ return respuesta.arrayBuffer(); }})
+    .then(function(buffer) {{
+        // Varints zigzag: n y luego las diferencias (lng, lat) de cada posición cuantizada
+        var bytes = new Uint8Array(buffer), pos = 0;
+        function leer() {{
+            var valor = 0, factor = 1, b;
+            do {{
+                b = bytes[pos++];
+                valor += (b & 0x7f) * factor;
+                factor *= 128;
+            }} while (b & 0x80);
+            return valor % 2 ? -(valor + 1) / 2 : valor / 2;
+        }}
+        var n = leer(), puntos = new Array(n), lng = 0, lat = 0;
+        for (var i = 0; i < n; i++) {{
+            lng += leer();
+            lat += leer();
+            puntos[i] = [lat * {escala}, lng * {escala}];
+        }}
+        L.heatLayer(puntos, {{minOpacity: 0.5, maxZoom: 18, radius: 25, blur: 15}}).addTo({mapa});
+    }});
+"""
+
+_JS_CAPA_CIUDADES = """
+fetch({url})
+    .then(function(respuesta) {{ return respuesta.json(); }})
+    .then(function(datos) {{
+        var capa = L.geoJSON(datos, {{
+            pointToLayer: function(f, latlng) {{
+                return L.circleMarker(latlng, {{radius: 6, color: '#FF6600', fillOpacity: 0.7}});
+            }},
+            onEachFeature: function(f, layer) {{
+                var p = f.properties;
+                layer.bindTooltip('<b>' + escaparHtml(p.city) + '</b><br>' + p.n + ' hamburgueserías<br>'
+                    + p.franquicias_pct + '% franquicias<br>Rating medio: ' + p.score);
+            }}
+        }});
+        L.control.layers(null, {{'Ciudades': capa}}).addTo({mapa});
+    }});
+"""
+
+_JS_CAPA_MEJORES = """
+fetch({url})
+    .then(function(respuesta) {{ return respuesta.json(); }})
+    .then(function(datos) {{
+        L.geoJSON(datos, {{
+            pointToLayer: function(f, latlng) {{
+                var icono = L.AwesomeMarkers.icon({{icon: 'star', markerColor: 'green', prefix: 'glyphicon'}});
+                return L.marker(latlng, {{icon: icono}});
+            }},
+            onEachFeature: function(f, layer) {{
+                var p = f.properties;
+                layer.bindPopup('<b>' + escaparHtml(p.name) + '</b><br>'
+                    + 'Rating: ' + p.score + ' (' + p.ratings + ' reseñas)<br>'
+                    + 'Dirección: ' + escaparHtml(p.address) + '<br>'
+                    + 'Precio: ' + escaparHtml(p.price) + '<br>', {{maxWidth: 300}});
+            }}
+        }}).addTo({mapa});
+    }});
+"""
+
+
+def _anadir_script(mapa, js):
+    """Añade JS al mapa; se ejecuta después de crear el mapa y sus capas base."""
+    from branca.element import MacroElement
+    from jinja2 import Template
+
+    elemento = MacroElement()
+    elemento._template = Template('{% macro script(this, kwargs) %}{{ this.js }}{% endmacro %}')
+    elemento.js = js
+    mapa.add_child(elemento)
+
+
+def _guardar_mapa(mapa, ruta):
+    import geo_export
+
+    mapa.save(ruta)
+    geo_export.precomprimir(ruta)
+
+
+def mapa_calor(hamburger_df, directorio=maps_dir, directorio_datos=None, centro=None, zoom=6):
+    """Mapa de calor de todas las hamburgueserías, con una capa opcional por ciudad.
+
+    Los puntos se leen de `data/` (ver geo_export), así que la página debe
+    servirse por HTTP junto a esa carpeta. `directorio_datos`, `centro` y
+    `zoom` permiten generar mapas de una sola ciudad.
+    """
+    import json
+
+    import folium
+    from folium.plugins import HeatMap
+
+    import geo_export
+
+    directorio_datos = directorio_datos or geo_export.geo_data_dir
+    ruta_puntos = geo_export.exportar_puntos_calor(hamburger_df, directorio_datos)
+    ruta_ciudades = geo_export.exportar_ciudades(hamburger_df, directorio_datos)
+
+    # Crear un mapa base (por defecto, centrado en España)
+    mapa = folium.Map(location=centro or [40.416775, -3.703790], zoom_start=zoom)
+    for nombre, url in HeatMap.default_js:
+        mapa.get_root().header.add_child(folium.JavascriptLink(url), name=nombre)
+    _anadir_script(mapa, _JS_ESCAPAR + _JS_CAPA_CALOR.format(
+        url=json.dumps(_url_relativa(ruta_puntos, directorio)), mapa=mapa.get_name(),
+        escala=f"1e-{geo_export.DECIMALES}"))
+    _anadir_script(mapa, _JS_CAPA_CIUDADES.format(
+        url=json.dumps(_url_relativa(ruta_ciudades, directorio)), mapa=mapa.get_name()))
+
+    ruta = os.path.join(directorio, 'mapa_calor_hamburgueserias.html')
+    _guardar_mapa(mapa, ruta)
+    print("Mapa de calor guardado")
+    return ruta
+
+
+def mapa_mejores(hamburger_df, directorio=maps_dir):
+    """Mapa con las mejores hamburgueserías (score >= 4.8 y al menos 50 reseñas)."""
+    import json
+
+    import folium
+
+    import geo_export
+
+    if geo_export.seleccionar_mejores(hamburger_df).empty:
+        return None
+    ruta_mejores = geo_export.exportar_mejores(hamburger_df)
+
     mapa_mejores = folium.Map(location=[40.416775, -3.703790], zoom_start=6)
-    
-    for idx, row in mejores.iterrows():
-        popup_text = f"""
-        <b>{row['name']}</b><br>
-        Rating: {row['score']} ({row['ratings']} reseñas)<br>
-        Dirección: {row['address']}<br>
-        Precio: {row['price'] if pd.notna(row['price']) else 'No disponible'}<br>
-        """
-        
-        folium.Marker(
-            location=[row['lat'], row['lng']],
-            popup=folium.Popup(popup_text, max_width=300),
-            icon=folium.Icon(color='green', icon='star')
-        ).add_to(mapa_mejores)
-    
-    mapa_mejores.save('resultados/mapas/mapa_mejores_hamburgueserias.html')
-    print("Mapa de mejores hamburgueserías guardado")
\ No newline at end of file
+    _anadir_script(mapa_mejores, _JS_ESCAPAR + _JS_CAPA_MEJORES.format(
+        url=json.dumps(_url_relativa(ruta_mejores, directorio)), mapa=mapa_mejores.get_name()))
+
+    ruta = os.path.join(directorio, 'mapa_mejores_hamburgueserias.html')
+    _guardar_mapa(mapa_mejores, ruta)
+    print("Mapa de mejores hamburgueserías guardado")
+    return ruta
+
+
+def main(csv_path=None):
+    import analysis_cache
+    import dataset_loader
+    from project_paths import crear_directorios, csv_mas_reciente
+
+    crear_directorios()
+    csv_path = csv_path or csv_mas_reciente()
+
+    # Mismos datos limpios (y la misma caché) que data_analisis_burger
+    hamburger_df = dataset_loader.cargar(csv_path)
+    est = analysis_cache.obtener_estadisticas(csv_path)
+
+    # 1. Top ciudades
+    imprimir_top_ciudades(est)
+    grafico_top_ciudades(est)
+
+    # 2. Crear un mapa de calor
+    mapa_calor(hamburger_df)
+
+    # 3. Mapa con las mejores hamburgueserías
+    mapa_mejores(hamburger_df)
+
+
+if __name__ == '__main__':
+    main()
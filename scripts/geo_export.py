@@ -0,0 +1,255 @@
+"""Exportación vectorial compacta (GeoJSON) para los mapas.
+
+Los mapas folium incrustaban todos los puntos como floats de precisión
+completa dentro del HTML. Aquí se escriben aparte, en `output/maps/data/`:
+
+- hamburgueserias.geojson: todas las hamburgueserías como un único MultiPoint,
+  para abrirlo en cualquier herramienta GIS.
+- hamburgueserias_calor.bin: las mismas posiciones en el formato que carga el
+  mapa de calor: enteros cuantizados (como en TopoJSON) ordenados a lo largo
+  de una curva de Hilbert y codificados como diferencias con el punto anterior
+  en varints zigzag (`n` y luego pares lng, lat). Puntos vecinos en el
+  fichero lo son también en el mapa, así que casi todas las diferencias caben
+  en uno o dos bytes: con gzip ocupa ~16% menos que las mismas diferencias en
+  JSON ordenadas por latitud y ~40% menos que el GeoJSON.
+- mejores.geojson: las mejores hamburgueserías, con las propiedades del popup.
+- ciudades.geojson: agregados por ciudad (centroide, número de locales,
+  % de franquicias y rating medio).
+
+Las coordenadas se cuantizan a 5 decimales (~1 m) y los puntos se ordenan
+para que la compresión sea más eficaz. Cada fichero se precomprime en
+`.gz` (y en `.br` si está instalado el módulo `brotli`) para servirlo tal
+cual desde un servidor estático.
+"""
+import gzip
+import json
+import os
+
+from project_paths import maps_dir
+
+geo_data_dir = os.path.join(maps_dir, 'data')
+DECIMALES = 5  # 1e-5 grados ~ 1.1 m
+RES_CALOR = 4  # resolución de hex_index del mapa de calor agregado (hexágonos de ~4 km de lado)
+REDUCCION_OBJETIVO = 5  # descarga del mapa de calor frente a los puntos incrustados
+
+
+def _redondear(valor, decimales=2):
+    return None if valor != valor else round(float(valor), decimales)  # NaN -> null
+
+
+def precomprimir(ruta, contenido=None):
+    """Escribe `ruta.gz` (y `ruta.br` si hay brotli) junto al fichero original."""
+    if contenido is None:
+        with open(ruta, 'rb') as f:
+            contenido = f.read()
+    # mtime=0: el .gz es reproducible y no cambia si no cambian los datos
+    with open(ruta + '.gz', 'wb') as f:
+        f.write(gzip.compress(contenido, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        with open(ruta + '.br', 'wb') as f:
+            f.write(brotli.compress(contenido, quality=11))
+
+
+def escribir_geojson(nombre, datos, directorio=geo_data_dir):
+    """Escribe el JSON compacto y sus versiones precomprimidas; devuelve la ruta."""
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, nombre)
+    contenido = json.dumps(datos, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    with open(ruta, 'wb') as f:
+        f.write(contenido)
+    precomprimir(ruta, contenido)
+    return ruta
+
+
+def escribir_binario(nombre, contenido, directorio=geo_data_dir):
+    """Escribe bytes y sus versiones precomprimidas; devuelve la ruta."""
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, nombre)
+    with open(ruta, 'wb') as f:
+        f.write(contenido)
+    precomprimir(ruta, contenido)
+    return ruta
+
+
+def _cuantizar(hamburger_df):
+    # Enteros en unidades de 1e-5 grados, ordenados por lat y luego lng
+    import numpy as np
+
+    q = np.round(hamburger_df[['lng', 'lat']].to_numpy(dtype=np.float64) * 10 ** DECIMALES).astype(np.int64)
+    return q[np.lexsort((q[:, 0], q[:, 1]))]
+
+
+def _orden_hilbert(q):
+    """Los puntos enteros `q` (lng, lat) ordenados a lo largo de una curva de Hilbert."""
+    import numpy as np
+
+    if len(q) == 0:
+        return q
+    x = q[:, 0] - q[:, 0].min()
+    y = q[:, 1] - q[:, 1].min()
+    lado = 1 << max(1, int(max(x.max(), y.max())).bit_length())
+    d = np.zeros(len(q), dtype=np.int64)
+    s = lado // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # Girar el cuadrante para que la curva sea continua
+        girar = ~ry
+        reflejar = girar & rx
+        x, y = np.where(reflejar, s - 1 - x, x), np.where(reflejar, s - 1 - y, y)
+        x, y = np.where(girar, y, x), np.where(girar, x, y)
+        s //= 2
+    return q[np.argsort(d, kind='stable')]
+
+
+def varints_zigzag(valores):
+    """Enteros con signo como varints zigzag (7 bits por byte, el alto indica que sigue otro)."""
+    import numpy as np
+
+    valores = np.asarray(valores, dtype=np.int64)
+    u = ((valores << 1) ^ (valores >> 63)).astype(np.uint64)
+    n_bytes = np.ones(len(u), dtype=np.int64)
+    for k in range(1, 10):
+        n_bytes += u >= np.uint64(1 << (7 * k))
+    inicio = np.concatenate(([0], np.cumsum(n_bytes)[:-1]))
+    salida = np.zeros(int(n_bytes.sum()), dtype=np.uint8)
+    for k in range(int(n_bytes.max(initial=0))):
+        activos = n_bytes > k
+        byte = (u[activos] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        byte |= np.where(n_bytes[activos] > k + 1, np.uint64(0x80), np.uint64(0))
+        salida[inicio[activos] + k] = byte.astype(np.uint8)
+    return salida.tobytes()
+
+
+def exportar_puntos_calor(hamburger_df, directorio=geo_data_dir):
+    """Escribe las posiciones en GeoJSON y en el formato binario del mapa de calor.
+
+    Devuelve la ruta del fichero binario, que es el que carga la página.
+    """
+    import numpy as np
+
+    q = _cuantizar(hamburger_df)
+    escala = 10.0 ** -DECIMALES
+    escribir_geojson('hamburgueserias.geojson', {
+        'type': 'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'properties': {},
+            'geometry': {'type': 'MultiPoint', 'coordinates': np.round(q * escala, DECIMALES).tolist()},
+        }],
+    }, directorio)
+
+    # La escala (10^-DECIMALES) la pone la página; el fichero solo lleva enteros
+    deltas = np.diff(_orden_hilbert(q), axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    return escribir_binario('hamburgueserias_calor.bin',
+                            varints_zigzag(np.concatenate(([len(q)], deltas.ravel()))), directorio)
+
+
+def celdas_calor(hamburger_df, res=RES_CALOR):
+    """Número de hamburgueserías por celda hexagonal de `hex_index` en la resolución `res`.
+
+    Devuelve un dict `celda -> n` con los ids de `hex_index`. Las celdas son
+    de igual superficie, y los conteos de trozos distintos del dataset se
+    pueden sumar sin perder exactitud.
+    """
+    import numpy as np
+
+    import hex_index
+
+    celdas = hex_index.asignar_celdas(hamburger_df['lat'].to_numpy(), hamburger_df['lng'].to_numpy(), [res])[res]
+    claves, conteos = np.unique(celdas, return_counts=True)
+    return {int(c): int(n) for c, n in zip(claves, conteos)}
+
+
+def lista_calor(conteos):
+    """`[celda, lat, lng, n]` por celda de `celdas_calor`, con el centro del hexágono.
+
+    El id va como texto: no cabe en un número de JavaScript.
+    """
+    import numpy as np
+
+    import hex_index
+
+    celdas = sorted(conteos)
+    lat, lng = hex_index.centro(np.array(celdas, dtype=np.int64))
+    return [[str(c), round(float(la), DECIMALES), round(float(ln), DECIMALES), conteos[c]]
+            for c, la, ln in zip(celdas, lat, lng)]
+
+
+def seleccionar_mejores(hamburger_df):
+    """Hamburgueserías con score >= 4.8 y al menos 50 reseñas."""
+    return hamburger_df[(hamburger_df['score'] >= 4.8) & (hamburger_df['ratings'] >= 50)].sort_values(by='score', ascending=False)
+
+
+def exportar_mejores(hamburger_df, directorio=geo_data_dir):
+    import pandas as pd
+
+    mejores = seleccionar_mejores(hamburger_df)
+    features = []
+    for row in mejores[['lat', 'lng', 'name', 'score', 'ratings', 'address', 'price']].itertuples(index=False):
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [round(row.lng, DECIMALES), round(row.lat, DECIMALES)]},
+            'properties': {
+                'name': row.name,
+                'score': _redondear(row.score),
+                'ratings': int(row.ratings),
+                'address': row.address if pd.notna(row.address) else '',
+                'price': row.price if pd.notna(row.price) else 'No disponible',
+            },
+        })
+    return escribir_geojson('mejores.geojson', {'type': 'FeatureCollection', 'features': features}, directorio)
+
+
+def exportar_ciudades(hamburger_df, directorio=geo_data_dir):
+    agregados = hamburger_df.groupby('city').agg(
+        lat=('lat', 'mean'),
+        lng=('lng', 'mean'),
+        n=('id', 'size'),
+        franquicias_pct=('es_franquicia', 'mean'),
+        score=('score', 'mean'),
+    ).reset_index()
+    features = [{
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [round(row.lng, DECIMALES), round(row.lat, DECIMALES)]},
+        'properties': {
+            'city': row.city,
+            'n': int(row.n),
+            'franquicias_pct': _redondear(row.franquicias_pct * 100, 1),
+            'score': _redondear(row.score),
+        },
+    } for row in agregados.itertuples(index=False)]
+    return escribir_geojson('ciudades.geojson', {'type': 'FeatureCollection', 'features': features}, directorio)
+
+
+def exportar_todo(hamburger_df, directorio=geo_data_dir):
+    """Exporta todas las capas y devuelve sus rutas."""
+    return [
+        os.path.join(directorio, 'hamburgueserias.geojson'),
+        exportar_puntos_calor(hamburger_df, directorio),
+        exportar_mejores(hamburger_df, directorio),
+        exportar_ciudades(hamburger_df, directorio),
+    ]
+
+
+def tamano_incrustado(hamburger_df):
+    """Bytes (plano, gzip) de los puntos tal como los incrustaba `HeatMap` en el HTML.
+
+    folium los serializa con `|tojson`: listas `[lat, lng]` de floats completos
+    con los separadores por defecto de `json.dumps`.
+    """
+    contenido = json.dumps(hamburger_df[['lat', 'lng']].astype(float).values.tolist()).encode('utf-8')
+    return len(contenido), len(gzip.compress(contenido, compresslevel=9, mtime=0))
+
+
+def imprimir_tamanos(rutas):
+    """Tamaño de cada fichero, plano y precomprimido con gzip."""
+    for ruta in rutas:
+        plano = os.path.getsize(ruta)
+        comprimido = os.path.getsize(ruta + '.gz')
+        print(f"{os.path.basename(ruta):<28}{plano / 1024:>9.1f} KB{comprimido / 1024:>9.1f} KB (gzip)")
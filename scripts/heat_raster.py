@@ -0,0 +1,339 @@
+"""Mapa de calor estático en PNG, sin navegador.
+
+El mapa de calor de `geo_analysis` es una página folium; para reportes y
+diapositivas hace falta una imagen. Aquí se pinta con NumPy:
+
+1. Las posiciones se proyectan (equirectangular, con el ancho corregido por
+   el coseno de la latitud) y se acumulan en un histograma 2-D. Como el
+   kernel es ancho (varios km), la rejilla es `f` veces más gruesa que la
+   imagen, con `f` tal que la sigma del kernel mida al menos 3 celdas.
+2. La rejilla se suaviza con un kernel gaussiano separable (filas y luego
+   columnas) y se normaliza con un percentil alto, para que Madrid y
+   Barcelona no dejen el resto del mapa en blanco.
+3. La imagen se pinta por bandas de filas: cada banda interpola la rejilla
+   (bilineal, también separable), la traduce a color y la combina con el
+   mapa base en una sola consulta a una tabla `(clase del mapa base, nivel
+   de calor) -> RGB`. Las bandas se comprimen en el PNG según se generan,
+   así que la memoria depende del alto de la banda y no del de la imagen.
+
+El mapa base es un contorno simplificado de España y alrededores (Canarias
+en un recuadro, como en los mapas nacionales). Se rasteriza una vez por
+tamaño de imagen y se guarda en `output/cache/` como matriz de clases
+(1 byte por píxel) que se abre con memory-map.
+"""
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from project_paths import cache_dir, viz_dir
+
+VERSION_MAPA_BASE = 1  # subir si cambian los contornos o su rasterizado
+KM_POR_GRADO = 111.2
+SIGMA_KM = 6.0  # radio del kernel gaussiano
+FILAS_BANDA = 1024
+NIVEL_ZLIB = 3
+
+# Marco nacional (lng_min, lat_min, lng_max, lat_max), con Canarias desplazadas al recuadro
+LIMITES_ESPANA = (-13.6, 34.6, 4.9, 44.0)
+CAJA_CANARIAS = (-18.3, 27.5, -13.3, 29.5)
+DESPLAZAMIENTO_CANARIAS = (4.8, 7.3)
+
+# Clases del mapa base y su color
+MAR, ESPANA, OTROS, LINEA = 0, 1, 2, 3
+PALETA = np.array([[170, 199, 222], [246, 244, 238], [226, 224, 218], [120, 130, 140]], dtype=np.float32)
+
+# Degradado por defecto de Leaflet.heat (el mismo que el mapa folium)
+GRADIENTE = [(0.0, (0, 0, 255)), (0.4, (0, 0, 255)), (0.6, (0, 255, 255)),
+             (0.7, (0, 255, 0)), (0.8, (255, 255, 0)), (1.0, (255, 0, 0))]
+OPACIDAD_MAX = 0.85
+UMBRAL = 0.02  # por debajo de esta intensidad no se pinta calor
+
+# Contornos simplificados (lng, lat)
+IBERIA = [
+    (-1.79, 43.37), (-1.98, 43.32), (-2.95, 43.40), (-3.80, 43.47), (-5.66, 43.55), (-5.85, 43.66),
+    (-7.04, 43.54), (-7.68, 43.79), (-8.25, 43.50), (-8.40, 43.37), (-9.30, 42.88), (-8.85, 42.20),
+    (-8.87, 41.87), (-8.67, 41.15), (-8.75, 40.64), (-9.07, 39.60), (-9.50, 38.78), (-8.90, 38.48),
+    (-8.87, 37.95), (-8.99, 37.02), (-7.93, 37.01), (-7.40, 37.17), (-6.95, 37.20), (-6.40, 36.80),
+    (-6.30, 36.53), (-5.61, 36.01), (-5.43, 36.13), (-4.42, 36.72), (-3.52, 36.73), (-2.47, 36.83),
+    (-2.19, 36.72), (-0.98, 37.59), (-0.69, 37.63), (-0.51, 38.19), (-0.48, 38.34), (0.23, 38.73),
+    (-0.32, 39.47), (-0.02, 39.97), (0.87, 40.70), (1.25, 41.11), (2.18, 41.38), (3.32, 42.32),
+    (3.17, 42.43), (2.86, 42.46), (1.93, 42.43), (1.45, 42.60), (0.70, 42.86), (0.00, 42.69),
+    (-0.75, 42.93), (-1.40, 43.05),
+]
+PORTUGAL = [
+    (-8.87, 41.87), (-8.67, 41.15), (-8.75, 40.64), (-9.07, 39.60), (-9.50, 38.78), (-8.90, 38.48),
+    (-8.87, 37.95), (-8.99, 37.02), (-7.93, 37.01), (-7.40, 37.17), (-7.50, 37.50), (-7.00, 38.00),
+    (-7.30, 38.40), (-7.00, 39.00), (-7.50, 39.65), (-6.90, 40.00), (-6.80, 40.30), (-6.90, 41.00),
+    (-6.20, 41.60), (-6.60, 41.95), (-8.20, 42.10),
+]
+FRANCIA = [
+    (-1.79, 43.37), (-1.45, 43.60), (-1.20, 44.60), (-1.25, 46.50), (6.00, 46.50), (6.00, 43.10),
+    (5.00, 43.40), (4.20, 43.45), (3.50, 43.28), (3.05, 43.05), (3.04, 42.60), (3.17, 42.43),
+    (2.86, 42.46), (1.93, 42.43), (1.45, 42.60), (0.70, 42.86), (0.00, 42.69), (-0.75, 42.93),
+    (-1.40, 43.05),
+]
+NORTE_AFRICA = [
+    (-6.70, 33.50), (-6.70, 34.00), (-6.15, 35.20), (-5.90, 35.79), (-5.31, 35.89), (-4.40, 35.20),
+    (-2.94, 35.29), (-2.20, 35.10), (-0.64, 35.70), (1.00, 36.50), (3.06, 36.77), (6.00, 36.90),
+    (6.00, 33.50),
+]
+BALEARES = [
+    [(2.33, 39.58), (2.69, 39.80), (3.00, 39.90), (3.21, 39.96), (3.48, 39.71), (3.05, 39.27), (2.65, 39.55)],
+    [(3.80, 40.00), (4.05, 40.09), (4.32, 39.88), (3.85, 39.93)],
+    [(1.23, 38.97), (1.40, 39.12), (1.62, 39.03), (1.40, 38.83), (1.21, 38.87)],
+    [(1.38, 38.72), (1.58, 38.67), (1.45, 38.65)],
+]
+CANARIAS = [
+    [(-16.92, 28.37), (-16.15, 28.58), (-16.36, 28.10), (-16.70, 28.00), (-16.85, 28.20)],
+    [(-15.83, 28.10), (-15.42, 28.17), (-15.37, 27.85), (-15.60, 27.73), (-15.80, 27.85)],
+    [(-13.87, 29.23), (-13.42, 29.20), (-13.75, 28.85), (-13.87, 28.87)],
+    [(-14.00, 28.75), (-13.82, 28.72), (-13.90, 28.30), (-14.22, 28.15), (-14.50, 28.05), (-14.30, 28.35)],
+    [(-17.95, 28.85), (-17.75, 28.83), (-17.84, 28.45), (-17.90, 28.55)],
+    [(-17.35, 28.18), (-17.10, 28.10), (-17.20, 28.00), (-17.33, 28.08)],
+    [(-18.16, 27.78), (-17.90, 27.85), (-17.98, 27.64), (-18.10, 27.70)],
+]
+
+
+class Proyeccion:
+    """Paso de (lng, lat) a píxeles para una imagen de `ancho` x `alto`.
+
+    Los límites se amplían por el lado necesario para que la imagen no se
+    deforme (1 km mide lo mismo en horizontal y en vertical en el centro).
+    """
+
+    def __init__(self, ancho, alto, limites=None):
+        self.ancho, self.alto = ancho, alto
+        self.recuadro_canarias = limites is None
+        lng0, lat0, lng1, lat1 = limites or LIMITES_ESPANA
+        coseno = np.cos(np.radians((lat0 + lat1) / 2))
+        proporcion = (lng1 - lng0) * coseno / (lat1 - lat0)
+        if ancho / alto > proporcion:
+            extra = ((lat1 - lat0) * ancho / alto / coseno - (lng1 - lng0)) / 2
+            lng0, lng1 = lng0 - extra, lng1 + extra
+        else:
+            extra = ((lng1 - lng0) * coseno * alto / ancho - (lat1 - lat0)) / 2
+            lat0, lat1 = lat0 - extra, lat1 + extra
+        self.lng0, self.lat1 = lng0, lat1
+        self.grados_x = (lng1 - lng0) / ancho
+        self.grados_y = (lat1 - lat0) / alto
+        self.km_por_pixel = self.grados_y * KM_POR_GRADO
+
+    def _desplazar(self, lng, lat):
+        if not self.recuadro_canarias:
+            return lng, lat
+        lng0, lat0, lng1, lat1 = CAJA_CANARIAS
+        en_caja = (lng >= lng0) & (lng <= lng1) & (lat >= lat0) & (lat <= lat1)
+        return (np.where(en_caja, lng + DESPLAZAMIENTO_CANARIAS[0], lng),
+                np.where(en_caja, lat + DESPLAZAMIENTO_CANARIAS[1], lat))
+
+    def pixeles(self, lng, lat):
+        lng, lat = self._desplazar(np.asarray(lng, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+        return (lng - self.lng0) / self.grados_x, (self.lat1 - lat) / self.grados_y
+
+    def clave(self):
+        return f'{self.ancho}x{self.alto}_{self.lng0:.4f}_{self.lat1:.4f}_{self.grados_x:.6g}_{int(self.recuadro_canarias)}'
+
+
+# --- Mapa base ---------------------------------------------------------------
+
+def _poligonos_base(proyeccion):
+    # (clase de relleno, contorno en píxeles), en orden de dibujo
+    capas = [(OTROS, FRANCIA), (OTROS, NORTE_AFRICA), (ESPANA, IBERIA), (OTROS, PORTUGAL)]
+    capas += [(ESPANA, isla) for isla in BALEARES + CANARIAS]
+    poligonos = []
+    for clase, contorno in capas:
+        x, y = proyeccion.pixeles(*zip(*contorno))
+        poligonos.append((clase, list(zip(x.tolist(), y.tolist()))))
+    return poligonos
+
+
+def _recuadro_canarias(proyeccion):
+    lng0, lat0, lng1, lat1 = CAJA_CANARIAS
+    dx, dy = DESPLAZAMIENTO_CANARIAS
+    x, y = proyeccion.pixeles([lng0 + dx, lng1 + dx], [lat1 + dy, lat0 + dy])
+    return [(x[0], y[0]), (x[1], y[0]), (x[1], y[1]), (x[0], y[1]), (x[0], y[0])]
+
+
+def mapa_base(proyeccion, filas_banda=FILAS_BANDA):
+    """Matriz de clases (MAR, ESPANA, OTROS, LINEA) de la imagen, cacheada en disco.
+
+    Se rasteriza por bandas con Pillow directamente sobre un `.npy` con
+    memory-map, así que ni al crearla ni al leerla hace falta la imagen entera.
+    """
+    import hashlib
+
+    clave = hashlib.sha1(f'{VERSION_MAPA_BASE}:{proyeccion.clave()}'.encode()).hexdigest()[:12]
+    ruta = os.path.join(cache_dir, f'mapa_base_{proyeccion.ancho}x{proyeccion.alto}_{clave}.npy')
+    if os.path.exists(ruta):
+        return np.load(ruta, mmap_mode='r')
+
+    from PIL import Image, ImageDraw
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temporal = f'{ruta}.{os.getpid()}.tmp.npy'
+    clases = np.lib.format.open_memmap(temporal, mode='w+', dtype=np.uint8,
+                                       shape=(proyeccion.alto, proyeccion.ancho))
+    poligonos = _poligonos_base(proyeccion)
+    grosor = max(1, proyeccion.ancho // 1600)
+    for y0 in range(0, proyeccion.alto, filas_banda):
+        filas = min(filas_banda, proyeccion.alto - y0)
+        banda = Image.new('L', (proyeccion.ancho, filas), MAR)
+        dibujo = ImageDraw.Draw(banda)
+        for clase, contorno in poligonos:
+            dibujo.polygon([(x, y - y0) for x, y in contorno], fill=clase)
+        for _, contorno in poligonos:
+            dibujo.line([(x, y - y0) for x, y in contorno + contorno[:1]], fill=LINEA, width=grosor)
+        if proyeccion.recuadro_canarias:
+            dibujo.line([(x, y - y0) for x, y in _recuadro_canarias(proyeccion)], fill=LINEA, width=grosor)
+        clases[y0:y0 + filas] = np.asarray(banda)
+    clases.flush()
+    del clases
+    os.replace(temporal, ruta)
+    return np.load(ruta, mmap_mode='r')
+
+
+# --- Densidad ----------------------------------------------------------------
+
+def desenfoque_gaussiano(matriz, sigma):
+    """Convolución con un kernel gaussiano separable (radio 3 sigma, bordes a cero)."""
+    if sigma <= 0:
+        return matriz
+    radio = int(np.ceil(3 * sigma))
+    kernel = np.exp(-0.5 * (np.arange(-radio, radio + 1) / sigma) ** 2)
+    kernel = (kernel / kernel.sum()).astype(matriz.dtype)
+    for eje in (0, 1):
+        relleno = [(0, 0), (0, 0)]
+        relleno[eje] = (radio, radio)
+        ampliada = np.pad(matriz, relleno)
+        n = matriz.shape[eje]
+        resultado = np.zeros_like(matriz)
+        for i, peso in enumerate(kernel):
+            resultado += peso * (ampliada[i:i + n] if eje == 0 else ampliada[:, i:i + n])
+        matriz = resultado
+    return matriz
+
+
+class Densidad:
+    """Rejilla de densidad suavizada y normalizada a [0, 1]."""
+
+    def __init__(self, proyeccion, lng, lat, sigma_km=SIGMA_KM, percentil=99.5):
+        sigma_px = sigma_km / proyeccion.km_por_pixel
+        self.factor = f = max(1, int(sigma_px // 3))
+        # El binning ya suaviza con varianza f^2/12: se descuenta de la sigma del kernel
+        sigma_celdas = np.sqrt(max(sigma_px ** 2 - f ** 2 / 12, 0.0)) / f
+        self.margen = m = int(np.ceil(3 * sigma_celdas)) + 1
+        alto = -(-proyeccion.alto // f) + 2 * m
+        ancho = -(-proyeccion.ancho // f) + 2 * m
+
+        x, y = proyeccion.pixeles(lng, lat)
+        columnas = np.floor(x / f).astype(np.int64) + m
+        filas = np.floor(y / f).astype(np.int64) + m
+        dentro = (columnas >= 0) & (columnas < ancho) & (filas >= 0) & (filas < alto)
+        conteos = np.bincount(filas[dentro] * ancho + columnas[dentro], minlength=alto * ancho)
+        rejilla = desenfoque_gaussiano(conteos.reshape(alto, ancho).astype(np.float32), sigma_celdas)
+
+        valores = rejilla[rejilla > rejilla.max() * 1e-3] if rejilla.any() else np.ones(1, dtype=np.float32)
+        self.maximo = float(np.percentile(valores, percentil))
+        self.rejilla = np.clip(rejilla / self.maximo, 0, 1)
+        self.puntos = int(dentro.sum())
+
+    def _interpolacion(self, n):
+        # Centro de cada píxel en coordenadas de la rejilla (con margen)
+        posicion = (np.arange(n) + 0.5) / self.factor - 0.5 + self.margen
+        i0 = np.floor(posicion).astype(np.int64)
+        return i0, i0 + 1, (posicion - i0).astype(np.float32)
+
+    def banda(self, y0, filas, columnas):
+        """Intensidad interpolada de las filas `[y0, y0 + filas)` de la imagen."""
+        f0, f1, wf = self._interpolacion(y0 + filas)
+        f0, f1, wf = f0[y0:], f1[y0:], wf[y0:, None]
+        parcial = self.rejilla[f0] * (1 - wf) + self.rejilla[f1] * wf
+        c0, c1, wc = columnas
+        return np.take(parcial, c0, axis=1) * (1 - wc) + np.take(parcial, c1, axis=1) * wc
+
+
+def tabla_colores():
+    """RGB final para cada (clase del mapa base, nivel de calor 0-255)."""
+    niveles = np.linspace(0, 1, 256)
+    paradas = [p for p, _ in GRADIENTE]
+    color = np.stack([np.interp(niveles, paradas, [c[i] for _, c in GRADIENTE]) for i in range(3)], axis=1)
+    alfa = np.where(niveles < UMBRAL, 0.0, OPACIDAD_MAX * np.sqrt(niveles))[:, None]
+    mezcla = PALETA[:, None, :] * (1 - alfa) + color[None, :, :] * alfa
+    return np.round(mezcla).astype(np.uint8).reshape(-1, 3)
+
+
+# --- PNG por bandas ----------------------------------------------------------
+
+def _bloque_png(fichero, tipo, datos):
+    fichero.write(struct.pack('>I', len(datos)) + tipo + datos)
+    fichero.write(struct.pack('>I', zlib.crc32(tipo + datos)))
+
+
+def escribir_png(ruta, ancho, alto, bandas, nivel=NIVEL_ZLIB):
+    """Escribe un PNG RGB a partir de bandas `(filas, ancho, 3)` uint8, sin juntarlas.
+
+    Cada fila usa el filtro "Up" de PNG (diferencia con la fila anterior),
+    que en un mapa con grandes zonas lisas reduce bastante el tamaño.
+    """
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    compresor = zlib.compressobj(nivel)
+    anterior = np.zeros((1, ancho * 3), dtype=np.uint8)
+    with open(temporal, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        _bloque_png(f, b'IHDR', struct.pack('>IIBBBBB', ancho, alto, 8, 2, 0, 0, 0))
+        for banda in bandas:
+            pixeles = banda.reshape(len(banda), -1)
+            filas = np.empty((len(banda), 1 + ancho * 3), dtype=np.uint8)
+            filas[:, 0] = 2
+            np.subtract(pixeles, np.concatenate([anterior, pixeles[:-1]]), out=filas[:, 1:])
+            anterior = pixeles[-1:]
+            datos = compresor.compress(filas.data)
+            if datos:
+                _bloque_png(f, b'IDAT', datos)
+        _bloque_png(f, b'IDAT', compresor.flush())
+        _bloque_png(f, b'IEND', b'')
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def renderizar(lng, lat, ruta, ancho=3840, alto=2160, limites=None, sigma_km=SIGMA_KM,
+               filas_banda=FILAS_BANDA):
+    """Pinta el mapa de calor de las posiciones en un PNG de `ancho` x `alto`.
+
+    Devuelve la `Densidad` usada (factor de la rejilla, puntos dentro...).
+    """
+    proyeccion = Proyeccion(ancho, alto, limites)
+    base = mapa_base(proyeccion, filas_banda)
+    densidad = Densidad(proyeccion, lng, lat, sigma_km)
+    # Cada color como un único elemento de 3 bytes: la consulta es un take 1-D
+    colores = np.ascontiguousarray(tabla_colores()).view('V3').ravel()
+    columnas = densidad._interpolacion(ancho)
+
+    def bandas():
+        for y0 in range(0, alto, filas_banda):
+            filas = min(filas_banda, alto - y0)
+            nivel = (densidad.banda(y0, filas, columnas) * 255 + 0.5).astype(np.uint16)
+            nivel += base[y0:y0 + filas].astype(np.uint16) << 8
+            yield colores[nivel.ravel()].view(np.uint8).reshape(filas, ancho, 3)
+
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    escribir_png(ruta, ancho, alto, bandas())
+    return densidad
+
+
+def main(csv_path, ancho=3840, alto=2160, ruta=None, limites=None, sigma_km=SIGMA_KM,
+         filas_banda=FILAS_BANDA, refrescar=False):
+    import time
+
+    import dataset_loader
+
+    hamburger_df = dataset_loader.cargar(csv_path, columnas=['lat', 'lng'], refrescar=refrescar).dropna()
+    ruta = ruta or os.path.join(viz_dir, f'mapa_calor_{ancho}x{alto}.png')
+    inicio = time.perf_counter()
+    densidad = renderizar(hamburger_df['lng'].to_numpy(), hamburger_df['lat'].to_numpy(), ruta,
+                          ancho, alto, limites, sigma_km, filas_banda)
+    print(f"Mapa de calor {ancho}x{alto} ({densidad.puntos} locales, rejilla 1:{densidad.factor}) "
+          f"guardado en {ruta} en {time.perf_counter() - inicio:.2f}s")
+    return ruta
@@ -0,0 +1,281 @@
+"""Índice hexagonal multirresolución (al estilo H3) para las hamburgueserías.
+
+Cada local se asigna, en una sola pasada vectorizada, a una celda hexagonal
+en cada resolución. Los hexágonos se trazan sobre una proyección acimutal
+equivalente de Lambert centrada en España, así que todas las celdas de una
+resolución tienen la misma superficie (a diferencia de los bins cuadrados en
+grados). Como en H3 (apertura 7), de una resolución a la siguiente el lado
+se divide por raíz de 7 y la rejilla gira 19.1 grados, de modo que cada
+celda tiene exactamente 7 hijas: la del centro y sus 6 vecinas.
+
+La jerarquía se define por el centro: el padre de una celda es la celda de
+la resolución superior que contiene su centro. Igual que en H3, un punto
+cae en el padre de su celda fina en ~90% de los casos (las hijas no cubren
+exactamente al padre). Los locales se
+asignan geométricamente solo en la resolución más fina y las demás se
+obtienen subiendo por la jerarquía, así que los agregados de un padre son
+exactamente la suma de los de sus hijos y el roll-up es un groupby sobre
+columnas aditivas ya precalculadas.
+
+Identificadores: enteros de 64 bits con la resolución en los 4 bits altos y
+las coordenadas axiales (q, r) desplazadas en 2 x 28 bits.
+
+El mapa de calor agregado (`geo_export.celdas_calor`, también en el modo
+fuera de memoria) cuenta los locales por celda de este índice.
+"""
+import os
+
+import numpy as np
+
+from project_paths import cache_dir
+
+ruta_lugares = os.path.join(cache_dir, 'hex_lugares.parquet')
+ruta_agregados = os.path.join(cache_dir, 'hex_agregados.parquet')
+
+RADIO_TIERRA = 6371008.8  # metros
+LAT0, LNG0 = np.radians(40.0), np.radians(-3.7)  # centro de la proyección
+LADO_RES0 = 200_000.0  # lado del hexágono en la resolución 0 (metros)
+RESOLUCIONES = range(0, 7)  # 200 km, 76 km, 29 km, 11 km, 4 km, 1.5 km, 0.6 km
+
+_BITS = 28
+_DESPLAZAMIENTO = 1 << (_BITS - 1)
+_MASCARA = (1 << _BITS) - 1
+_RAIZ3 = np.sqrt(3.0)
+# Giro entre resoluciones: ángulo del vector (2, 1) de la rejilla hija
+_GIRO = np.arctan2(1.5, 2.5 * _RAIZ3)
+
+
+def lado(res):
+    """Lado del hexágono (metros); `res` puede ser un array."""
+    return LADO_RES0 / np.power(np.sqrt(7.0), res)
+
+
+def _rotar(x, y, angulo):
+    c, s = np.cos(angulo), np.sin(angulo)
+    return x * c - y * s, x * s + y * c
+
+
+def proyectar(lat, lng):
+    """Lambert acimutal equivalente (esfera) -> (x, y) en metros."""
+    phi, lam = np.radians(lat), np.radians(lng) - LNG0
+    k = np.sqrt(2.0 / (1.0 + np.sin(LAT0) * np.sin(phi) + np.cos(LAT0) * np.cos(phi) * np.cos(lam)))
+    x = RADIO_TIERRA * k * np.cos(phi) * np.sin(lam)
+    y = RADIO_TIERRA * k * (np.cos(LAT0) * np.sin(phi) - np.sin(LAT0) * np.cos(phi) * np.cos(lam))
+    return x, y
+
+
+def desproyectar(x, y):
+    """Inversa de `proyectar`: (x, y) en metros -> (lat, lng) en grados."""
+    rho = np.hypot(x, y)
+    c = 2.0 * np.arcsin(np.clip(rho / (2.0 * RADIO_TIERRA), -1.0, 1.0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        phi = np.arcsin(np.cos(c) * np.sin(LAT0) + np.where(rho > 0, y * np.sin(c) * np.cos(LAT0) / rho, 0.0))
+    lam = LNG0 + np.arctan2(x * np.sin(c), rho * np.cos(LAT0) * np.cos(c) - y * np.sin(LAT0) * np.sin(c))
+    return np.degrees(phi), np.degrees(lam)
+
+
+def _hex_redondear(qf, rf):
+    # Redondeo cúbico: la celda hexagonal que contiene el punto fraccionario
+    sf = -qf - rf
+    q, r, s = np.round(qf), np.round(rf), np.round(sf)
+    dq, dr, ds = np.abs(q - qf), np.abs(r - rf), np.abs(s - sf)
+    corregir_q = (dq > dr) & (dq > ds)
+    corregir_r = ~corregir_q & (dr > ds)
+    q = np.where(corregir_q, -r - s, q)
+    r = np.where(corregir_r, -q - s, r)
+    return q.astype(np.int64), r.astype(np.int64)
+
+
+def xy_a_hex(x, y, res):
+    """Coordenadas axiales (q, r) del hexágono (punta arriba) que contiene cada punto."""
+    tam = lado(res)
+    x, y = _rotar(x, y, -_GIRO * res)
+    return _hex_redondear((_RAIZ3 / 3 * x - y / 3) / tam, (2.0 / 3 * y) / tam)
+
+
+def hex_a_xy(q, r, res):
+    """Centro (x, y) en metros de cada hexágono."""
+    tam = lado(res)
+    return _rotar(tam * (_RAIZ3 * q + _RAIZ3 / 2 * r), tam * 1.5 * r, _GIRO * res)
+
+
+def codificar(res, q, r):
+    res = np.asarray(res, dtype=np.int64)
+    return (res << (2 * _BITS)) | ((np.asarray(q) + _DESPLAZAMIENTO) << _BITS) | (np.asarray(r) + _DESPLAZAMIENTO)
+
+
+def decodificar(celda):
+    celda = np.asarray(celda, dtype=np.int64)
+    res = celda >> (2 * _BITS)
+    q = ((celda >> _BITS) & _MASCARA) - _DESPLAZAMIENTO
+    r = (celda & _MASCARA) - _DESPLAZAMIENTO
+    return res, q, r
+
+
+def padre(celda):
+    """Celda de la resolución inmediatamente superior que contiene el centro."""
+    res, q, r = decodificar(celda)
+    x, y = hex_a_xy(q, r, res)
+    return codificar(res - 1, *xy_a_hex(x, y, res - 1))
+
+
+def centro(celda):
+    """(lat, lng) del centro de cada celda."""
+    res, q, r = decodificar(celda)
+    return desproyectar(*hex_a_xy(q, r, res))
+
+
+def vertices(celda):
+    """Polígono (lista de [lng, lat]) de una celda, para GeoJSON."""
+    res, q, r = (int(v) for v in decodificar(celda))
+    cx, cy = hex_a_xy(q, r, res)
+    angulos = np.radians(np.arange(6) * 60 + 30) + _GIRO * res
+    lat, lng = desproyectar(cx + lado(res) * np.cos(angulos), cy + lado(res) * np.sin(angulos))
+    anillo = np.round(np.column_stack([lng, lat]), 5).tolist()
+    return anillo + anillo[:1]
+
+
+def asignar_celdas(lat, lng, resoluciones=RESOLUCIONES):
+    """Celda de cada punto en cada resolución: dict res -> array de ids.
+
+    La más fina se calcula geométricamente; las demás subiendo por `padre`.
+    """
+    resoluciones = sorted(resoluciones)
+    fina = resoluciones[-1]
+    x, y = proyectar(np.asarray(lat, dtype=np.float64), np.asarray(lng, dtype=np.float64))
+    celdas = {fina: codificar(fina, *xy_a_hex(x, y, fina))}
+
+    # Subir por la jerarquía trabajando solo con las celdas únicas
+    unicas, inversa = np.unique(celdas[fina], return_inverse=True)
+    actual = unicas
+    for res in range(fina - 1, resoluciones[0] - 1, -1):
+        actual = padre(actual)
+        if res in resoluciones:
+            celdas[res] = actual[inversa]
+    return celdas
+
+
+# Columnas aditivas: el agregado de un padre es la suma de las de sus hijos
+def _columnas_aditivas(agregados):
+    return ['n', 'n_franquicias', 'score_suma', 'score_n'] + [c for c in agregados.columns if c.startswith('precio_')]
+
+
+def _derivar(agregados):
+    agregados = agregados.copy()
+    lat, lng = centro(agregados['celda'].to_numpy())
+    agregados['lat'] = np.round(lat, 5)
+    agregados['lng'] = np.round(lng, 5)
+    agregados['franquicias_pct'] = agregados['n_franquicias'] / agregados['n'] * 100
+    with np.errstate(invalid='ignore', divide='ignore'):
+        agregados['score_medio'] = agregados['score_suma'] / agregados['score_n']
+    return agregados
+
+
+def agregar_fina(lugares, hamburger_df, res):
+    """Agregados por celda en la resolución más fina (única pasada por los datos)."""
+    import pandas as pd
+
+    base = pd.DataFrame({
+        'celda': lugares[f'celda_r{res}'].to_numpy(),
+        'n': 1,
+        'n_franquicias': hamburger_df['es_franquicia'].to_numpy().astype(np.int64),
+        'score_suma': hamburger_df['score'].fillna(0).to_numpy(),
+        'score_n': hamburger_df['score'].notna().to_numpy().astype(np.int64),
+    })
+    # Mezcla de precios: una columna de recuento por tramo (ver price_buckets), en orden
+    tramos = hamburger_df['precio_bucket'].cat.add_categories('sin dato').fillna('sin dato')
+    precios = pd.get_dummies(tramos, prefix='precio', dtype=np.int64)
+    base = pd.concat([base, precios.reset_index(drop=True)], axis=1)
+    agregados = base.groupby('celda', sort=True).sum().reset_index()
+    agregados.insert(0, 'res', res)
+    return agregados
+
+
+def rollup(agregados_hijos, res_padre):
+    """Agregados de la resolución `res_padre` sumando los de sus hijos."""
+    hijos = agregados_hijos[['celda'] + _columnas_aditivas(agregados_hijos)].copy()
+    celdas = hijos['celda'].to_numpy()
+    res_hijos = int(decodificar(celdas[:1])[0][0]) if len(celdas) else res_padre + 1
+    for _ in range(res_hijos - res_padre):
+        celdas = padre(celdas)
+    hijos['celda'] = celdas
+    agregados = hijos.groupby('celda', sort=True).sum().reset_index()
+    agregados.insert(0, 'res', res_padre)
+    return agregados
+
+
+def construir_indice(hamburger_df, resoluciones=RESOLUCIONES):
+    """Devuelve (lugares, agregados): celda por local y resolución, y agregados por celda."""
+    import pandas as pd
+
+    resoluciones = sorted(resoluciones)
+    celdas = asignar_celdas(hamburger_df['lat'].to_numpy(), hamburger_df['lng'].to_numpy(), resoluciones)
+    lugares = pd.DataFrame({'id': hamburger_df['id'].to_numpy()})
+    for res in resoluciones:
+        lugares[f'celda_r{res}'] = celdas[res]
+
+    niveles = [agregar_fina(lugares, hamburger_df, resoluciones[-1])]
+    for res in reversed(resoluciones[:-1]):
+        niveles.append(rollup(niveles[-1], res))
+    agregados = pd.concat([_derivar(nivel) for nivel in niveles], ignore_index=True)
+    agregados[_columnas_aditivas(agregados)] = agregados[_columnas_aditivas(agregados)].fillna(0)
+    return lugares, agregados
+
+
+def indice(csv_path, refrescar=False):
+    """Índice hexagonal cacheado en Parquet (se regenera si cambia el CSV)."""
+    import pandas as pd
+
+    from analysis_cache import cache_valido, datos_limpios, marcar_cache
+
+    if not refrescar and cache_valido(ruta_agregados, csv_path) and cache_valido(ruta_lugares, csv_path):
+        return pd.read_parquet(ruta_lugares), pd.read_parquet(ruta_agregados)
+
+    lugares, agregados = construir_indice(datos_limpios(csv_path, refrescar))
+    lugares.to_parquet(ruta_lugares, index=False)
+    agregados.to_parquet(ruta_agregados, index=False)
+    marcar_cache(ruta_lugares, csv_path)
+    marcar_cache(ruta_agregados, csv_path)
+    return lugares, agregados
+
+
+def ranking_celdas(agregados, res, top=15, min_locales=1):
+    """Celdas con más hamburgueserías en una resolución."""
+    nivel = agregados[(agregados['res'] == res) & (agregados['n'] >= min_locales)]
+    return nivel.sort_values(['n', 'score_medio'], ascending=[False, False]).head(top)
+
+
+def exportar_geojson(agregados, res):
+    """Capa de polígonos hexagonales de una resolución en `output/maps/data/`."""
+    import geo_export
+
+    nivel = agregados[agregados['res'] == res]
+    precios = [c for c in nivel.columns if c.startswith('precio_')]
+    features = []
+    for i, celda in enumerate(nivel['celda'].to_numpy()):
+        row = nivel.iloc[i]
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Polygon', 'coordinates': [vertices(celda)]},
+            'properties': {
+                'celda': str(celda),
+                'n': int(row['n']),
+                'franquicias_pct': round(float(row['franquicias_pct']), 1),
+                'score': None if np.isnan(row['score_medio']) else round(float(row['score_medio']), 2),
+                'precios': {c[len('precio_'):]: int(row[c]) for c in precios if row[c]},
+            },
+        })
+    return geo_export.escribir_geojson(f'hexagonos_r{res}.geojson',
+                                       {'type': 'FeatureCollection', 'features': features})
+
+
+def main(csv_path, res=4, top=15, refrescar=False):
+    if res not in RESOLUCIONES:
+        raise ValueError(f"Resolución {res} fuera de rango ({RESOLUCIONES.start}-{RESOLUCIONES.stop - 1})")
+    _, agregados = indice(csv_path, refrescar)
+    print(f"\nCELDAS HEXAGONALES CON MÁS HAMBURGUESERÍAS (resolución {res}, lado {lado(res) / 1000:.1f} km):")
+    for i, row in enumerate(ranking_celdas(agregados, res, top).itertuples(index=False), 1):
+        print(f"{i}. celda {row.celda} ({row.lat:.3f}, {row.lng:.3f}): {row.n} locales, "
+              f"{row.franquicias_pct:.0f}% franquicias, rating {row.score_medio:.2f}")
+    ruta = exportar_geojson(agregados, res)
+    print(f"\nCapa hexagonal guardada en {ruta}")
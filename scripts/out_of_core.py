@@ -0,0 +1,396 @@
+"""Modo fuera de memoria para los agregados principales.
+
+Cuando el dataset no cabe en RAM, los agregados de `calcular_estadisticas`
+(top ciudades, franquicias vs independientes, rating por precio, mejores y
+emergentes) y las celdas hexagonales del mapa de calor se calculan partición a partición
+sobre Parquet particionado y se fusionan después:
+
+1. `particionar` reparte el CSV (leído por trozos) en `particiones`
+   directorios según un hash del `id`, de modo que los duplicados caen en la
+   misma partición y se pueden eliminar localmente. Cada fila lleva su
+   posición en el CSV (`_fila`) para desempatar igual que en memoria. El
+   directorio queda marcado con la firma del CSV (`analysis_cache`): si el
+   CSV cambia, o con `--refresh`, se vuelve a particionar. Un directorio de
+   particiones ajeno (`--partitions` sin `.meta.json`) se lee tal cual y
+   nunca se borra.
+2. Primera pasada: cada partición cuenta los nombres de sus locales limpios.
+   Sumados, dan el conjunto global de franquicias (>= UMBRAL_FRANQUICIA).
+3. Segunda pasada: cada partición produce agregados parciales fusionables
+   (conteos con la primera fila de cada clave, sumas de score, candidatos a
+   los rankings) y se combinan en el mismo diccionario que
+   `calcular_estadisticas`.
+
+Las particiones se procesan en paralelo, cada una por lotes de
+`filas_por_lote` filas: la memoria de un proceso está acotada por el lote,
+los ids ya vistos de su partición y los agregados parciales. Conteos,
+rankings y celdas coinciden exactamente con el cálculo en memoria; las medias
+coinciden salvo el redondeo de la suma en coma flotante.
+"""
+import glob
+import os
+
+from data_analisis_burger import TOP_EMERGENTES, UMBRAL_FRANQUICIA
+from geo_export import RES_CALOR
+from price_buckets import ETIQUETAS
+from project_paths import cache_dir
+
+particiones_dir = os.path.join(cache_dir, 'particiones')
+FILAS_POR_LOTE = 100_000
+TOP_MEJORES = 10
+COLUMNAS_LUGAR = ['name', 'city', 'score', 'ratings', '_fila']
+
+
+def gestionado(directorio):
+    """True si el directorio es de esta herramienta: el de la caché o uno marcado por `particionar`."""
+    from analysis_cache import tiene_marca
+
+    return os.path.abspath(directorio) == os.path.abspath(particiones_dir) or tiene_marca(directorio)
+
+
+def particionar(csv_path, directorio=particiones_dir, particiones=8, filas_por_lote=FILAS_POR_LOTE):
+    """Reparte el CSV en `particiones` directorios de Parquet por hash del id.
+
+    Solo borra `directorio` si lo creó esta herramienta (ver `gestionado`);
+    un directorio ajeno con contenido nunca se toca.
+    """
+    import shutil
+
+    import pandas as pd
+
+    from analysis_cache import marcar_cache
+
+    if os.path.isdir(directorio) and os.listdir(directorio):
+        if not gestionado(directorio):
+            raise FileExistsError(f"{directorio} no lo creó outofcore (no tiene .meta.json); no se sobrescribe")
+        shutil.rmtree(directorio)
+    for p in range(particiones):
+        os.makedirs(os.path.join(directorio, f'parte-{p:03d}'))
+
+    fila = 0
+    for n_lote, trozo in enumerate(pd.read_csv(csv_path, chunksize=filas_por_lote)):
+        trozo['_fila'] = range(fila, fila + len(trozo))
+        fila += len(trozo)
+        destino = pd.util.hash_pandas_object(trozo['id'].astype(str), index=False).to_numpy() % particiones
+        for p, parte in trozo.groupby(destino):
+            parte.to_parquet(os.path.join(directorio, f'parte-{p:03d}', f'lote-{n_lote:06d}.parquet'), index=False)
+    marcar_cache(directorio, csv_path)
+    print(f"{fila} filas repartidas en {particiones} particiones en {directorio}")
+    return directorio
+
+
+def listar_particiones(directorio=particiones_dir):
+    """Cada subdirectorio es una partición; si no hay, cada fichero Parquet lo es."""
+    subdirectorios = sorted(d for d in glob.glob(os.path.join(directorio, '*')) if os.path.isdir(d))
+    return subdirectorios or sorted(glob.glob(os.path.join(directorio, '*.parquet')))
+
+
+def _lotes_limpios(particion, numero, filas_por_lote):
+    # Lotes ya filtrados, sin duplicados y con tipos convertidos, en el orden del CSV
+    import pyarrow.parquet as pq
+
+    from data_analisis_burger import convertir_tipos, es_hamburgueseria
+
+    ficheros = sorted(glob.glob(os.path.join(particion, '*.parquet'))) if os.path.isdir(particion) else [particion]
+    vistos = set()
+    posicion = 0
+    for fichero in ficheros:
+        for lote in pq.ParquetFile(fichero).iter_batches(batch_size=filas_por_lote):
+            lote = lote.to_pandas()
+            if '_fila' not in lote.columns:
+                # Sin posición global: se desempata por partición y posición dentro de ella
+                lote['_fila'] = range(numero << 40 | posicion, (numero << 40 | posicion) + len(lote))
+            posicion += len(lote)
+            lote = lote[es_hamburgueseria(lote)].drop_duplicates(subset=['id'])
+            lote = lote[~lote['id'].isin(vistos)].copy()
+            vistos.update(lote['id'])
+            if len(lote):
+                yield convertir_tipos(lote)
+
+
+def _contar_nombres(tarea):
+    particion, numero, filas_por_lote = tarea
+    conteo = {}
+    for lote in _lotes_limpios(particion, numero, filas_por_lote):
+        for nombre, n in lote['name'].value_counts().items():
+            conteo[nombre] = conteo.get(nombre, 0) + int(n)
+    return conteo
+
+
+def _conteo_con_primera(lote, columna, destino):
+    # clave -> [conteo, primera fila]; NaN no cuenta, como en value_counts
+    grupos = lote.groupby(columna)['_fila'].agg(['size', 'min'])
+    for clave, n, primera in zip(grupos.index, grupos['size'], grupos['min']):
+        actual = destino.get(clave)
+        if actual is None:
+            destino[clave] = [int(n), int(primera)]
+        else:
+            actual[0] += int(n)
+            actual[1] = min(actual[1], int(primera))
+
+
+def _sumar_conteos(lote, columna, destino):
+    for clave, n in lote[columna].value_counts().items():
+        if n:  # value_counts de una categoría incluye las categorías sin filas
+            destino[clave] = destino.get(clave, 0) + int(n)
+
+
+def _suma_score(df):
+    return [float(df['score'].sum()), int(df['score'].count())]
+
+
+def _acumular(destino, suma):
+    destino[0] += suma[0]
+    destino[1] += suma[1]
+
+
+def _ordenar_mejores(df):
+    # Mismo orden que calcular_estadisticas: score descendente y, a igualdad, orden del CSV
+    return df.sort_values(['score', '_fila'], ascending=[False, True], na_position='last').head(TOP_MEJORES)
+
+
+def _ordenar_emergentes(df):
+    # Como calcular_estadisticas: score y reseñas descendentes, nombre y, a igualdad, orden del CSV
+    return df.sort_values(['score', 'ratings', 'name', '_fila'],
+                          ascending=[False, False, True, True]).head(TOP_EMERGENTES)
+
+
+_franquicias = frozenset()
+
+
+def _iniciar_trabajador(franquicias):
+    # El conjunto de franquicias se envía una vez por proceso, no con cada tarea
+    global _franquicias
+    _franquicias = franquicias
+
+
+def _agregar_particion(tarea):
+    """Agregados parciales de una partición (ver `fusionar`)."""
+    import pandas as pd
+
+    import geo_export
+
+    particion, numero, filas_por_lote, res = tarea
+    parcial = {
+        'total': 0, 'n_franquicias': 0,
+        'score': [0.0, 0], 'score_franquicias': [0.0, 0], 'score_independientes': [0.0, 0],
+        'ciudades': {}, 'nombres_franquicia': {},
+        'precios_franquicias': {}, 'precios_independientes': {}, 'precio_rating': {},
+        'mejores': None, 'emergentes': None, 'calor': {},
+    }
+    for lote in _lotes_limpios(particion, numero, filas_por_lote):
+        es_franquicia = lote['name'].isin(_franquicias)
+        franquicias_df, independientes_df = lote[es_franquicia], lote[~es_franquicia]
+
+        parcial['total'] += len(lote)
+        parcial['n_franquicias'] += len(franquicias_df)
+        _acumular(parcial['score'], _suma_score(lote))
+        _acumular(parcial['score_franquicias'], _suma_score(franquicias_df))
+        _acumular(parcial['score_independientes'], _suma_score(independientes_df))
+        _conteo_con_primera(lote, 'city', parcial['ciudades'])
+        _conteo_con_primera(franquicias_df, 'name', parcial['nombres_franquicia'])
+        _sumar_conteos(franquicias_df, 'precio_bucket', parcial['precios_franquicias'])
+        _sumar_conteos(independientes_df, 'precio_bucket', parcial['precios_independientes'])
+        for precio, grupo in lote.groupby('precio_bucket', observed=True):
+            _acumular(parcial['precio_rating'].setdefault(precio, [0.0, 0]), _suma_score(grupo))
+
+        mejores = lote.loc[lote['ratings'] >= 50, COLUMNAS_LUGAR]
+        parcial['mejores'] = _ordenar_mejores(pd.concat([parcial['mejores'], mejores]))
+        emergentes = independientes_df.loc[
+            (independientes_df['score'] >= 4.8) &
+            (independientes_df['ratings'] >= 10) &
+            (independientes_df['ratings'] <= 50), COLUMNAS_LUGAR]
+        parcial['emergentes'] = _ordenar_emergentes(pd.concat([parcial['emergentes'], emergentes]))
+
+        for celda, n in geo_export.celdas_calor(lote, res).items():
+            parcial['calor'][celda] = parcial['calor'].get(celda, 0) + n
+    return parcial
+
+
+def _ranking(conteos, top):
+    # Como value_counts: conteo descendente y, a igualdad, orden de primera aparición
+    return sorted(conteos.items(), key=lambda item: (-item[1][0], item[1][1]))[:top]
+
+
+def _fusionar_claves(destino, origen, con_primera=False):
+    for clave, valor in origen.items():
+        if clave not in destino:
+            destino[clave] = list(valor) if isinstance(valor, list) else valor
+        elif con_primera:
+            destino[clave][0] += valor[0]
+            destino[clave][1] = min(destino[clave][1], valor[1])
+        elif isinstance(valor, list):
+            _acumular(destino[clave], valor)
+        else:
+            destino[clave] += valor
+
+
+def fusionar(parciales):
+    """Combina los agregados parciales en el diccionario de `calcular_estadisticas`.
+
+    Añade `celdas_calor`: lista de `[celda, lat, lng, n]` por hexágono (ver `geo_export.lista_calor`).
+    """
+    import pandas as pd
+
+    import geo_export
+
+    from data_analisis_burger import _lugares
+
+    total = {'total': 0, 'n_franquicias': 0, 'score': [0.0, 0], 'score_franquicias': [0.0, 0],
+             'score_independientes': [0.0, 0], 'ciudades': {}, 'nombres_franquicia': {},
+             'precios_franquicias': {}, 'precios_independientes': {}, 'precio_rating': {}, 'calor': {}}
+    mejores, emergentes = [], []
+    for parcial in parciales:
+        total['total'] += parcial['total']
+        total['n_franquicias'] += parcial['n_franquicias']
+        for clave in ('score', 'score_franquicias', 'score_independientes'):
+            _acumular(total[clave], parcial[clave])
+        for clave in ('ciudades', 'nombres_franquicia'):
+            _fusionar_claves(total[clave], parcial[clave], con_primera=True)
+        for clave in ('precios_franquicias', 'precios_independientes', 'precio_rating', 'calor'):
+            _fusionar_claves(total[clave], parcial[clave])
+        if parcial['mejores'] is not None:
+            mejores.append(parcial['mejores'])
+            emergentes.append(parcial['emergentes'])
+
+    def media(suma):
+        return suma[0] / suma[1] if suma[1] else float('nan')
+
+    def porcentajes(conteos):
+        n = sum(conteos.values())
+        return {precio: c / n * 100 for precio, c in conteos.items()}
+
+    n = total['total']
+    n_franquicias = total['n_franquicias']
+    n_independientes = n - n_franquicias
+    pct_franquicias = porcentajes(total['precios_franquicias'])
+    pct_independientes = porcentajes(total['precios_independientes'])
+    categorias = [c for c in ETIQUETAS if c in pct_franquicias or c in pct_independientes]
+    top_ciudades = _ranking(total['ciudades'], 15)
+    vacio = pd.DataFrame(columns=COLUMNAS_LUGAR)
+    mejores = _ordenar_mejores(pd.concat(mejores) if mejores else vacio)
+    emergentes = _ordenar_emergentes(pd.concat(emergentes) if emergentes else vacio)
+
+    return {
+        'total_hamburgueserias': n,
+        'rating_promedio': media(total['score']),
+        'ciudades_principales': ', '.join(ciudad for ciudad, _ in top_ciudades[:3]),
+        'total_franquicias': n_franquicias,
+        'total_independientes': n_independientes,
+        'franquicias_pct': n_franquicias / n * 100 if n else 0.0,
+        'independientes_pct': n_independientes / n * 100 if n else 0.0,
+        'top_ciudades': [[ciudad, conteo[0]] for ciudad, conteo in top_ciudades],
+        'franquicias_top': [[nombre, conteo[0]] for nombre, conteo in _ranking(total['nombres_franquicia'], 10)],
+        'precio_comparativa': {
+            'categorias': [str(c) for c in categorias],
+            'franquicias': [float(pct_franquicias.get(c, 0.0)) for c in categorias],
+            'independientes': [float(pct_independientes.get(c, 0.0)) for c in categorias],
+        },
+        'rating_franquicias': media(total['score_franquicias']),
+        'rating_independientes': media(total['score_independientes']),
+        'rating_por_precio': [
+            {'precio': str(precio), 'rating': media(suma), 'n': suma[1]}
+            for precio, suma in sorted(total['precio_rating'].items(), key=lambda item: ETIQUETAS.index(item[0]))
+            if suma[1] > 0
+        ],
+        'top_hamburgueserias': _lugares(mejores),
+        'emergentes': _lugares(emergentes),
+        'ciudades_emergentes': [[ciudad, int(c)] for ciudad, c in emergentes['city'].value_counts().head(10).items()],
+        'celdas_calor': geo_export.lista_calor(total['calor']),
+    }
+
+
+def calcular(directorio=particiones_dir, trabajadores=None, filas_por_lote=FILAS_POR_LOTE, res=RES_CALOR):
+    """Estadísticas de todas las particiones de `directorio`, en paralelo."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    particiones = listar_particiones(directorio)
+    if not particiones:
+        raise FileNotFoundError(f"No hay particiones Parquet en {directorio}")
+
+    tareas = [(particion, i, filas_por_lote) for i, particion in enumerate(particiones)]
+    nombres = {}
+    with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+        for conteo in pool.map(_contar_nombres, tareas):
+            _fusionar_claves(nombres, conteo)
+    franquicias = frozenset(nombre for nombre, n in nombres.items() if n >= UMBRAL_FRANQUICIA)
+    del nombres
+
+    with ProcessPoolExecutor(max_workers=trabajadores, initializer=_iniciar_trabajador,
+                             initargs=(franquicias,)) as pool:
+        parciales = list(pool.map(_agregar_particion, [tarea + (res,) for tarea in tareas]))
+    return fusionar(parciales)
+
+
+def diferencias(est_memoria, est_particiones, tolerancia=1e-9):
+    """Claves en las que difieren los dos resultados (las medias con tolerancia relativa)."""
+    import math
+
+    def iguales(a, b):
+        if isinstance(a, dict) and isinstance(b, dict):
+            return a.keys() == b.keys() and all(iguales(a[k], b[k]) for k in a)
+        if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+            return len(a) == len(b) and all(iguales(x, y) for x, y in zip(a, b))
+        if isinstance(a, float) or isinstance(b, float):
+            try:
+                a, b = float(a), float(b)
+            except (TypeError, ValueError):
+                return False
+            return (math.isnan(a) and math.isnan(b)) or math.isclose(a, b, rel_tol=tolerancia)
+        return a == b
+
+    return [clave for clave in est_memoria if not iguales(est_memoria[clave], est_particiones.get(clave))]
+
+
+def verificar(csv_path, est_particiones, res=RES_CALOR):
+    """Compara con el cálculo en memoria sobre el mismo CSV; devuelve True si coinciden."""
+    import dataset_loader
+    import geo_export
+    from data_analisis_burger import calcular_estadisticas
+
+    hamburger_df = dataset_loader.cargar(csv_path)
+    est_memoria = calcular_estadisticas(hamburger_df)
+    est_memoria['celdas_calor'] = geo_export.lista_calor(geo_export.celdas_calor(hamburger_df, res))
+    distintas = diferencias(est_memoria, est_particiones)
+    if distintas:
+        print(f"Diferencias con el cálculo en memoria: {', '.join(distintas)}")
+    else:
+        print("Resultados idénticos al cálculo en memoria")
+    return not distintas
+
+
+def main(csv_path, directorio=particiones_dir, particiones=None, trabajadores=None,
+         filas_por_lote=FILAS_POR_LOTE, comprobar=False, refrescar=False):
+    import json
+    import time
+
+    from analysis_cache import cache_valido
+    from data_analisis_burger import imprimir_estadisticas
+    from hex_index import lado
+
+    # Las particiones propias se rehacen si el CSV cambió; un conjunto de
+    # particiones ajeno (sin .meta.json) se lee tal cual, sin mirar el CSV
+    if not listar_particiones(directorio):
+        rehacer = True
+    elif gestionado(directorio):
+        rehacer = particiones or refrescar or not cache_valido(directorio, csv_path)
+    elif particiones or refrescar:
+        raise FileExistsError(f"{directorio} no lo creó outofcore: --split/--refresh no lo sobrescriben")
+    else:
+        rehacer = False
+    if rehacer:
+        particionar(csv_path, directorio, particiones or 8, filas_por_lote)
+
+    inicio = time.perf_counter()
+    est = calcular(directorio, trabajadores, filas_por_lote)
+    print(f"{len(listar_particiones(directorio))} particiones agregadas en {time.perf_counter() - inicio:.1f}s")
+
+    ruta = os.path.join(cache_dir, 'estadisticas_particiones.json')
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(est, f, ensure_ascii=False)
+    imprimir_estadisticas(est)
+    print(f"\n{len(est['celdas_calor'])} hexágonos de {lado(RES_CALOR) / 1000:.1f} km de lado en el mapa de calor; "
+          f"agregados guardados en {ruta}")
+
+    if comprobar:
+        verificar(csv_path, est)
+    return est
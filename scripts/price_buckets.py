@@ -0,0 +1,170 @@
+"""Normalización de la columna `price`.
+
+Google Maps mezcla niveles en símbolos ("€", "€€"...) con rangos en euros
+("10–20 €", "20-30 €"...) y muchos locales no tienen dato. Aquí cada token se
+interpreta como un rango en euros y se asigna a un tramo ordenado, con su
+punto medio numérico:
+
+    columna           ejemplo   uso
+    precio_bucket     '10–20 €' categoría ordenada para agrupar y ordenar ejes
+    precio_nivel      1         ordinal (-1 sin dato)
+    precio_medio      15.0      euros, para medias o regresiones
+
+Solo se interpretan los tokens distintos (`pd.factorize`): el resultado se
+reparte a todas las filas con un `take`. La tabla token -> rango se guarda en
+`output/cache/precios_tokens.json`, así que en ejecuciones posteriores solo
+se interpretan los tokens nuevos.
+
+`python scripts/price_buckets.py` comprueba la interpretación de `EJEMPLOS`
+(termina con código 1 si algún token no da el rango esperado).
+"""
+import json
+import os
+import re
+
+from project_paths import cache_dir
+
+ruta_tabla = os.path.join(cache_dir, 'precios_tokens.json')
+VERSION_INTERPRETE = 2  # subir si cambia interpretar_token (invalida la tabla guardada)
+
+# Convención para los niveles en símbolos: rango aproximado en euros por persona
+RANGO_SIMBOLOS = {1: (1.0, 10.0), 2: (10.0, 20.0), 3: (20.0, 30.0), 4: (30.0, None)}
+ANCHO_ABIERTO = 20.0  # "30+ €" se toma como 30-50 € para el punto medio
+
+# Tramos ordenados por punto medio: (etiqueta, límite superior exclusivo)
+TRAMOS = [('< 10 €', 10.0), ('10–20 €', 20.0), ('20–30 €', 30.0), ('30–50 €', 50.0), ('> 50 €', float('inf'))]
+ETIQUETAS = [etiqueta for etiqueta, _ in TRAMOS]
+
+_NUMERO = re.compile(r'\d+(?:[.,]\d+)?')
+_SIMBOLOS = re.compile(r'€+|\$+')
+_GUION = re.compile(r'[-–—]')
+_tabla = None  # token -> [desde, hasta] o None, compartida en el proceso
+
+
+def interpretar_token(token):
+    """Rango `(desde, hasta)` en euros de un token de precio; `hasta` es None si es abierto."""
+    texto = str(token).strip().lower()
+    if not texto or texto in ('nan', 'none'):
+        return None
+    numeros = [float(n.replace(',', '.')) for n in _NUMERO.findall(texto)]
+    if len(numeros) >= 2:
+        return (min(numeros[:2]), max(numeros[:2]))
+    if numeros:
+        n = numeros[0]
+        if '+' in texto or '>' in texto or 'más' in texto or 'mas ' in texto:
+            return (n, None)
+        if '<' in texto or 'menos' in texto:
+            return (0.0, n)
+        return (n, n)
+    # Niveles en símbolos, sueltos ("€€") o en rango ("€€-€€€"): la tirada más
+    # corta da el límite inferior y la más larga el superior
+    niveles = [min(len(tirada), max(RANGO_SIMBOLOS))
+               for parte in _GUION.split(texto) for tirada in _SIMBOLOS.findall(parte)]
+    if niveles:
+        return (RANGO_SIMBOLOS[min(niveles)][0], RANGO_SIMBOLOS[max(niveles)][1])
+    return None
+
+
+# Tokens vistos en los datos (o que los confundían antes) y su rango esperado
+EJEMPLOS = {
+    '€': (1.0, 10.0),
+    '€€€€': (30.0, None),
+    '€€-€€€': (10.0, 30.0),
+    '€–€€': (1.0, 20.0),
+    '$$ - $$$$': (10.0, None),
+    '10–20 €': (10.0, 20.0),
+    '20-30 €': (20.0, 30.0),
+    '30+ €': (30.0, None),
+    '< 10 €': (0.0, 10.0),
+    '': None,
+}
+
+
+def comprobar():
+    """Interpreta `EJEMPLOS` y devuelve los tokens que no dan el rango esperado."""
+    errores = []
+    for token, esperado in EJEMPLOS.items():
+        obtenido = interpretar_token(token)
+        if obtenido != esperado:
+            errores.append((token, esperado, obtenido))
+    return errores
+
+
+def punto_medio(rango):
+    if rango is None:
+        return float('nan')
+    desde, hasta = rango
+    return desde + ANCHO_ABIERTO / 2 if hasta is None else (desde + hasta) / 2
+
+
+def nivel(medio):
+    """Índice del tramo de un punto medio (-1 si no hay dato)."""
+    if medio != medio:  # NaN
+        return -1
+    for i, (_, limite) in enumerate(TRAMOS):
+        if medio < limite:
+            return i
+    return len(TRAMOS) - 1
+
+
+def _cargar_tabla():
+    global _tabla
+    if _tabla is None:
+        _tabla = {}
+        try:
+            with open(ruta_tabla, 'r', encoding='utf-8') as f:
+                guardada = json.load(f)
+            if guardada.get('version') == VERSION_INTERPRETE:
+                _tabla = guardada['tokens']
+        except (OSError, ValueError):
+            pass
+    return _tabla
+
+
+def _guardar_tabla(tabla):
+    # Se escribe aparte y se renombra: varios procesos pueden actualizarla a la vez
+    os.makedirs(cache_dir, exist_ok=True)
+    temporal = f'{ruta_tabla}.{os.getpid()}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({'version': VERSION_INTERPRETE, 'tokens': tabla}, f, ensure_ascii=False)
+    os.replace(temporal, ruta_tabla)
+
+
+def rangos(tokens):
+    """Rango de cada token distinto, interpretando solo los que no están en la tabla."""
+    tabla = _cargar_tabla()
+    nuevos = [t for t in tokens if t not in tabla]
+    for token in nuevos:
+        rango = interpretar_token(token)
+        tabla[token] = None if rango is None else list(rango)
+    if nuevos:
+        _guardar_tabla(tabla)
+    return [tabla[t] for t in tokens]
+
+
+def anadir_columnas(hamburger_df, columna='price'):
+    """Añade `precio_bucket`, `precio_nivel` y `precio_medio` en una pasada vectorizada."""
+    import numpy as np
+    import pandas as pd
+
+    codigos, unicos = pd.factorize(hamburger_df[columna])
+    medios_unicos = np.array([punto_medio(r) for r in rangos([str(u) for u in unicos])], dtype=np.float64)
+    niveles_unicos = np.array([nivel(m) for m in medios_unicos], dtype=np.int8)
+
+    # El código -1 de factorize (NaN) apunta a un valor extra "sin dato" al final
+    medios = np.append(medios_unicos, np.nan)[codigos]
+    niveles = np.append(niveles_unicos, np.int8(-1))[codigos]
+    hamburger_df['precio_bucket'] = pd.Categorical.from_codes(niveles, categories=ETIQUETAS, ordered=True)
+    hamburger_df['precio_nivel'] = niveles
+    hamburger_df['precio_medio'] = medios
+    return hamburger_df
+
+
+if __name__ == '__main__':
+    import sys
+
+    fallos = comprobar()
+    for token, esperado, obtenido in fallos:
+        print(f"{token!r}: esperado {esperado}, obtenido {obtenido}")
+    print(f"{len(EJEMPLOS) - len(fallos)}/{len(EJEMPLOS)} tokens interpretados como se esperaba")
+    sys.exit(1 if fallos else 0)
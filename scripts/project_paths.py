@@ -0,0 +1,42 @@
+import glob
+import os
+
+# Rutas del proyecto compartidas por todos los scripts de análisis.
+# Este módulo no importa librerías pesadas para que la CLI arranque rápido.
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_dir = os.path.dirname(script_dir)  # Directorio principal del proyecto
+
+data_dir = os.path.join(project_dir, 'data')
+output_dir = os.path.join(project_dir, 'output')
+viz_dir = os.path.join(output_dir, 'visualizations')
+maps_dir = os.path.join(output_dir, 'maps')
+reports_dir = os.path.join(output_dir, 'reports')
+cache_dir = os.path.join(output_dir, 'cache')
+
+# Archivo original del scrapeo (se usa si no hay snapshots más recientes)
+csv_por_defecto = os.path.join(data_dir, 'BurgersSpain_20250216_2154.csv')
+
+
+def crear_directorios():
+    """Crea los directorios de salida si no existen."""
+    for directory in [data_dir, output_dir, viz_dir, maps_dir, reports_dir, cache_dir]:
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+            print(f"Creado directorio: {directory}")
+
+
+def snapshots_disponibles():
+    """Devuelve los snapshots `BurgersSpain_*.csv` ordenados por nombre (fecha)."""
+    return sorted(glob.glob(os.path.join(data_dir, 'BurgersSpain_*.csv')))
+
+
+def csv_mas_reciente():
+    """Ruta del snapshot más reciente, o el CSV original si no hay ninguno."""
+    snapshots = snapshots_disponibles()
+    return snapshots[-1] if snapshots else csv_por_defecto
+
+
+def firma_archivo(path):
+    """Firma barata (tamaño + fecha de modificación) para invalidar cachés."""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
@@ -0,0 +1,103 @@
+"""Consultas SQL ad hoc sobre los datos limpios con DuckDB.
+
+Cada fichero Parquet de `output/cache/` (datos limpios y tablas derivadas)
+y cada Parquet/CSV de `data/tablas/` (tablas de enriquecimiento) se expone
+como una vista. Las vistas leen el Parquet directamente: DuckDB empuja los
+filtros a la lectura (predicate pushdown) y escanea en paralelo, sin pasar
+por pandas. Los resultados se escriben en streaming a CSV o Parquet.
+
+Ejemplo:
+    python scripts/burger_cli.py query \\
+        "SELECT city, count(*) n, avg(score) FROM hamburgueserias GROUP BY city ORDER BY n DESC LIMIT 20"
+"""
+import csv
+import glob
+import os
+import sys
+
+from analysis_cache import cache_valido, ruta_datos_limpios
+from project_paths import cache_dir, data_dir
+
+tablas_extra_dir = os.path.join(data_dir, 'tablas')
+TAMANO_LOTE = 10_000
+
+
+def _sql_literal(texto):
+    return "'" + texto.replace("'", "''") + "'"
+
+
+def tablas_disponibles():
+    """Nombre de vista -> ruta del fichero que la respalda."""
+    tablas = {}
+    for ruta in sorted(glob.glob(os.path.join(cache_dir, '*.parquet'))):
+        tablas[os.path.splitext(os.path.basename(ruta))[0]] = ruta
+    for patron in ('*.parquet', '*.csv'):
+        for ruta in sorted(glob.glob(os.path.join(tablas_extra_dir, patron))):
+            tablas[os.path.splitext(os.path.basename(ruta))[0]] = ruta
+    if ruta_datos_limpios in tablas.values():
+        tablas['hamburgueserias'] = ruta_datos_limpios
+    return tablas
+
+
+def conectar(csv_path, threads=None):
+    """Conexión DuckDB en memoria con una vista por tabla disponible."""
+    import duckdb
+
+    # Solo se pasa por pandas si la caché Parquet no existe o está obsoleta
+    if not cache_valido(ruta_datos_limpios, csv_path):
+        from analysis_cache import asegurar_datos_limpios
+        asegurar_datos_limpios(csv_path)
+
+    con = duckdb.connect(database=':memory:')
+    if threads:
+        con.execute(f'SET threads = {int(threads)}')
+    for nombre, ruta in tablas_disponibles().items():
+        lector = 'read_parquet' if ruta.endswith('.parquet') else 'read_csv_auto'
+        con.execute(f'CREATE VIEW "{nombre}" AS SELECT * FROM {lector}({_sql_literal(ruta)})')
+    return con
+
+
+def exportar(con, sql, ruta_salida):
+    """Escribe el resultado de la consulta en CSV o Parquet sin materializarlo en Python."""
+    formato = 'PARQUET' if ruta_salida.lower().endswith('.parquet') else 'CSV, HEADER'
+    con.execute(f'COPY ({sql}) TO {_sql_literal(ruta_salida)} (FORMAT {formato})')
+    print(f"Resultado guardado en {ruta_salida}", file=sys.stderr)
+
+
+def volcar_csv(con, sql, salida=sys.stdout):
+    """Escribe el resultado como CSV por lotes (sin cargarlo entero en memoria)."""
+    cursor = con.execute(sql)
+    writer = csv.writer(salida)
+    writer.writerow([col[0] for col in cursor.description])
+    filas = 0
+    while True:
+        lote = cursor.fetchmany(TAMANO_LOTE)
+        if not lote:
+            break
+        writer.writerows(lote)
+        filas += len(lote)
+    return filas
+
+
+def ejecutar(csv_path, sql, ruta_salida=None, threads=None):
+    sql = sql.strip().rstrip(';')
+    con = conectar(csv_path, threads)
+    try:
+        if ruta_salida:
+            exportar(con, sql, ruta_salida)
+        else:
+            volcar_csv(con, sql)
+    finally:
+        con.close()
+
+
+def imprimir_tablas(csv_path):
+    con = conectar(csv_path)
+    try:
+        for nombre, ruta in tablas_disponibles().items():
+            columnas = con.execute(f'DESCRIBE "{nombre}"').fetchall()
+            print(f"{nombre}  ({os.path.relpath(ruta, os.path.dirname(data_dir))})")
+            for col in columnas:
+                print(f"    {col[0]:<20}{col[1]}")
+    finally:
+        con.close()
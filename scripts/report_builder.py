@@ -0,0 +1,230 @@
+"""Reporte HTML autocontenido del mercado de hamburgueserías.
+
+El reporte se compone de secciones. Cada sección declara qué claves de las
+estadísticas cacheadas usa y qué gráfico PNG incluye; con eso se calcula un
+hash de contenido. Si el hash coincide con el de la última construcción, se
+reutiliza el fragmento HTML guardado en `output/cache/report/` en lugar de
+volver a renderizarlo (y de volver a generar la miniatura).
+"""
+import base64
+import hashlib
+import html
+import io
+import json
+import os
+from datetime import datetime
+
+from data_analisis_burger import asegurar_grafico
+from project_paths import cache_dir, crear_directorios, reports_dir
+
+# Subir este número invalida todos los fragmentos (p. ej. al cambiar el HTML)
+VERSION_PLANTILLA = 1
+TAMANO_MINIATURA = (640, 640)
+
+secciones_cache_dir = os.path.join(cache_dir, 'report')
+ruta_reporte = os.path.join(reports_dir, 'reporte_mercado.html')
+
+
+class HtmlSeguro(str):
+    """Texto ya escapado: `tabla` lo inserta tal cual."""
+
+
+def enlace(texto, href):
+    """Celda con un enlace, para `tabla`."""
+    return HtmlSeguro(f'<a href="{html.escape(href)}">{html.escape(str(texto))}</a>')
+
+
+def _celda(valor):
+    return valor if isinstance(valor, HtmlSeguro) else html.escape(str(valor))
+
+
+def tabla(cabeceras, filas):
+    """Tabla HTML; el texto de las celdas se escapa salvo el de `HtmlSeguro` (p. ej. `enlace`)."""
+    cab = ''.join(f'<th>{html.escape(str(c))}</th>' for c in cabeceras)
+    cuerpo = ''.join(
+        '<tr>' + ''.join(f'<td>{_celda(v)}</td>' for v in fila) + '</tr>'
+        for fila in filas
+    )
+    return f'<table><thead><tr>{cab}</tr></thead><tbody>{cuerpo}</tbody></table>'
+
+
+def render_resumen(est):
+    return tabla(['Indicador', 'Valor'], [
+        ['Total de hamburgueserías', est['total_hamburgueserias']],
+        ['Rating promedio', f"{est['rating_promedio']:.2f}"],
+        ['Ciudades principales', est['ciudades_principales']],
+        ['Porcentaje de franquicias', f"{est['franquicias_pct']:.1f}%"],
+        ['Porcentaje de independientes', f"{est['independientes_pct']:.1f}%"],
+    ])
+
+
+def render_top_ciudades(est):
+    return tabla(['#', 'Ciudad', 'Hamburgueserías'],
+                  [[i, c, n] for i, (c, n) in enumerate(est['top_ciudades'], 1)])
+
+
+def render_franquicias(est):
+    ratings = tabla(['Tipo', 'Establecimientos', 'Rating promedio'], [
+        ['Franquicias', est['total_franquicias'], f"{est['rating_franquicias']:.2f}"],
+        ['Independientes', est['total_independientes'], f"{est['rating_independientes']:.2f}"],
+    ])
+    top = tabla(['#', 'Franquicia', 'Establecimientos'],
+                 [[i, nombre, n] for i, (nombre, n) in enumerate(est['franquicias_top'], 1)])
+    return ratings + '<h3>Principales franquicias</h3>' + top
+
+
+def render_precios(est):
+    precios = est['precio_comparativa']
+    return tabla(['Precio', 'Franquicias (%)', 'Independientes (%)'], [
+        [c, f'{fr:.1f}', f'{ind:.1f}']
+        for c, fr, ind in zip(precios['categorias'], precios['franquicias'], precios['independientes'])
+    ])
+
+
+def render_precio_rating(est):
+    return tabla(['Precio', 'Rating promedio', 'Establecimientos'],
+                  [[f['precio'], f"{f['rating']:.2f}", f['n']] for f in est['rating_por_precio']])
+
+
+def tabla_lugares(lugares):
+    return tabla(['#', 'Nombre', 'Ciudad', 'Rating', 'Reseñas'],
+                  [[i, l['name'], l['city'], l['score'], l['ratings']] for i, l in enumerate(lugares, 1)])
+
+
+def render_mejores(est):
+    return tabla_lugares(est['top_hamburgueserias'])
+
+
+def render_emergentes(est):
+    ciudades = tabla(['Ciudad', 'Emergentes'], est['ciudades_emergentes'])
+    return tabla_lugares(est['emergentes']) + '<h3>Ciudades con más emergentes</h3>' + ciudades
+
+
+# (id, título, claves de las estadísticas que usa, render, gráfico PNG)
+SECCIONES = [
+    ('resumen', 'Estadísticas clave',
+     ['total_hamburgueserias', 'rating_promedio', 'ciudades_principales', 'franquicias_pct', 'independientes_pct'],
+     render_resumen, None),
+    ('top_ciudades', 'Ciudades con más hamburgueserías', ['top_ciudades'],
+     render_top_ciudades, 'top_ciudades.png'),
+    ('franquicias', 'Franquicias vs independientes',
+     ['total_franquicias', 'total_independientes', 'rating_franquicias', 'rating_independientes', 'franquicias_top'],
+     render_franquicias, 'franquicias_vs_independientes.png'),
+    ('precios', 'Distribución por precio', ['precio_comparativa'],
+     render_precios, 'distribucion_precio_comparativa.png'),
+    ('precio_rating', 'Relación precio-rating', ['rating_por_precio'],
+     render_precio_rating, 'rating_por_precio.png'),
+    ('mejores', 'Top 10 hamburgueserías mejor valoradas (mín. 50 reseñas)', ['top_hamburgueserias'],
+     render_mejores, None),
+    ('emergentes', 'Hamburgueserías emergentes (alto rating, 10-50 reseñas)', ['emergentes', 'ciudades_emergentes'],
+     render_emergentes, 'ciudades_tendencias_emergentes.png'),
+]
+
+
+def miniatura_base64(ruta_png):
+    """Miniatura PNG redimensionada, codificada como data URI."""
+    from PIL import Image
+
+    with Image.open(ruta_png) as img:
+        img.thumbnail(TAMANO_MINIATURA)
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG', optimize=True)
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def hash_seccion(claves, est, ruta_png):
+    h = hashlib.sha256()
+    h.update(str(VERSION_PLANTILLA).encode())
+    h.update(json.dumps({k: est[k] for k in claves}, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    if ruta_png:
+        with open(ruta_png, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def render_seccion(seccion_id, titulo, render, est, ruta_png):
+    partes = [f'<section id="{seccion_id}"><h2>{html.escape(titulo)}</h2>']
+    if ruta_png:
+        href = os.path.relpath(ruta_png, reports_dir).replace(os.sep, '/')
+        partes.append(
+            f'<a href="{html.escape(href)}"><img src="{miniatura_base64(ruta_png)}" '
+            f'alt="{html.escape(titulo)}"></a>'
+        )
+    partes.append(render(est))
+    partes.append('</section>')
+    return '\n'.join(partes)
+
+
+def seccion_html(seccion, est, csv_path):
+    """Fragmento HTML de la sección y si hubo que re-renderizarla."""
+    seccion_id, titulo, claves, render, nombre_png = seccion
+    ruta_png = asegurar_grafico(nombre_png, est, csv_path) if nombre_png else None
+
+    contenido_hash = hash_seccion(claves, est, ruta_png)
+    ruta_fragmento = os.path.join(secciones_cache_dir, f'{seccion_id}.html')
+    ruta_hash = ruta_fragmento + '.sha256'
+    if os.path.exists(ruta_fragmento) and os.path.exists(ruta_hash):
+        with open(ruta_hash, 'r', encoding='utf-8') as f:
+            if f.read().strip() == contenido_hash:
+                with open(ruta_fragmento, 'r', encoding='utf-8') as fragmento:
+                    return fragmento.read(), False
+
+    fragmento = render_seccion(seccion_id, titulo, render, est, ruta_png)
+    with open(ruta_fragmento, 'w', encoding='utf-8') as f:
+        f.write(fragmento)
+    with open(ruta_hash, 'w', encoding='utf-8') as f:
+        f.write(contenido_hash)
+    return fragmento, True
+
+
+ESTILO = """
+body { font-family: sans-serif; max-width: 1000px; margin: 2em auto; color: #222; }
+table { border-collapse: collapse; margin: 1em 0; }
+th, td { border: 1px solid #ccc; padding: 4px 10px; text-align: left; }
+th { background: #f2f2f2; }
+img { max-width: 100%; border: 1px solid #ddd; }
+section { margin-bottom: 2.5em; }
+"""
+
+
+def pagina(titulo, cuerpo):
+    """Documento HTML completo con el estilo del reporte; `cuerpo` ya es HTML."""
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(titulo)}</title>
+<style>{ESTILO}</style>
+</head>
+<body>
+{cuerpo}
+</body>
+</html>
+"""
+
+
+def construir_reporte(est, csv_path, ruta_salida=ruta_reporte):
+    """Ensambla el reporte HTML y devuelve su ruta."""
+    crear_directorios()
+    os.makedirs(secciones_cache_dir, exist_ok=True)
+
+    fragmentos = []
+    renderizadas = []
+    for seccion in SECCIONES:
+        fragmento, nuevo = seccion_html(seccion, est, csv_path)
+        fragmentos.append(fragmento)
+        if nuevo:
+            renderizadas.append(seccion[0])
+
+    indice = ''.join(f'<li><a href="#{s[0]}">{html.escape(s[1])}</a></li>' for s in SECCIONES)
+    documento = pagina('Mercado de hamburgueserías en España', f"""<h1>Mercado de hamburgueserías en España</h1>
+<p>Datos: {html.escape(os.path.basename(csv_path))} &middot; Generado: {datetime.now():%Y-%m-%d %H:%M}</p>
+<ul>{indice}</ul>
+{''.join(fragmentos)}""")
+    with open(ruta_salida, 'w', encoding='utf-8') as f:
+        f.write(documento)
+
+    print(f"Reporte guardado en {ruta_salida}")
+    print(f"Secciones re-renderizadas: {len(renderizadas)}/{len(SECCIONES)}"
+          + (f" ({', '.join(renderizadas)})" if renderizadas else ""))
+    return ruta_salida
@@ -0,0 +1,233 @@
+"""Análisis de sensibilidad de los umbrales del análisis.
+
+Las conclusiones dependen de dos parámetros fijados a mano:
+
+- una marca es franquicia si tiene al menos `k` locales (5 en el análisis);
+- un local independiente es emergente si tiene `score >= s` (4.8) y entre
+  10 y 50 reseñas; el análisis lista los 15 primeros (por score, reseñas y
+  nombre) y cuenta por ciudad solo esos.
+
+En lugar de repetir el análisis para cada combinación, se evalúa toda la
+rejilla (k, s) de una vez. Cada local se reduce a dos números: el tamaño de
+su cadena y su score. Con los locales ordenados por tamaño de cadena, la
+cuota de franquicias y los ratings medios para cada `k` salen de sumas
+acumuladas y `searchsorted`. Para los emergentes se construye un histograma
+(k, s, ciudad) y se acumula en los dos primeros ejes: la celda [k, s] cuenta
+los locales con cadena < k y score >= s de cada ciudad. Como los candidatos
+ordenados por score tienen los de score >= s al principio, los 15 primeros
+de cada (k, s) son un prefijo de los 15 primeros de cada k, y los conteos
+por ciudad con el corte salen de sus sumas acumuladas.
+"""
+import os
+
+from data_analisis_burger import TOP_EMERGENTES, UMBRAL_FRANQUICIA
+from project_paths import reports_dir, viz_dir
+
+UMBRAL_SCORE = 4.8
+RESENAS_MIN, RESENAS_MAX = 10, 50
+
+
+def rejilla_por_defecto(max_franquicia=100, pasos_score=100, score_desde=4.01):
+    """Umbrales de franquicia 1..max_franquicia y de score entre `score_desde` y 5.
+
+    Con los valores por defecto el score avanza de 0.01 en 0.01 e incluye 4.8.
+    """
+    import numpy as np
+
+    umbrales_franquicia = np.arange(1, max_franquicia + 1)
+    umbrales_score = np.round(np.linspace(score_desde, 5.0, pasos_score), 4)
+    return umbrales_franquicia, umbrales_score
+
+
+def _tamano_cadena(hamburger_df):
+    # Número de locales con el mismo nombre que cada local
+    return hamburger_df['name'].map(hamburger_df['name'].value_counts()).to_numpy()
+
+
+def barrido_franquicias(hamburger_df, umbrales_franquicia):
+    """Cuota de franquicias y ratings medios para cada umbral `k`.
+
+    Devuelve un dict de arrays alineados con `umbrales_franquicia`.
+    """
+    import numpy as np
+
+    cadena = _tamano_cadena(hamburger_df)
+    score = hamburger_df['score'].to_numpy(dtype=np.float64)
+    orden = np.argsort(cadena, kind='stable')
+    cadena, score = cadena[orden], score[orden]
+
+    valido = ~np.isnan(score)
+    # Sumas acumuladas con un 0 delante: acum[i] = suma de los i primeros locales
+    suma = np.concatenate(([0.0], np.cumsum(np.where(valido, score, 0.0))))
+    cuenta = np.concatenate(([0], np.cumsum(valido)))
+
+    # Los independientes (cadena < k) son el prefijo ordenado; las franquicias, el resto
+    corte = np.searchsorted(cadena, umbrales_franquicia, side='left')
+    total = len(cadena)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rating_independientes = suma[corte] / cuenta[corte]
+        rating_franquicias = (suma[-1] - suma[corte]) / (cuenta[-1] - cuenta[corte])
+    return {
+        'franquicias': total - corte,
+        'franquicias_pct': (total - corte) / total * 100 if total else np.zeros(len(corte)),
+        'rating_franquicias': rating_franquicias,
+        'rating_independientes': rating_independientes,
+        'brecha_rating': rating_franquicias - rating_independientes,
+    }
+
+
+def barrido_emergentes(hamburger_df, umbrales_franquicia, umbrales_score,
+                       resenas_min=RESENAS_MIN, resenas_max=RESENAS_MAX, limite=TOP_EMERGENTES):
+    """Emergentes para cada combinación (k, s).
+
+    Devuelve `(ciudades, totales, conteos)`: `totales[i, j]` = locales
+    emergentes con umbral de franquicia `umbrales_franquicia[i]` y de score
+    `umbrales_score[j]`, y `conteos[i, j, c]` = cuántos de los `limite`
+    primeros son de la ciudad `c` (el mismo corte y orden que
+    `calcular_estadisticas`).
+    """
+    import numpy as np
+
+    en_rango = (hamburger_df['ratings'].between(resenas_min, resenas_max) & hamburger_df['score'].notna()).to_numpy()
+    candidatos = hamburger_df[en_rango]
+    cadena = _tamano_cadena(hamburger_df)[en_rango]
+    # Orden del análisis: score y reseñas descendentes, nombre ascendente
+    orden = np.lexsort((candidatos['name'].fillna('').to_numpy(dtype=str),
+                        -candidatos['ratings'].to_numpy(dtype=np.float64),
+                        -candidatos['score'].to_numpy(dtype=np.float64)))
+    candidatos, cadena = candidatos.iloc[orden], cadena[orden]
+    score = candidatos['score'].to_numpy(dtype=np.float64)
+    ciudades, ciudad_idx = np.unique(candidatos['city'].fillna('').to_numpy(dtype=str), return_inverse=True)
+
+    umbrales_franquicia = np.asarray(umbrales_franquicia)
+    umbrales_score = np.asarray(umbrales_score)
+    # Primer umbral k en el que el local ya es independiente (cadena < k)
+    i_k = np.searchsorted(umbrales_franquicia, cadena, side='right')
+    # Último umbral s que el local supera (score >= s)
+    i_s = np.searchsorted(umbrales_score, score, side='right') - 1
+
+    nk, ns = len(umbrales_franquicia), len(umbrales_score)
+    hist = np.zeros((nk + 1, ns + 1, len(ciudades)), dtype=np.int32)
+    np.add.at(hist, (i_k, i_s + 1, ciudad_idx), 1)
+    # Acumulado en k hacia arriba (cadena < k) y en s hacia abajo (score >= s)
+    conteos = np.cumsum(hist, axis=0)[:nk]
+    conteos = np.cumsum(conteos[:, ::-1], axis=1)[:, ::-1][:, 1:]
+    totales = conteos.sum(axis=2)
+
+    # Posición de cada candidato entre los independientes de cada k (en el orden de arriba)
+    elegible = i_k[None, :] <= np.arange(nk)[:, None]
+    posicion = np.cumsum(elegible, axis=1) - 1
+    fila, candidato = np.nonzero(elegible & (posicion < limite))
+    primeros = np.zeros((nk, limite + 1, len(ciudades)), dtype=np.int32)
+    np.add.at(primeros, (fila, posicion[fila, candidato] + 1, ciudad_idx[candidato]), 1)
+    # primeros[i, t, c]: locales de la ciudad c entre los t primeros con umbral k
+    primeros = np.cumsum(primeros, axis=1)
+    conteos = primeros[np.arange(nk)[:, None], np.minimum(totales, limite)]
+    return ciudades, totales, conteos
+
+
+def tabla_sensibilidad(hamburger_df, umbrales_franquicia, umbrales_score, top=5,
+                       resenas_min=RESENAS_MIN, resenas_max=RESENAS_MAX):
+    """Una fila por combinación (k, s) con cuotas, brecha de rating y top ciudades emergentes.
+
+    `emergentes` es el total; las ciudades cuentan solo los `TOP_EMERGENTES`
+    primeros, como en el reporte.
+    """
+    import numpy as np
+    import pandas as pd
+
+    franquicias = barrido_franquicias(hamburger_df, umbrales_franquicia)
+    ciudades, totales, conteos = barrido_emergentes(hamburger_df, umbrales_franquicia, umbrales_score,
+                                                    resenas_min, resenas_max)
+    nk, ns = len(umbrales_franquicia), len(umbrales_score)
+
+    planos = conteos.reshape(nk * ns, len(ciudades))
+    top = min(top, len(ciudades))
+    # Orden por conteo descendente; a igual conteo, alfabético (np.unique ya ordena)
+    mejores = np.argsort(-planos, axis=1, kind='stable')[:, :top]
+    top_conteos = np.take_along_axis(planos, mejores, axis=1)
+    top_texto = [
+        '; '.join(f"{ciudades[c]}: {n}" for c, n in zip(fila_c, fila_n) if n)
+        for fila_c, fila_n in zip(mejores, top_conteos)
+    ]
+
+    tabla = pd.DataFrame({
+        'umbral_franquicia': np.repeat(umbrales_franquicia, ns),
+        'umbral_score': np.tile(umbrales_score, nk),
+        'emergentes': totales.ravel(),
+        f'top_ciudades_emergentes_{TOP_EMERGENTES}': top_texto,
+    })
+    for clave, valores in franquicias.items():
+        tabla[clave] = np.repeat(valores, ns)
+    return tabla[['umbral_franquicia', 'umbral_score', 'franquicias', 'franquicias_pct',
+                  'rating_franquicias', 'rating_independientes', 'brecha_rating',
+                  'emergentes', f'top_ciudades_emergentes_{TOP_EMERGENTES}']]
+
+
+def grafico_sensibilidad(tabla, directorio=viz_dir):
+    """Cuota de franquicias y brecha de rating por umbral, y mapa de emergentes."""
+    import numpy as np
+
+    from data_analisis_burger import _pyplot
+
+    plt = _pyplot()
+    umbrales_franquicia = np.unique(tabla['umbral_franquicia'])
+    umbrales_score = np.unique(tabla['umbral_score'])
+    por_k = tabla.drop_duplicates('umbral_franquicia')
+
+    fig, (ax1, ax3) = plt.subplots(1, 2, figsize=(16, 6))
+    ax1.plot(por_k['umbral_franquicia'], por_k['franquicias_pct'], color='#FF9999')
+    ax1.set_xlabel('Umbral de franquicia (locales mínimos)')
+    ax1.set_ylabel('Franquicias (%)', color='#CC5555')
+    ax1.axvline(UMBRAL_FRANQUICIA, color='gray', linestyle='--', alpha=0.7)
+    ax2 = ax1.twinx()
+    ax2.plot(por_k['umbral_franquicia'], por_k['brecha_rating'], color='#3366AA')
+    ax2.axhline(0, color='#3366AA', linewidth=0.5, alpha=0.5)
+    ax2.set_ylabel('Brecha de rating (franquicias - independientes)', color='#3366AA')
+    ax1.set_title('Franquicias según el umbral')
+
+    emergentes = tabla['emergentes'].to_numpy().reshape(len(umbrales_franquicia), len(umbrales_score))
+    imagen = ax3.imshow(emergentes.T, origin='lower', aspect='auto', cmap='YlOrRd',
+                        extent=[umbrales_franquicia[0] - 0.5, umbrales_franquicia[-1] + 0.5,
+                                umbrales_score[0], umbrales_score[-1]])
+    ax3.plot([UMBRAL_FRANQUICIA], [UMBRAL_SCORE], marker='x', color='black', markersize=10)
+    ax3.set_xlabel('Umbral de franquicia (locales mínimos)')
+    ax3.set_ylabel('Score mínimo para emergente')
+    ax3.set_title('Hamburgueserías emergentes por combinación')
+    fig.colorbar(imagen, ax=ax3, label='Emergentes')
+
+    fig.tight_layout()
+    ruta = os.path.join(directorio, 'sensibilidad_umbrales.png')
+    fig.savefig(ruta, dpi=150)
+    plt.close(fig)
+    return ruta
+
+
+def main(csv_path, max_franquicia=100, pasos_score=100, score_desde=4.01, top=5,
+         resenas_min=RESENAS_MIN, resenas_max=RESENAS_MAX, refrescar=False):
+    import time
+
+    import dataset_loader
+
+    hamburger_df = dataset_loader.cargar(csv_path, columnas=['name', 'city', 'score', 'ratings'], refrescar=refrescar)
+    umbrales_franquicia, umbrales_score = rejilla_por_defecto(max_franquicia, pasos_score, score_desde)
+
+    inicio = time.perf_counter()
+    tabla = tabla_sensibilidad(hamburger_df, umbrales_franquicia, umbrales_score, top,
+                               resenas_min, resenas_max)
+    duracion = time.perf_counter() - inicio
+    print(f"Rejilla de {len(umbrales_franquicia)}x{len(umbrales_score)} combinaciones evaluada en {duracion * 1000:.0f} ms")
+
+    ruta_tabla = os.path.join(reports_dir, 'sensibilidad_umbrales.csv')
+    tabla.to_csv(ruta_tabla, index=False, float_format='%.4f')
+    print(f"Tabla guardada en {ruta_tabla}")
+    print(f"Gráfico guardado en {grafico_sensibilidad(tabla)}")
+
+    print("\nCUOTA DE FRANQUICIAS Y BRECHA DE RATING SEGÚN EL UMBRAL:")
+    por_k = tabla.drop_duplicates('umbral_franquicia').set_index('umbral_franquicia')
+    for k in (2, 3, UMBRAL_FRANQUICIA, 10, 20, 50):
+        if k in por_k.index:
+            fila = por_k.loc[k]
+            print(f">= {k:>2} locales: {fila['franquicias_pct']:.1f}% franquicias, "
+                  f"brecha de rating {fila['brecha_rating']:+.3f}")
+    return tabla
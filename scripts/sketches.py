@@ -0,0 +1,570 @@
+"""Sketches aproximados y fusionables para estadísticas en streaming.
+
+Para paneles en vivo sobre un flujo continuo de registros scrapeados no se
+puede repetir `value_counts` sobre todo el histórico. Estos resúmenes ocupan
+memoria fija, se actualizan por lotes con NumPy, se serializan a bytes y se
+fusionan entre procesos o entre snapshots:
+
+- `CountMin`: frecuencia aproximada (cota superior) de cualquier clave.
+- `SpaceSaving`: top-k de claves frecuentes (ciudades, cadenas).
+- `HyperLogLog`: número de elementos distintos (ids de locales).
+- `KLL`: cuantiles de una variable numérica (`score`).
+
+Todas las claves se convierten a un hash de 64 bits con `pandas.util.hash_array`
+(SipHash con clave fija), así que dos procesos obtienen el mismo hash para la
+misma clave y sus sketches son compatibles.
+
+`ResumenStream` agrupa los sketches del análisis y `comparar_con_exacto`
+mide su error frente a los resultados exactos de `calcular_estadisticas`;
+`fuera_de_cota` lista los errores que superan las cotas de cada sketch
+(`burger_cli.py sketch --check` termina con código 1 si hay alguno; con
+`--merge-snapshots` la referencia exacta es la concatenación de los snapshots).
+"""
+import io
+import json
+import os
+
+from project_paths import cache_dir
+
+sketches_dir = os.path.join(cache_dir, 'sketches')
+
+
+def hash64(valores):
+    """Hash uint64 estable de cada valor (las claves se comparan como texto)."""
+    import numpy as np
+    import pandas as pd
+
+    return pd.util.hash_array(np.asarray(valores, dtype=object).astype(str).astype(object))
+
+
+def _a_bytes(meta, **arrays):
+    import numpy as np
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, _meta=np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8), **arrays)
+    return buffer.getvalue()
+
+
+def _desde_bytes(datos):
+    import numpy as np
+
+    with np.load(io.BytesIO(datos), allow_pickle=False) as npz:
+        arrays = {nombre: npz[nombre] for nombre in npz.files}
+    return json.loads(arrays.pop('_meta').tobytes().decode('utf-8')), arrays
+
+
+class CountMin:
+    """Count-Min sketch: `profundidad` filas de `anchura` contadores.
+
+    La estimación nunca es menor que la frecuencia real y la supera como
+    mucho en `e / anchura * total` con probabilidad `1 - exp(-profundidad)`.
+    """
+
+    def __init__(self, anchura=2048, profundidad=5):
+        import numpy as np
+
+        self.anchura, self.profundidad = anchura, profundidad
+        self.tabla = np.zeros((profundidad, anchura), dtype=np.int64)
+        self.total = 0
+
+    def _columnas(self, hashes):
+        # Doble hashing (Kirsch-Mitzenmacher): h1 + i*h2 con las dos mitades del hash
+        import numpy as np
+
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        filas = np.arange(self.profundidad, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + filas * h2[None, :]) % np.uint64(self.anchura)).astype(np.int64)
+
+    def actualizar(self, claves, pesos=None):
+        import numpy as np
+
+        hashes = hash64(claves)
+        pesos = np.ones(len(hashes), dtype=np.int64) if pesos is None else np.asarray(pesos, dtype=np.int64)
+        columnas = self._columnas(hashes)
+        for fila in range(self.profundidad):
+            np.add.at(self.tabla[fila], columnas[fila], pesos)
+        self.total += int(pesos.sum())
+
+    def estimar(self, claves):
+        """Frecuencia estimada de cada clave (array)."""
+        import numpy as np
+
+        columnas = self._columnas(hash64(claves))
+        return self.tabla[np.arange(self.profundidad)[:, None], columnas].min(axis=0)
+
+    def fusionar(self, otro):
+        if (self.anchura, self.profundidad) != (otro.anchura, otro.profundidad):
+            raise ValueError("Solo se pueden fusionar Count-Min de las mismas dimensiones")
+        self.tabla += otro.tabla
+        self.total += otro.total
+        return self
+
+    def serializar(self):
+        return _a_bytes({'tipo': 'CountMin', 'total': self.total}, tabla=self.tabla)
+
+    @classmethod
+    def deserializar(cls, datos):
+        meta, arrays = _desde_bytes(datos)
+        sketch = cls(arrays['tabla'].shape[1], arrays['tabla'].shape[0])
+        sketch.tabla, sketch.total = arrays['tabla'], meta['total']
+        return sketch
+
+
+class SpaceSaving:
+    """Top-k aproximado con `capacidad` contadores (algoritmo Space-Saving).
+
+    Cada contador guarda una cota superior de la frecuencia y el error
+    máximo (`cuenta - error` es una cota inferior). Toda clave con
+    frecuencia mayor que `total / capacidad` está entre los contadores.
+    Se actualiza con lotes ya contados y se fusiona sumando contadores.
+    """
+
+    def __init__(self, capacidad=200):
+        self.capacidad = capacidad
+        self.contadores = {}  # clave -> [cuenta, error]
+        self.total = 0
+
+    def _minimo(self):
+        if len(self.contadores) < self.capacidad:
+            return 0
+        return min(cuenta for cuenta, _ in self.contadores.values())
+
+    def _recortar(self):
+        if len(self.contadores) > self.capacidad:
+            orden = sorted(self.contadores.items(), key=lambda item: -item[1][0])
+            self.contadores = dict(orden[:self.capacidad])
+
+    def actualizar_conteos(self, conteos):
+        """Añade un lote ya agregado (`clave -> n`, p. ej. un `value_counts`)."""
+        for clave, n in conteos.items():
+            n = int(n)
+            self.total += n
+            actual = self.contadores.get(clave)
+            if actual is not None:
+                actual[0] += n
+            elif len(self.contadores) < self.capacidad:
+                self.contadores[clave] = [n, 0]
+            else:
+                # Sustituye al contador mínimo y hereda su cuenta como error
+                victima = min(self.contadores, key=lambda k: self.contadores[k][0])
+                minimo = self.contadores.pop(victima)[0]
+                self.contadores[clave] = [minimo + n, minimo]
+
+    def actualizar(self, claves):
+        import pandas as pd
+
+        self.actualizar_conteos(pd.Series(claves).value_counts())
+
+    def top(self, k=10):
+        """Lista de `(clave, cuenta, error)` de las k claves más frecuentes."""
+        orden = sorted(self.contadores.items(), key=lambda item: (-item[1][0], str(item[0])))
+        return [(clave, cuenta, error) for clave, (cuenta, error) in orden[:k]]
+
+    def fusionar(self, otro):
+        # Una clave ausente en un resumen lleno puede tener hasta su mínimo
+        minimo_a, minimo_b = self._minimo(), otro._minimo()
+        fusion = {}
+        for clave in set(self.contadores) | set(otro.contadores):
+            cuenta_a, error_a = self.contadores.get(clave, (minimo_a, minimo_a))
+            cuenta_b, error_b = otro.contadores.get(clave, (minimo_b, minimo_b))
+            fusion[clave] = [cuenta_a + cuenta_b, error_a + error_b]
+        self.contadores = fusion
+        self.total += otro.total
+        self._recortar()
+        return self
+
+    def serializar(self):
+        import numpy as np
+
+        claves = list(self.contadores)
+        valores = np.array([self.contadores[c] for c in claves], dtype=np.int64).reshape(-1, 2)
+        meta = {'tipo': 'SpaceSaving', 'capacidad': self.capacidad, 'total': self.total, 'claves': claves}
+        return _a_bytes(meta, valores=valores)
+
+    @classmethod
+    def deserializar(cls, datos):
+        meta, arrays = _desde_bytes(datos)
+        sketch = cls(meta['capacidad'])
+        sketch.contadores = {c: [int(v[0]), int(v[1])] for c, v in zip(meta['claves'], arrays['valores'])}
+        sketch.total = meta['total']
+        return sketch
+
+
+def _longitud_bits(valores):
+    # bit_length de cada uint64 sin pasar por float64 (que redondea por encima de 2^53)
+    import numpy as np
+
+    alto = (valores >> np.uint64(32)).astype(np.float64)
+    bajo = (valores & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(alto > 0, 32 + np.frexp(alto)[1], np.where(bajo > 0, np.frexp(bajo)[1], 0))
+
+
+class HyperLogLog:
+    """Cardinalidad aproximada con 2^precision registros (error típico 1.04/sqrt(m))."""
+
+    def __init__(self, precision=14):
+        import numpy as np
+
+        self.precision = precision
+        self.registros = np.zeros(1 << precision, dtype=np.uint8)
+
+    def actualizar(self, claves):
+        import numpy as np
+
+        hashes = hash64(claves)
+        p = np.uint64(self.precision)
+        indices = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        resto = hashes << p  # los 64 - p bits restantes, alineados a la izquierda
+        rango = (64 - _longitud_bits(resto) + 1).clip(max=64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registros, indices, rango)
+
+    def estimar(self):
+        import numpy as np
+
+        m = len(self.registros)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        bruto = alfa * m * m / np.sum(np.ldexp(1.0, -self.registros.astype(np.int64)))
+        vacios = int(np.count_nonzero(self.registros == 0))
+        if bruto <= 2.5 * m and vacios:
+            return m * np.log(m / vacios)  # conteo lineal para cardinalidades pequeñas
+        return float(bruto)
+
+    def fusionar(self, otro):
+        import numpy as np
+
+        if self.precision != otro.precision:
+            raise ValueError("Solo se pueden fusionar HyperLogLog de la misma precisión")
+        np.maximum(self.registros, otro.registros, out=self.registros)
+        return self
+
+    def serializar(self):
+        return _a_bytes({'tipo': 'HyperLogLog', 'precision': self.precision}, registros=self.registros)
+
+    @classmethod
+    def deserializar(cls, datos):
+        meta, arrays = _desde_bytes(datos)
+        sketch = cls(meta['precision'])
+        sketch.registros = arrays['registros']
+        return sketch
+
+
+class KLL:
+    """Cuantiles aproximados (sketch KLL) con compactadores de capacidad ~k.
+
+    El nivel h guarda valores de peso 2^h. Cuando un nivel se llena se
+    ordena y pasa al siguiente uno de cada dos valores (con desfase
+    aleatorio). El error de rango es del orden de 1/k.
+    """
+
+    def __init__(self, k=200, semilla=0):
+        import numpy as np
+
+        self.k = k
+        self.niveles = [np.empty(0)]
+        self.n = 0
+        self._rng = np.random.default_rng(semilla)
+
+    def _capacidad(self, nivel):
+        # Los niveles bajos (más recientes) son más pequeños: c = 2/3
+        altura = len(self.niveles) - 1 - nivel
+        return max(int(self.k * (2 / 3) ** altura), 2)
+
+    def _compactar(self):
+        import numpy as np
+
+        nivel = 0
+        while nivel < len(self.niveles):
+            if len(self.niveles[nivel]) > self._capacidad(nivel):
+                if nivel + 1 == len(self.niveles):
+                    self.niveles.append(np.empty(0))
+                valores = np.sort(self.niveles[nivel])
+                # Si el número es impar, el último valor se queda en el nivel
+                par = len(valores) - len(valores) % 2
+                promovidos = valores[self._rng.integers(2):par:2]
+                self.niveles[nivel] = valores[par:]
+                self.niveles[nivel + 1] = np.concatenate([self.niveles[nivel + 1], promovidos])
+            nivel += 1
+
+    def actualizar(self, valores):
+        import numpy as np
+
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        self.n += len(valores)
+        # Se entra por trozos para que ningún nivel crezca sin límite
+        for inicio in range(0, len(valores), self.k):
+            self.niveles[0] = np.concatenate([self.niveles[0], valores[inicio:inicio + self.k]])
+            self._compactar()
+
+    def fusionar(self, otro):
+        import numpy as np
+
+        while len(self.niveles) < len(otro.niveles):
+            self.niveles.append(np.empty(0))
+        for nivel, valores in enumerate(otro.niveles):
+            self.niveles[nivel] = np.concatenate([self.niveles[nivel], valores])
+        self.n += otro.n
+        self._compactar()
+        return self
+
+    def cuantiles(self, probabilidades):
+        """Valores aproximados de los cuantiles pedidos (entre 0 y 1)."""
+        import numpy as np
+
+        valores = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(v), 2.0 ** h) for h, v in enumerate(self.niveles)])
+        if not len(valores):
+            return np.full(len(probabilidades), np.nan)
+        orden = np.argsort(valores, kind='stable')
+        valores, acumulado = valores[orden], np.cumsum(pesos[orden])
+        posiciones = np.searchsorted(acumulado, np.asarray(probabilidades) * acumulado[-1], side='left')
+        return valores[np.minimum(posiciones, len(valores) - 1)]
+
+    def serializar(self):
+        niveles = {f'nivel_{h}': v for h, v in enumerate(self.niveles)}
+        return _a_bytes({'tipo': 'KLL', 'k': self.k, 'n': self.n, 'niveles': len(self.niveles)}, **niveles)
+
+    @classmethod
+    def deserializar(cls, datos):
+        meta, arrays = _desde_bytes(datos)
+        sketch = cls(meta['k'])
+        sketch.niveles = [arrays[f'nivel_{h}'] for h in range(meta['niveles'])]
+        sketch.n = meta['n']
+        return sketch
+
+
+class ResumenStream:
+    """Sketches del análisis: top ciudades y cadenas, locales distintos y cuantiles del score."""
+
+    _TIPOS = {'ciudades': SpaceSaving, 'ciudades_cm': CountMin, 'cadenas': SpaceSaving,
+              'ids': HyperLogLog, 'score': KLL}
+
+    def __init__(self):
+        self.ciudades = SpaceSaving()
+        self.ciudades_cm = CountMin()
+        self.cadenas = SpaceSaving()
+        self.ids = HyperLogLog()
+        self.score = KLL()
+
+    def actualizar(self, lote):
+        """Añade un lote de registros (DataFrame con city, name, id y score)."""
+        ciudades = lote['city'].dropna()
+        self.ciudades.actualizar_conteos(ciudades.value_counts())
+        self.ciudades_cm.actualizar(ciudades.to_numpy())
+        self.cadenas.actualizar_conteos(lote['name'].dropna().value_counts())
+        self.ids.actualizar(lote['id'].dropna().to_numpy())
+        self.score.actualizar(lote['score'].to_numpy())
+        return self
+
+    def fusionar(self, otro):
+        for nombre in self._TIPOS:
+            getattr(self, nombre).fusionar(getattr(otro, nombre))
+        return self
+
+    def serializar(self):
+        import numpy as np
+
+        partes = {nombre: np.frombuffer(getattr(self, nombre).serializar(), dtype=np.uint8) for nombre in self._TIPOS}
+        return _a_bytes({'tipo': 'ResumenStream'}, **partes)
+
+    @classmethod
+    def deserializar(cls, datos):
+        _, arrays = _desde_bytes(datos)
+        resumen = cls()
+        for nombre, tipo in cls._TIPOS.items():
+            setattr(resumen, nombre, tipo.deserializar(arrays[nombre].tobytes()))
+        return resumen
+
+    def guardar(self, ruta):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, 'wb') as f:
+            f.write(self.serializar())
+
+    @classmethod
+    def cargar(cls, ruta):
+        with open(ruta, 'rb') as f:
+            return cls.deserializar(f.read())
+
+
+def resumir(hamburger_df, trabajadores=4, filas_por_lote=1_000):
+    """Resume el DataFrame como si llegara en lotes repartidos entre trabajadores.
+
+    Cada trabajador tiene su propio `ResumenStream`; al final se serializan y
+    se fusionan, como se haría entre procesos o snapshots.
+    """
+    resumenes = [ResumenStream() for _ in range(trabajadores)]
+    for i, inicio in enumerate(range(0, len(hamburger_df), filas_por_lote)):
+        resumenes[i % trabajadores].actualizar(hamburger_df.iloc[inicio:inicio + filas_por_lote])
+    total = ResumenStream.deserializar(resumenes[0].serializar())
+    for resumen in resumenes[1:]:
+        total.fusionar(ResumenStream.deserializar(resumen.serializar()))
+    return total
+
+
+PROBABILIDADES = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+def comparar_con_exacto(hamburger_df, resumen, k=10):
+    """Errores de los sketches frente a pandas y `calcular_estadisticas`.
+
+    Devuelve un dict con, para ciudades y cadenas, la precisión del top-k
+    (contando empates) y el error relativo máximo de los conteos del top
+    exacto que el sketch garantiza seguir; el error relativo del número
+    de locales distintos; y el error de rango de cada cuantil del score.
+    """
+    import numpy as np
+
+    from data_analisis_burger import calcular_estadisticas
+
+    est = calcular_estadisticas(hamburger_df)
+
+    def top_k(sketch, exacto_completo):
+        # Precisión con empates: una clave del top aproximado acierta si su
+        # cuenta exacta llega a la k-ésima exacta
+        exacto = dict(exacto_completo[:k])
+        corte = exacto_completo[min(k, len(exacto_completo)) - 1][1] if exacto_completo else 0
+        todos = dict(exacto_completo)
+        aproximado = sketch.top(k)
+        aciertos = sum(todos.get(clave, 0) >= corte for clave, _, _ in aproximado)
+        # Solo las claves que Space-Saving garantiza seguir (frecuencia > total / capacidad)
+        umbral = sketch.total / sketch.capacidad
+        errores = [(abs(sketch.contadores.get(c, [0])[0] - n), n) for c, n in exacto.items() if n > umbral]
+        return {'precision': aciertos / len(aproximado) if aproximado else 1.0,
+                'error_max': max((e / n for e, n in errores), default=0.0),
+                'error_abs_max': max((e for e, _ in errores), default=0),
+                'cota_abs': umbral}
+
+    # Cadenas: el top de nombres de todos los locales (franquicias_top solo cubre franquicias)
+    cadenas_exactas = [[n, int(c)] for n, c in hamburger_df['name'].value_counts().items()]
+    ciudades_exactas = est['top_ciudades'] if k <= len(est['top_ciudades']) else \
+        [[c, int(n)] for c, n in hamburger_df['city'].value_counts().items()]
+    cm = resumen.ciudades_cm.estimar([c for c, _ in ciudades_exactas[:k]])
+    # Ids y no filas: al concatenar snapshots el mismo local aparece varias veces
+    distintos = int(hamburger_df['id'].nunique())
+
+    scores = np.sort(hamburger_df['score'].dropna().to_numpy())
+    aproximados = resumen.score.cuantiles(PROBABILIDADES)
+    # Error de rango: distancia entre el rango pedido y el intervalo de rangos del valor devuelto
+    bajo = np.searchsorted(scores, aproximados, side='left') / len(scores)
+    alto = np.searchsorted(scores, aproximados, side='right') / len(scores)
+    probs = np.asarray(PROBABILIDADES)
+    error_rango = np.maximum(0, np.maximum(bajo - probs, probs - alto))
+
+    return {
+        'ciudades': top_k(resumen.ciudades, ciudades_exactas),
+        'ciudades_countmin_error_max': float(max(
+            (e - n) / n for e, (_, n) in zip(cm, ciudades_exactas[:k]))) if len(cm) else 0.0,
+        'ciudades_countmin_exceso_max': float(max(
+            (e - n for e, (_, n) in zip(cm, ciudades_exactas[:k])), default=0)),
+        'cadenas': top_k(resumen.cadenas, cadenas_exactas),
+        'distintos': {'exacto': distintos, 'estimado': resumen.ids.estimar(),
+                      'error': abs(resumen.ids.estimar() - distintos) / max(distintos, 1)},
+        'cuantiles': {str(p): {'exacto': float(np.quantile(scores, p)), 'estimado': float(a), 'error_rango': float(e)}
+                      for p, a, e in zip(PROBABILIDADES, aproximados, error_rango)},
+    }
+
+
+# Cotas de `fuera_de_cota`. Space-Saving y Count-Min tienen cotas absolutas
+# deterministas (total / capacidad) o con probabilidad 1 - exp(-profundidad)
+# por clave (e / anchura * total); la precisión del top-k no está garantizada
+# cuando hay claves casi empatadas en el corte, de ahí el margen.
+PRECISION_TOP_MINIMA = 0.9
+SIGMAS_HLL = 3  # error relativo de HyperLogLog <= 3 * 1.04 / sqrt(m)
+ERROR_RANGO_KLL = 3.0  # error de rango de KLL <= 3 / k
+
+
+def fuera_de_cota(resultado, resumen):
+    """Lista de errores que superan su cota (vacía si todo está dentro)."""
+    import math
+
+    fallos = []
+    for nombre in ('ciudades', 'cadenas'):
+        r = resultado[nombre]
+        if r['precision'] < PRECISION_TOP_MINIMA:
+            fallos.append(f"precisión del top {nombre} {r['precision']:.2f} < {PRECISION_TOP_MINIMA}")
+        if r['error_abs_max'] > r['cota_abs']:
+            fallos.append(f"error de conteo del top {nombre} {r['error_abs_max']} > {r['cota_abs']:.1f}")
+    cm = resumen.ciudades_cm
+    cota_cm = math.e / cm.anchura * cm.total
+    if resultado['ciudades_countmin_exceso_max'] > cota_cm:
+        fallos.append(f"sobreestimación de Count-Min {resultado['ciudades_countmin_exceso_max']:.0f} > {cota_cm:.1f}")
+    cota_hll = SIGMAS_HLL * 1.04 / math.sqrt(len(resumen.ids.registros))
+    if resultado['distintos']['error'] > cota_hll:
+        fallos.append(f"error de HyperLogLog {resultado['distintos']['error']:.4f} > {cota_hll:.4f}")
+    cota_kll = ERROR_RANGO_KLL / resumen.score.k
+    for p, q in resultado['cuantiles'].items():
+        if q['error_rango'] > cota_kll:
+            fallos.append(f"error de rango de KLL en p{float(p) * 100:g} {q['error_rango']:.4f} > {cota_kll:.4f}")
+    return fallos
+
+
+def imprimir_comparacion(resultado):
+    print("\nPRECISIÓN DE LOS SKETCHES FRENTE A PANDAS:")
+    for nombre in ('ciudades', 'cadenas'):
+        r = resultado[nombre]
+        print(f"Top {nombre}: precisión {r['precision'] * 100:.0f}%, error máximo de conteo {r['error_max'] * 100:.2f}%")
+    print(f"Count-Min (ciudades del top): sobreestimación máxima {resultado['ciudades_countmin_error_max'] * 100:.2f}%")
+    d = resultado['distintos']
+    print(f"Locales distintos: {d['estimado']:.0f} estimados / {d['exacto']} exactos ({d['error'] * 100:.2f}% de error)")
+    for p, q in resultado['cuantiles'].items():
+        print(f"Score p{float(p) * 100:g}: {q['estimado']:.2f} (exacto {q['exacto']:.2f}, error de rango {q['error_rango']:.3f})")
+
+
+def main(csv_path, comprobar=False, fusionar_snapshots=False, top=10, refrescar=False):
+    import analysis_cache
+    import dataset_loader
+    from project_paths import csv_mas_reciente, snapshots_disponibles
+
+    csv_path = csv_path or csv_mas_reciente()
+    if fusionar_snapshots:
+        # Un resumen por snapshot, guardado en disco y fusionado sin releer los CSV.
+        # Con --check sí se leen todos: la referencia exacta es su concatenación
+        import data_analisis_burger
+        import pandas as pd
+
+        def limpio(ruta_csv):
+            # Sin pasar por la caché de datos limpios, que es de un solo CSV
+            return data_analisis_burger.limpiar_datos(data_analisis_burger.cargar_datos(ruta_csv))
+
+        resumen = ResumenStream()
+        leidos = []
+        for ruta_csv in snapshots_disponibles() or [csv_path]:
+            ruta = os.path.join(sketches_dir, os.path.basename(ruta_csv) + '.sketch')
+            datos = limpio(ruta_csv) if comprobar else None
+            if refrescar or not analysis_cache.cache_valido(ruta, ruta_csv):
+                if datos is None:
+                    datos = limpio(ruta_csv)
+                ResumenStream().actualizar(datos).guardar(ruta)
+                analysis_cache.marcar_cache(ruta, ruta_csv)
+            resumen.fusionar(ResumenStream.cargar(ruta))
+            if comprobar:
+                leidos.append(datos)
+        hamburger_df = pd.concat(leidos, ignore_index=True) if comprobar else None
+    else:
+        hamburger_df = dataset_loader.cargar(csv_path, refrescar=refrescar)
+        resumen = resumir(hamburger_df)
+        ruta = os.path.join(sketches_dir, os.path.basename(csv_path) + '.sketch')
+        resumen.guardar(ruta)
+        analysis_cache.marcar_cache(ruta, csv_path)
+
+    print(f"\nTOP {top} CIUDADES (Space-Saving, cuenta ± error):")
+    for i, (ciudad, cuenta, error) in enumerate(resumen.ciudades.top(top), 1):
+        print(f"{i}. {ciudad}: {cuenta} (±{error})")
+    print(f"\nTOP {top} CADENAS:")
+    for i, (nombre, cuenta, error) in enumerate(resumen.cadenas.top(top), 1):
+        print(f"{i}. {nombre}: {cuenta} (±{error})")
+    print(f"\nLocales distintos (HyperLogLog): {resumen.ids.estimar():.0f}")
+    cuantiles = resumen.score.cuantiles(PROBABILIDADES)
+    print("Cuantiles del score (KLL): " + ', '.join(f"p{p * 100:g}={q:.2f}" for p, q in zip(PROBABILIDADES, cuantiles)))
+
+    if comprobar:
+        resultado = comparar_con_exacto(hamburger_df, resumen, top)
+        imprimir_comparacion(resultado)
+        fallos = fuera_de_cota(resultado, resumen)
+        for fallo in fallos:
+            print(f"FUERA DE COTA: {fallo}")
+        if not fallos:
+            print("Todos los errores dentro de sus cotas")
+        return resumen, not fallos
+    return resumen, True
@@ -0,0 +1,292 @@
+"""Series temporales de reseñas y rating a partir de los snapshots del scrapeo.
+
+Los snapshots `data/BurgersSpain_YYYYMMDD_HHMM.csv` se alinean por `id` en un
+panel compacto de arrays NumPy (lugares x snapshots). Sobre el panel se
+calculan, de forma vectorizada, deltas, crecimiento y pendientes móviles
+(mínimos cuadrados en una ventana de snapshots), y con ello un ranking de
+tendencias por ciudad: qué sitios ganan reseñas más rápido y cuáles tienen
+un rating que se está moviendo.
+
+El panel se guarda en `output/cache/panel_snapshots.npz`. Al llegar un snapshot
+nuevo solo se añade su columna; el resto del panel no se vuelve a leer.
+"""
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+
+from project_paths import cache_dir, reports_dir, snapshots_disponibles
+
+ruta_panel = os.path.join(cache_dir, 'panel_snapshots.npz')
+ruta_tendencias = os.path.join(cache_dir, 'tendencias.parquet')
+
+_patron_fecha = re.compile(r'(\d{8})_(\d{4})')
+
+
+def fecha_snapshot(ruta):
+    """Fecha del snapshot a partir del nombre `BurgersSpain_YYYYMMDD_HHMM.csv`."""
+    m = _patron_fecha.search(os.path.basename(ruta))
+    if m:
+        return datetime.strptime(m.group(1) + m.group(2), '%Y%m%d%H%M')
+    return datetime.fromtimestamp(os.path.getmtime(ruta))
+
+
+class PanelSnapshots:
+    """Panel lugares x snapshots respaldado por arrays NumPy con capacidad de reserva.
+
+    Las filas y columnas crecen duplicando la capacidad, así que añadir un
+    snapshot escribe una columna en el array existente sin copiar el panel
+    (salvo cuando hay que ampliar la reserva).
+    """
+
+    def __init__(self, capacidad_lugares=1024, capacidad_snapshots=8):
+        self.n_lugares = 0
+        self.n_snapshots = 0
+        self.snapshots = []
+        self.tiempos = np.zeros(capacidad_snapshots, dtype=np.float64)  # días desde el 1er snapshot
+        self.ids = np.empty(capacidad_lugares, dtype=object)
+        self.nombres = np.empty(capacidad_lugares, dtype=object)
+        self.ciudades = np.empty(capacidad_lugares, dtype=object)
+        self.ratings = np.full((capacidad_lugares, capacidad_snapshots), np.nan, dtype=np.float32)
+        self.score = np.full((capacidad_lugares, capacidad_snapshots), np.nan, dtype=np.float32)
+        self._inicio = None
+
+    def _ampliar(self, lugares, snapshots):
+        cap_l, cap_s = self.ratings.shape
+        nuevo_l = max(cap_l, lugares)
+        nuevo_s = max(cap_s, snapshots)
+        if nuevo_l > cap_l:
+            nuevo_l = max(nuevo_l, cap_l * 2)
+            for attr in ('ids', 'nombres', 'ciudades'):
+                arr = np.empty(nuevo_l, dtype=object)
+                arr[:cap_l] = getattr(self, attr)
+                setattr(self, attr, arr)
+        if nuevo_s > cap_s:
+            nuevo_s = max(nuevo_s, cap_s * 2)
+            tiempos = np.zeros(nuevo_s, dtype=np.float64)
+            tiempos[:cap_s] = self.tiempos
+            self.tiempos = tiempos
+        if (nuevo_l, nuevo_s) != (cap_l, cap_s):
+            for attr in ('ratings', 'score'):
+                arr = np.full((nuevo_l, nuevo_s), np.nan, dtype=np.float32)
+                arr[:cap_l, :cap_s] = getattr(self, attr)
+                setattr(self, attr, arr)
+
+    def anadir_snapshot(self, nombre, fecha, hamburger_df):
+        """Añade la columna de un snapshot ya limpio (ver `limpiar_datos`)."""
+        import pandas as pd
+
+        if self._inicio is None:
+            self._inicio = fecha
+        ids = hamburger_df['id'].to_numpy(dtype=object)
+
+        # Búsqueda vectorizada de la fila de cada id; los ids nuevos van al final
+        filas = pd.Index(self.ids[:self.n_lugares]).get_indexer(ids)
+        nuevos = filas < 0
+        n_nuevos = int(nuevos.sum())
+        self._ampliar(self.n_lugares + n_nuevos, self.n_snapshots + 1)
+        filas[nuevos] = np.arange(self.n_lugares, self.n_lugares + n_nuevos)
+        self.ids[filas[nuevos]] = ids[nuevos]
+        self.n_lugares += n_nuevos
+
+        col = self.n_snapshots
+        self.ratings[filas, col] = hamburger_df['ratings'].to_numpy(dtype=np.float32)
+        self.score[filas, col] = hamburger_df['score'].to_numpy(dtype=np.float32)
+        # Nombre y ciudad: nos quedamos con los del snapshot más reciente
+        self.nombres[filas] = hamburger_df['name'].to_numpy(dtype=object)
+        self.ciudades[filas] = hamburger_df['city'].to_numpy(dtype=object)
+        self.tiempos[col] = (fecha - self._inicio).total_seconds() / 86400
+        self.snapshots.append(nombre)
+        self.n_snapshots += 1
+
+    # Vistas sobre la parte ocupada de los arrays
+    def matriz(self, attr):
+        return getattr(self, attr)[:self.n_lugares, :self.n_snapshots]
+
+    def guardar(self, ruta=ruta_panel):
+        n = self.n_lugares
+        np.savez(
+            ruta,
+            snapshots=np.array(self.snapshots, dtype=str),
+            inicio=np.array(self._inicio.isoformat() if self._inicio else '', dtype=str),
+            tiempos=self.tiempos[:self.n_snapshots],
+            ids=self.ids[:n].astype(str),
+            nombres=self.nombres[:n].astype(str),
+            ciudades=self.ciudades[:n].astype(str),
+            ratings=self.matriz('ratings'),
+            score=self.matriz('score'),
+        )
+
+    @classmethod
+    def cargar(cls, ruta=ruta_panel):
+        with np.load(ruta, allow_pickle=False) as datos:
+            ratings = datos['ratings']
+            panel = cls(max(ratings.shape[0], 1), max(ratings.shape[1], 1))
+            panel.n_lugares, panel.n_snapshots = ratings.shape
+            panel.ratings[:, :] = ratings
+            panel.score[:, :] = datos['score']
+            panel.tiempos[:panel.n_snapshots] = datos['tiempos']
+            panel.ids[:panel.n_lugares] = datos['ids'].astype(object)
+            panel.nombres[:panel.n_lugares] = datos['nombres'].astype(object)
+            panel.ciudades[:panel.n_lugares] = datos['ciudades'].astype(object)
+            panel.snapshots = [str(s) for s in datos['snapshots']]
+            inicio = str(datos['inicio'])
+            panel._inicio = datetime.fromisoformat(inicio) if inicio else None
+        return panel
+
+
+def actualizar_panel(rutas=None, reconstruir=False):
+    """Carga el panel guardado y añade solo los snapshots que falten."""
+    import data_analisis_burger
+
+    rutas = sorted(rutas if rutas is not None else snapshots_disponibles(), key=fecha_snapshot)
+    nombres = [os.path.basename(r) for r in rutas]
+
+    panel = None
+    if not reconstruir and os.path.exists(ruta_panel):
+        panel = PanelSnapshots.cargar()
+        # Solo se puede ampliar si los snapshots guardados son un prefijo de los actuales
+        if panel.snapshots != nombres[:panel.n_snapshots]:
+            panel = None
+    if panel is None:
+        panel = PanelSnapshots()
+
+    pendientes = rutas[panel.n_snapshots:]
+    for ruta in pendientes:
+        df = data_analisis_burger.limpiar_datos(data_analisis_burger.cargar_datos(ruta))
+        panel.anadir_snapshot(os.path.basename(ruta), fecha_snapshot(ruta), df)
+    if pendientes:
+        os.makedirs(cache_dir, exist_ok=True)
+        panel.guardar()
+    print(f"Panel: {panel.n_lugares} lugares x {panel.n_snapshots} snapshots "
+          f"({len(pendientes)} snapshot(s) nuevos)")
+    return panel
+
+
+def pendiente_movil(valores, tiempos, ventana):
+    """Pendiente por mínimos cuadrados en una ventana móvil de snapshots.
+
+    `valores` es (lugares x snapshots) con NaN donde un lugar no aparece. Se usan
+    sumas acumuladas sobre el eje temporal, así que el coste es lineal en el
+    tamaño del panel sea cual sea la ventana. Devuelve un array del mismo tamaño
+    con la pendiente de la ventana que termina en cada snapshot (NaN si hay
+    menos de dos observaciones).
+    """
+    if ventana < 2:
+        raise ValueError(f"La ventana debe abarcar al menos 2 snapshots para estimar una pendiente (se dio {ventana})")
+    mascara = ~np.isnan(valores)
+    y = np.where(mascara, valores, 0.0).astype(np.float64)
+    t = np.broadcast_to(tiempos, valores.shape)
+    t = np.where(mascara, t, 0.0)
+
+    def suma_ventana(x):
+        acumulada = np.cumsum(x, axis=1)
+        desplazada = np.zeros_like(acumulada)
+        desplazada[:, ventana:] = acumulada[:, :-ventana]
+        return acumulada - desplazada
+
+    n = suma_ventana(mascara.astype(np.float64))
+    st = suma_ventana(t)
+    sy = suma_ventana(y)
+    stt = suma_ventana(t * t)
+    sty = suma_ventana(t * y)
+
+    denominador = n * stt - st * st
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pendiente = (n * sty - st * sy) / denominador
+    pendiente[(n < 2) | (denominador <= 0)] = np.nan
+    return pendiente
+
+
+def calcular_tendencias(panel, ventana=4):
+    """Métricas de tendencia por lugar en el último snapshot."""
+    import pandas as pd
+
+    ratings = panel.matriz('ratings')
+    score = panel.matriz('score')
+    tiempos = panel.tiempos[:panel.n_snapshots]
+
+    # Primera y última observación de cada lugar (vectorizado con argmax sobre la máscara)
+    observado = ~np.isnan(ratings)
+    n_obs = observado.sum(axis=1)
+    primera = observado.argmax(axis=1)
+    ultima = ratings.shape[1] - 1 - observado[:, ::-1].argmax(axis=1)
+    filas = np.arange(ratings.shape[0])
+
+    ratings_ini = ratings[filas, primera]
+    ratings_fin = ratings[filas, ultima]
+    dias = tiempos[ultima] - tiempos[primera]
+
+    # Delta respecto al snapshot anterior (solo si el lugar aparece en los dos)
+    delta = np.full(ratings.shape[0], np.nan, dtype=np.float32)
+    if ratings.shape[1] >= 2:
+        delta = ratings[:, -1] - ratings[:, -2]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        crecimiento = (ratings_fin - ratings_ini) / np.maximum(ratings_ini, 1) * 100
+        velocidad_total = np.where(dias > 0, (ratings_fin - ratings_ini) / dias, np.nan)
+
+    velocidad = pendiente_movil(ratings, tiempos, ventana)[:, -1]  # reseñas/día
+    deriva = pendiente_movil(score, tiempos, ventana)[:, -1] * 30  # estrellas/30 días
+
+    return pd.DataFrame({
+        'id': panel.ids[:panel.n_lugares],
+        'name': panel.nombres[:panel.n_lugares],
+        'city': panel.ciudades[:panel.n_lugares],
+        'snapshots_observados': n_obs,
+        'ratings': ratings_fin,
+        'score': score[filas, ultima],
+        'delta_ratings': delta,
+        'crecimiento_pct': crecimiento,
+        'resenas_dia_total': velocidad_total,
+        'resenas_dia': velocidad,
+        'deriva_score_30d': deriva,
+    })
+
+
+def rankings_por_ciudad(tendencias, top=10, min_lugares=3):
+    """Top de lugares por velocidad de reseñas y por deriva del rating en cada ciudad."""
+    con_datos = tendencias.dropna(subset=['resenas_dia'])
+    tamano = con_datos.groupby('city')['id'].transform('size')
+    con_datos = con_datos[tamano >= min_lugares]
+
+    velocidad = (con_datos.sort_values(['city', 'resenas_dia'], ascending=[True, False])
+                 .groupby('city').head(top))
+    con_deriva = con_datos.dropna(subset=['deriva_score_30d']).assign(
+        deriva_abs=lambda d: d['deriva_score_30d'].abs())
+    deriva = (con_deriva.sort_values(['city', 'deriva_abs'], ascending=[True, False])
+              .groupby('city').head(top).drop(columns='deriva_abs'))
+    return velocidad, deriva
+
+
+def main(ventana=4, top=10, reconstruir=False):
+    panel = actualizar_panel(reconstruir=reconstruir)
+    if panel.n_snapshots < 2:
+        print("Hacen falta al menos dos snapshots BurgersSpain_*.csv en data/ para calcular tendencias.")
+        return None
+
+    tendencias = calcular_tendencias(panel, ventana)
+    tendencias.to_parquet(ruta_tendencias, index=False)  # consultable con `burger_cli.py query`
+
+    velocidad, deriva = rankings_por_ciudad(tendencias, top)
+    os.makedirs(reports_dir, exist_ok=True)
+    velocidad.to_csv(os.path.join(reports_dir, 'tendencias_velocidad_por_ciudad.csv'), index=False)
+    deriva.to_csv(os.path.join(reports_dir, 'tendencias_deriva_rating_por_ciudad.csv'), index=False)
+
+    print("\nLUGARES QUE GANAN RESEÑAS MÁS RÁPIDO (reseñas/día, ventana de "
+          f"{ventana} snapshots):")
+    for _, row in velocidad.sort_values('resenas_dia', ascending=False).head(15).iterrows():
+        print(f"- {row['name']} ({row['city']}): {row['resenas_dia']:.2f} reseñas/día, "
+              f"{row['ratings']:.0f} reseñas, {row['score']:.2f} estrellas")
+
+    print("\nRATINGS CON MAYOR DERIVA (estrellas cada 30 días):")
+    for _, row in deriva.reindex(deriva['deriva_score_30d'].abs().sort_values(ascending=False).index).head(15).iterrows():
+        print(f"- {row['name']} ({row['city']}): {row['deriva_score_30d']:+.3f}, ahora {row['score']:.2f} estrellas")
+
+    print(f"\nRankings por ciudad guardados en {reports_dir}")
+    return tendencias
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""Modo vigilancia: reconstruye lo que haga falta cuando llegan datos nuevos.
+
+Vigila `data/` y, cuando aparece o cambia un snapshot `BurgersSpain_*.csv`,
+comprueba qué salidas están obsoletas respecto al snapshot más reciente
+(datos limpios, estadísticas, gráficos, mapas y reporte) y regenera solo
+esas, en un hilo de fondo.
+
+- Notificaciones: se usa `watchdog` si está instalado (inotify, FSEvents...);
+  si no, se sondea el directorio cada pocos segundos comparando tamaño y
+  fecha de modificación. En ambos casos el proceso duerme entre cambios.
+- Antirrebote: una ráfaga de escrituras (un CSV que se copia por partes,
+  varios ficheros a la vez) dispara una sola reconstrucción, cuando el
+  directorio lleva `espera` segundos sin cambios.
+"""
+import os
+import threading
+import time
+
+from analysis_cache import cache_valido, marcar_cache, ruta_datos_limpios, ruta_estadisticas
+from project_paths import csv_mas_reciente, data_dir, maps_dir
+
+ESPERA_POR_DEFECTO = 2.0  # segundos sin cambios antes de reconstruir
+INTERVALO_SONDEO = 5.0  # segundos entre sondeos sin watchdog
+
+ruta_mapa_calor = os.path.join(maps_dir, 'mapa_calor_hamburgueserias.html')
+
+
+def _es_snapshot(ruta):
+    nombre = os.path.basename(ruta)
+    return nombre.startswith('BurgersSpain_') and nombre.endswith('.csv')
+
+
+def etapas_obsoletas(csv_path):
+    """Nombres de las etapas cuyas salidas no corresponden a `csv_path`."""
+    import report_builder
+    from data_analisis_burger import _generadores
+    from project_paths import viz_dir
+
+    obsoletas = []
+    if not cache_valido(ruta_datos_limpios, csv_path):
+        obsoletas.append('datos')
+    if not cache_valido(ruta_estadisticas, csv_path):
+        obsoletas.append('estadisticas')
+    if not all(cache_valido(os.path.join(viz_dir, nombre), csv_path) for nombre in _generadores()):
+        obsoletas.append('graficos')
+    # Los dos mapas se generan juntos; la marca de la etapa es la del de calor, que
+    # siempre se escribe (el de mejores no, si ningún local pasa el filtro)
+    if not cache_valido(ruta_mapa_calor, csv_path):
+        obsoletas.append('mapas')
+    if not cache_valido(report_builder.ruta_reporte, csv_path):
+        obsoletas.append('reporte')
+    return obsoletas
+
+
+def reconstruir(csv_path):
+    """Regenera solo las salidas obsoletas; devuelve las etapas ejecutadas."""
+    import analysis_cache
+
+    obsoletas = etapas_obsoletas(csv_path)
+    if not obsoletas:
+        return obsoletas
+
+    # Los gráficos y el reporte salen de las estadísticas, que a su vez
+    # reutilizan los datos limpios si están al día
+    est = analysis_cache.obtener_estadisticas(csv_path)
+    if 'graficos' in obsoletas:
+        import data_analisis_burger
+        data_analisis_burger.generar_graficos(est, csv_path)
+    if 'mapas' in obsoletas:
+        import geo_analysis
+        hamburger_df = analysis_cache.datos_limpios(csv_path)
+        for ruta in (geo_analysis.mapa_calor(hamburger_df), geo_analysis.mapa_mejores(hamburger_df)):
+            if ruta:
+                marcar_cache(ruta, csv_path)
+    if 'reporte' in obsoletas:
+        import report_builder
+        report_builder.construir_reporte(est, csv_path)
+        marcar_cache(report_builder.ruta_reporte, csv_path)
+    return obsoletas
+
+
+class Reconstructor:
+    """Hilo de fondo que reconstruye cuando el directorio se queda quieto.
+
+    `aviso()` se llama en cada evento del sistema de ficheros; el hilo espera
+    a que pasen `espera` segundos sin avisos y entonces reconstruye. Si llegan
+    avisos durante una reconstrucción, se repite al terminar.
+    """
+
+    def __init__(self, espera=ESPERA_POR_DEFECTO, csv_fijo=None):
+        self.espera = espera
+        self.csv_fijo = csv_fijo
+        self._condicion = threading.Condition()
+        self._ultimo_aviso = None
+        self._parar = False
+        self._hilo = threading.Thread(target=self._bucle, name='reconstructor', daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def aviso(self):
+        with self._condicion:
+            self._ultimo_aviso = time.monotonic()
+            self._condicion.notify()
+
+    def parar(self):
+        with self._condicion:
+            self._parar = True
+            self._condicion.notify()
+        self._hilo.join()
+
+    def _esperar_calma(self):
+        # Devuelve False si hay que parar; sin avisos pendientes duerme sin límite
+        with self._condicion:
+            while not self._parar:
+                if self._ultimo_aviso is None:
+                    self._condicion.wait()
+                    continue
+                restante = self._ultimo_aviso + self.espera - time.monotonic()
+                if restante <= 0:
+                    self._ultimo_aviso = None
+                    return True
+                self._condicion.wait(restante)
+            return False
+
+    def _bucle(self):
+        while self._esperar_calma():
+            csv_path = self.csv_fijo or csv_mas_reciente()
+            if not os.path.exists(csv_path):
+                continue
+            inicio = time.perf_counter()
+            try:
+                etapas = reconstruir(csv_path)
+            except Exception as e:  # un CSV a medio escribir no debe tumbar el vigilante
+                print(f"Error al reconstruir con {os.path.basename(csv_path)}: {e}")
+                continue
+            if etapas:
+                print(f"[{time.strftime('%H:%M:%S')}] {os.path.basename(csv_path)}: "
+                      f"{', '.join(etapas)} regenerados en {time.perf_counter() - inicio:.1f}s")
+
+
+def _firmas_directorio(directorio):
+    firmas = {}
+    with os.scandir(directorio) as entradas:
+        for entrada in entradas:
+            if entrada.is_file() and _es_snapshot(entrada.name):
+                stat = entrada.stat()
+                firmas[entrada.name] = (stat.st_size, stat.st_mtime_ns)
+    return firmas
+
+
+def _vigilar_sondeo(directorio, reconstructor, intervalo, parada):
+    anteriores = _firmas_directorio(directorio)
+    while not parada.wait(intervalo):
+        actuales = _firmas_directorio(directorio)
+        if actuales != anteriores:
+            anteriores = actuales
+            reconstructor.aviso()
+
+
+def _vigilar_watchdog(directorio, reconstructor, parada):
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+
+    class _Manejador(FileSystemEventHandler):
+        def on_any_event(self, event):
+            rutas = [event.src_path, getattr(event, 'dest_path', '')]
+            if not event.is_directory and any(_es_snapshot(r) for r in rutas if r):
+                reconstructor.aviso()
+
+    observador = Observer()
+    observador.schedule(_Manejador(), directorio, recursive=False)
+    observador.start()
+    try:
+        parada.wait()
+    finally:
+        observador.stop()
+        observador.join()
+
+
+def vigilar(directorio=data_dir, espera=ESPERA_POR_DEFECTO, sondeo=False,
+            intervalo=INTERVALO_SONDEO, csv_fijo=None, parada=None):
+    """Vigila `directorio` hasta Ctrl+C (o hasta que se active `parada`)."""
+    parada = parada or threading.Event()
+    reconstructor = Reconstructor(espera, csv_fijo)
+    reconstructor.iniciar()
+    # Al arrancar se pone al día lo que ya estuviera obsoleto
+    reconstructor.aviso()
+
+    if not sondeo:
+        try:
+            import watchdog  # noqa: F401
+        except ImportError:
+            sondeo = True
+    modo = f"sondeo cada {intervalo:g}s" if sondeo else "notificaciones del sistema"
+    print(f"Vigilando {directorio} ({modo}); Ctrl+C para salir")
+
+    try:
+        if sondeo:
+            _vigilar_sondeo(directorio, reconstructor, intervalo, parada)
+        else:
+            _vigilar_watchdog(directorio, reconstructor, parada)
+    except KeyboardInterrupt:
+        print("\nVigilancia detenida")
+    finally:
+        reconstructor.parar()